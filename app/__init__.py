@@ -1,25 +1,47 @@
 from flask import Flask
 from config import Config
 from app import database
+from app.uploads import UploadRequest
 
 def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
 
+    # Multipart uploads are streamed and hashed straight into the upload store
+    app.request_class = UploadRequest
+
     # Initialize Database
     database.init_app(app)
 
+    # Sampled per-request SQL tracing (SQL_TRACE_SAMPLE_RATE)
+    from app import sqltrace
+    sqltrace.init_app(app)
+
+    # Request, SQL, pool and handled-error metrics at /metrics
+    from app import metrics
+    metrics.init_app(app)
+
+    # Opt-in stack sampling of requests (PROFILE_SAMPLE_RATE)
+    from app import profiling
+    profiling.init_app(app)
+
+    # Index submission text for near-duplicate detection once it is extracted
+    from app import similarity
+    similarity.init_app(app)
+
     # --- Register Blueprints ---
     from app.blueprints.auth.routes import auth_bp
     from app.blueprints.admin.routes import admin_bp
     from app.blueprints.faculty.routes import faculty_bp
     from app.blueprints.student import student_bp
+    from app.blueprints.files.routes import files_bp
 
 
     app.register_blueprint(auth_bp, url_prefix='/auth')
     app.register_blueprint(admin_bp, url_prefix='/admin')
     app.register_blueprint(faculty_bp, url_prefix='/faculty')
     app.register_blueprint(student_bp, url_prefix='/student')
+    app.register_blueprint(files_bp, url_prefix='/files')
 
     # Root Route
     @app.route('/')
@@ -0,0 +1,130 @@
+import csv
+import io
+from datetime import date, datetime
+from itertools import islice
+
+from app.rollups import apply_attendance_deltas, attendance_deltas
+
+# Rows sent to the server per executemany() call
+BATCH_SIZE = 500
+
+VALID_STATUSES = ('Present', 'Absent', 'Late')
+
+# One upsert per (CourseID, StudentID, AttendanceDate). The source row only
+# exists when the student is enrolled in the course, so rows for anybody else
+# are silently ignored.
+_UPSERT_SQL = """
+    MERGE Attendance WITH (HOLDLOCK) AS t
+    USING (
+        SELECT e.CourseID, e.StudentID, ? AS AttendanceDate, ? AS Status
+        FROM Enrollments e
+        WHERE e.CourseID = ? AND e.StudentID = ?
+    ) AS s
+    ON t.CourseID = s.CourseID AND t.StudentID = s.StudentID AND t.AttendanceDate = s.AttendanceDate
+    WHEN MATCHED THEN
+        UPDATE SET Status = s.Status
+    WHEN NOT MATCHED THEN
+        INSERT (CourseID, StudentID, AttendanceDate, Status)
+        VALUES (s.CourseID, s.StudentID, s.AttendanceDate, s.Status);
+"""
+
+
+def write_attendance(db, course_id, records, batch_size=BATCH_SIZE):
+    """
+    Upserts (student_id, attendance_date, status) records for a course in
+    batches of ``batch_size`` using fast_executemany. Re-marking a day
+    overwrites the earlier status instead of adding a duplicate row. The
+    enrollments' attendance counters are shifted by each batch's changes.
+    Returns the number of records sent. Does not commit.
+    """
+    cursor = db.cursor()
+    cursor.fast_executemany = True
+
+    written = 0
+    records = iter(records)
+    while True:
+        batch = list(islice(records, batch_size))
+        if not batch:
+            break
+        deltas = attendance_deltas(cursor, course_id, batch)
+        cursor.executemany(_UPSERT_SQL, [(day, status, course_id, student_id)
+                                         for student_id, day, status in batch])
+        apply_attendance_deltas(cursor, course_id, deltas)
+        written += len(batch)
+    return written
+
+
+# --- Import parsing ---
+def _parse_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value).strip())
+
+
+def _parse_status(value):
+    status = str(value or '').strip().capitalize()
+    if status not in VALID_STATUSES:
+        raise ValueError(f"Unknown status {value!r}")
+    return status
+
+
+def _column_order(header):
+    """Maps a header row onto (student, date, status) column positions."""
+    names = [str(cell or '').strip().lower().replace('_', '').replace(' ', '') for cell in header]
+    wanted = (('studentid', 'student'), ('date', 'attendancedate'), ('status',))
+    order = []
+    for aliases in wanted:
+        matches = [i for i, name in enumerate(names) if name in aliases]
+        if not matches:
+            raise ValueError(f"Missing column: {aliases[0]}")
+        order.append(matches[0])
+    return order
+
+
+def parse_rows(rows, stats):
+    """
+    Turns raw sheet rows into (student_id, date, status) records, streaming.
+    A header row is optional; without one the columns are taken as
+    StudentID, Date, Status. Only the first non-empty row can be the header.
+    Bad rows are counted in ``stats['skipped']``.
+    """
+    order = [0, 1, 2]
+    first = True
+    for row in rows:
+        if not row or all(cell in (None, '') for cell in row):
+            continue
+        if first:
+            first = False
+            if not str(row[0]).strip().isdigit():
+                order = _column_order(row)
+                continue
+        try:
+            record = (int(row[order[0]]), _parse_date(row[order[1]]), _parse_status(row[order[2]]))
+        except (ValueError, TypeError, IndexError):
+            stats['skipped'] += 1
+            continue
+        stats['rows'] += 1
+        yield record
+
+
+def read_sheet(file_storage):
+    """
+    Yields raw rows from an uploaded CSV or XLSX file without loading the
+    whole sheet into memory.
+    """
+    filename = (file_storage.filename or '').lower()
+    if filename.endswith('.xlsx'):
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(file_storage.stream, read_only=True, data_only=True)
+        try:
+            yield from workbook.active.iter_rows(values_only=True)
+        finally:
+            workbook.close()
+    elif filename.endswith('.csv'):
+        text = io.TextIOWrapper(file_storage.stream, encoding='utf-8-sig', newline='')
+        yield from csv.reader(text)
+    else:
+        raise ValueError("Only .csv and .xlsx files can be imported")
@@ -1,9 +1,18 @@
-from flask import Blueprint, render_template, session, redirect, url_for, request, flash
+from flask import Blueprint, render_template, session, redirect, url_for, request, flash, jsonify
 from werkzeug.security import generate_password_hash
-from app.database import get_db
+from app.database import get_db, pool_stats
+from app.broadcasts import publish, start_watermark
+from app.identity import get_faculty_id
+from app.pubsub import publish_message, publish_broadcast
+from app.rollups import adjust_enrolled_count, enrollment_removed
+from app.gpa import invalidate as invalidate_gpa
+from app.unread import invalidate_notifications, invalidate_messages
+from app.metrics import handled_error
+from app.roster import student_page, SORTS as STUDENT_SORTS
 
 admin_bp = Blueprint('admin', __name__)
 
+
 # --- 1. DASHBOARD ---
 @admin_bp.route('/dashboard')
 def dashboard():
@@ -24,7 +33,7 @@ def dashboard():
 
         stats_data = {'students': s_count, 'faculty': f_count, 'courses': c_count}
     except Exception as e:
-        print(f"Dashboard Error: {e}")
+        handled_error("Dashboard Error", e)
         stats_data = {'students': 0, 'faculty': 0, 'courses': 0}
 
     return render_template('admin/dashboard.html', stats=stats_data)
@@ -46,7 +55,7 @@ def list_courses():
         """)
         courses = cursor.fetchall()
     except Exception as e:
-        print(f"List Courses Error: {e}")
+        handled_error("List Courses Error", e)
         courses = []
 
     return render_template('admin/courses/list.html', courses=courses)
@@ -79,6 +88,7 @@ def add_course():
             return redirect(url_for('admin.list_courses'))
         except Exception as e:
             db.rollback()
+            handled_error("Add Course Error", e)
             flash(f"Error: {e}", 'danger')
 
     cursor.execute("SELECT FacultyID, Name FROM Faculty")
@@ -98,7 +108,7 @@ def list_faculty():
         cursor.execute("SELECT FacultyID, Name, Email, Department, Designation FROM Faculty ORDER BY FacultyID DESC")
         faculty = cursor.fetchall()
     except Exception as e:
-        print(f"List Faculty Error: {e}")
+        handled_error("List Faculty Error", e)
         faculty = []
 
     return render_template('admin/faculty/list.html', faculty=faculty)
@@ -125,15 +135,18 @@ def add_faculty():
             if cursor.fetchone():
                 flash('Error: Email already exists in system!', 'warning')
             else:
-                cursor.execute("INSERT INTO Users (name, email, password, role) VALUES (?, ?, ?, 'Faculty')",
-                               (name, email, hashed_password))
-                cursor.execute("INSERT INTO Faculty (Name, Email, Password, Department, Designation) VALUES (?, ?, ?, ?, ?)",
-                               (name, email, password, department, designation))
+                cursor.execute("INSERT INTO Users (name, email, password, role) OUTPUT INSERTED.user_id "
+                               "VALUES (?, ?, ?, 'Faculty')", (name, email, hashed_password))
+                user_id = cursor.fetchone()[0]
+                start_watermark(cursor, user_id)
+                cursor.execute("INSERT INTO Faculty (user_id, Name, Email, Password, Department, Designation) "
+                               "VALUES (?, ?, ?, ?, ?, ?)", (user_id, name, email, password, department, designation))
                 db.commit()
                 flash('Faculty Added Successfully!', 'success')
                 return redirect(url_for('admin.list_faculty'))
         except Exception as e:
             db.rollback()
+            handled_error("Add Faculty Error", e)
             flash(f'Error adding faculty: {str(e)}', 'danger')
 
     return render_template('admin/faculty/add.html')
@@ -145,38 +158,24 @@ def list_students():
     if 'user_id' not in session or session.get('role') != 'Admin':
         return redirect(url_for('auth.login'))
 
+    sort = request.args.get('sort', 'newest')
+    if sort not in STUDENT_SORTS:
+        sort = 'newest'
+    department = request.args.get('department', '').strip()
+    name = request.args.get('name', '').strip()
+
     db = get_db()
     cursor = db.cursor()
     try:
-        cursor.execute("""
-            SELECT s.StudentID, s.Name, s.Email, s.Department, c.CourseName
-            FROM Students s
-            LEFT JOIN Enrollments e ON s.StudentID = e.StudentID
-            LEFT JOIN Courses c ON e.CourseID = c.CourseID
-            ORDER BY s.StudentID DESC
-        """)
-        raw_data = cursor.fetchall()
-
-        students_map = {}
-        for row in raw_data:
-            s_id = row[0]
-            if s_id not in students_map:
-                students_map[s_id] = {
-                    'id': row[0],
-                    'name': row[1],
-                    'email': row[2],
-                    'department': row[3],
-                    'courses': []
-                }
-            if row[4]:
-                students_map[s_id]['courses'].append(row[4])
-
-        students = list(students_map.values())
+        students, next_cursor = student_page(cursor, sort=sort, department=department or None,
+                                             name=name or None, after=request.args.get('after'))
     except Exception as e:
+        handled_error("List Students Error", e)
         flash(f"Error fetching students: {e}", "danger")
-        students = []
+        students, next_cursor = [], None
 
-    return render_template('admin/students/list.html', students=students)
+    return render_template('admin/students/list.html', students=students, next_cursor=next_cursor,
+                           sort=sort, department=department, name=name)
 
 
 @admin_bp.route('/students/add', methods=['GET', 'POST'])
@@ -199,15 +198,18 @@ def add_student():
             if cursor.fetchone():
                 flash('Error: Email already exists in system!', 'warning')
             else:
-                cursor.execute("INSERT INTO Users (name, email, password, role) VALUES (?, ?, ?, 'Student')",
-                               (name, email, hashed_password))
-                cursor.execute("INSERT INTO Students (Name, Email, Password, Department) VALUES (?, ?, ?, ?)",
-                               (name, email, password, department))
+                cursor.execute("INSERT INTO Users (name, email, password, role) OUTPUT INSERTED.user_id "
+                               "VALUES (?, ?, ?, 'Student')", (name, email, hashed_password))
+                user_id = cursor.fetchone()[0]
+                start_watermark(cursor, user_id)
+                cursor.execute("INSERT INTO Students (user_id, Name, Email, Password, Department) VALUES (?, ?, ?, ?, ?)",
+                               (user_id, name, email, password, department))
                 db.commit()
                 flash('Student Added Successfully!', 'success')
                 return redirect(url_for('admin.list_students'))
         except Exception as e:
             db.rollback()
+            handled_error("Add Student Error", e)
             flash(f'Error adding student: {str(e)}', 'danger')
 
     return render_template('admin/students/add.html')
@@ -233,17 +235,22 @@ def manage_enrollments():
                     flash("Student is already enrolled!", "warning")
                 else:
                     cursor.execute("INSERT INTO Enrollments (StudentID, CourseID) VALUES (?, ?)", (student_id, course_id))
+                    adjust_enrolled_count(cursor, course_id, 1)
                     db.commit()
                     flash("Student Enrolled Successfully!", "success")
             except Exception as e:
+                handled_error("Enroll Error", e)
                 flash(f"Error enrolling: {e}", "danger")
         elif action == 'drop':
             enrollment_id = request.form.get('enrollment_id')
             try:
+                enrollment_removed(cursor, enrollment_id)
+                invalidate_gpa(cursor, enrollment_id=enrollment_id)
                 cursor.execute("DELETE FROM Enrollments WHERE EnrollmentID = ?", (enrollment_id,))
                 db.commit()
                 flash("Student Dropped Successfully!", "success")
             except Exception as e:
+                handled_error("Drop Error", e)
                 flash(f"Error dropping: {e}", "danger")
             return redirect(url_for('admin.manage_enrollments'))
 
@@ -272,6 +279,7 @@ def manage_enrollments():
         cursor.execute("SELECT CourseID, CourseCode, CourseName FROM Courses")
         all_courses = cursor.fetchall()
     except Exception as e:
+        handled_error("Manage Enrollments Error", e)
         flash(f"Database Error: {e}", "danger")
         enrollments = []
         all_students = []
@@ -306,24 +314,32 @@ def send_broadcast():
 
     target = request.form.get('target')
     msg_text = request.form.get('message')
+    course_code = request.form.get('course_code', '').strip()
+    department = request.form.get('department', '').strip() or None
 
     db = get_db()
     cursor = db.cursor()
 
     try:
-        if target == 'All':
-            cursor.execute("SELECT user_id FROM Users WHERE role IN ('Student', 'Faculty')")
-        else:
-            cursor.execute("SELECT user_id FROM Users WHERE role = ?", (target,))
-
-        users = cursor.fetchall()
-        for user in users:
-            cursor.execute("INSERT INTO Notifications (user_id, Message, IsRead, CreatedAt) VALUES (?, ?, 0, GETDATE())",
-                           (user[0], msg_text))
+        course_id = None
+        if course_code:
+            cursor.execute("SELECT CourseID FROM Courses WHERE CourseCode = ?", (course_code,))
+            course = cursor.fetchone()
+            if not course:
+                flash(f"Course {course_code} not found.", "warning")
+                return redirect(url_for('admin.dashboard'))
+            course_id = course[0]
+
+        # Stored once; recipients are resolved when they read their notifications
+        target_role = None if target == 'All' else target
+        publish(cursor, msg_text, target_role=target_role, course_id=course_id, department=department)
         db.commit()
+        invalidate_notifications()
+        publish_broadcast(target_role, course_id, department)
         flash(f"Broadcast sent successfully to {target}!", "success")
     except Exception as e:
         db.rollback()
+        handled_error("Broadcast Error", e)
         flash(f"Broadcast failed: {e}", "danger")
 
     return redirect(url_for('admin.dashboard'))
@@ -343,14 +359,25 @@ def reply_message():
     cursor = db.cursor()
 
     try:
+        # Address the reply the way the receiver's inbox reads it: students by
+        # user_id, faculty by FacultyID
+        cursor.execute("SELECT role FROM Users WHERE user_id = ?", (receiver_id,))
+        row = cursor.fetchone()
+        receiver_type = row[0] if row and row[0] in ('Student', 'Faculty') else None
+        if receiver_type == 'Faculty':
+            receiver_id = get_faculty_id(cursor, int(receiver_id))
+
         cursor.execute("""
-            INSERT INTO Messages (SenderID, ReceiverID, Subject, Body, SentAt, IsRead)
-            VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP, 0)
-        """, (admin_id, receiver_id, "Reply from Admin", reply_body))
+            INSERT INTO Messages (SenderID, ReceiverID, Subject, Body, ReceiverType, SentAt, IsRead)
+            VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP, 0)
+        """, (admin_id, receiver_id, "Reply from Admin", reply_body, receiver_type))
         cursor.execute("DELETE FROM Messages WHERE MessageID = ?", (original_msg_id,))
         db.commit()
+        invalidate_messages(receiver_id)
+        if receiver_type:
+            publish_message(receiver_id, receiver_type)
     except Exception as e:
-        print(f"Reply Error: {e}")
+        handled_error("Reply Error", e)
         db.rollback()
 
     return redirect(url_for('admin.admin_messages'))
@@ -377,6 +404,15 @@ def update_course_status(course_id):
         db.commit()
         flash(f"Course status updated to {new_status}!", "success")
     except Exception as e:
-        print(f"Error updating status: {e}")
+        handled_error("Error updating status", e)
         flash("Database Error: Could not update status.", "danger")
     return redirect(url_for('admin.list_courses'))
+
+
+# --- 8. DIAGNOSTICS ---
+@admin_bp.route('/db_pool')
+def db_pool():
+    if 'user_id' not in session or session.get('role') != 'Admin':
+        return redirect(url_for('auth.login'))
+
+    return jsonify(pool_stats())
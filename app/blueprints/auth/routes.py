@@ -1,6 +1,7 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session
 from werkzeug.security import check_password_hash
 from app.database import get_db
+from app.identity import cache_profile_at_login
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -33,11 +34,6 @@ def login():
             if isinstance(db_password, str):
                 db_password = db_password.strip()
 
-            # --- DEBUG LOGS ---
-            print(f"🔍 DEBUG CHECK:")
-            print(f" -> DB Password: '{db_password}'")
-            print(f" -> Input Pass : '{password}'")
-
             # Password check logic
             password_match = False
             try:
@@ -54,6 +50,7 @@ def login():
                 session['user_id'] = user_id
                 session['name'] = name
                 session['role'] = role
+                cache_profile_at_login(cursor, user_id, role)
                 flash(f"Welcome back, {name}!", "success")
 
                 if role == 'Admin':
@@ -1,22 +1,24 @@
 import os
-from flask import Blueprint, render_template, session, redirect, url_for, flash, request, current_app
+from flask import Blueprint, Response, render_template, session, redirect, url_for, flash, request, jsonify, abort, current_app
 from werkzeug.utils import secure_filename
 from app.database import get_db
+from app.attendance import write_attendance, read_sheet, parse_rows
+from app.gpa import apply_grade_change, normalize_grade
+from app.broadcasts import notification_page, mark_feed_read
+from app.mailbox import list_messages, get_message_body
+from app.identity import get_faculty_id
+from app.uploads import store as store_upload, blob_relpath, blob_path, blob_crc32, legacy_path, legacy_crc32
+from app.zipstream import StreamingZip, ZipEntry
+from app.previews import lookup as preview_lookup
+from app.similarity import top_matches
+from app.pubsub import publish_message, publish_notification, unread_events
+from app.unread import unread_notifications, unread_messages, adjust_unread_notifications, invalidate_messages
+from app.metrics import handled_error
 from datetime import datetime
 
 faculty_bp = Blueprint('faculty', __name__)
 
 
-# --- HELPER: Get Actual Faculty ID from User Session ---
-def get_faculty_id_from_session(cursor, user_id):
-    cursor.execute(
-        "SELECT FacultyID FROM Faculty F JOIN Users U ON F.Email = U.Email WHERE U.user_id = ?",
-        (user_id,)
-    )
-    row = cursor.fetchone()
-    return row[0] if row else None
-
-
 # --- 1. DASHBOARD ---
 @faculty_bp.route('/dashboard')
 def dashboard():
@@ -28,25 +30,18 @@ def dashboard():
     cursor = db.cursor()
 
     try:
-        cursor.execute("SELECT email FROM Users WHERE user_id = ?", (user_id,))
-        user_row = cursor.fetchone()
-        if not user_row:
-            flash("User record not found.", "danger")
-            return redirect(url_for('auth.login'))
-
-        user_email = user_row[0]
-        cursor.execute("SELECT FacultyID, Name FROM Faculty WHERE Email = ?", (user_email,))
-        faculty_row = cursor.fetchone()
-        if not faculty_row:
+        faculty_id = get_faculty_id(cursor, user_id)
+        if faculty_id is None:
             flash("Faculty profile not found. Contact Admin.", "danger")
             return redirect(url_for('auth.login'))
 
-        faculty_id, faculty_name = faculty_row
+        cursor.execute("SELECT Name FROM Faculty WHERE FacultyID = ?", (faculty_id,))
+        faculty_name = cursor.fetchone()[0]
         cursor.execute("SELECT * FROM Courses WHERE FacultyID = ?", (faculty_id,))
         courses = cursor.fetchall()
         return render_template('faculty/dashboard.html', courses=courses, name=faculty_name)
     except Exception as e:
-        print(f"Dashboard Error: {e}")
+        handled_error("Dashboard Error", e)
         flash("System error loading dashboard.", "danger")
         return redirect(url_for('auth.login'))
 
@@ -65,7 +60,7 @@ def manage_course(course_id):
         course = cursor.fetchone()
 
         cursor.execute("""
-            SELECT E.EnrollmentID, S.StudentID, S.Name, E.Grade
+            SELECT E.EnrollmentID, S.StudentID, S.Name, E.Grade, E.attendance_percentage
             FROM Enrollments E
             JOIN Students S ON E.StudentID = S.StudentID
             WHERE E.CourseID = ?
@@ -77,7 +72,7 @@ def manage_course(course_id):
 
         return render_template('faculty/manage_course.html', course=course, students=students, assignments=assignments)
     except Exception as e:
-        print(f"Manage Course Error: {e}")
+        handled_error("Manage Course Error", e)
         flash("Error loading course details.", "danger")
         return redirect(url_for('faculty.dashboard'))
 
@@ -89,20 +84,30 @@ def update_grade(course_id):
         return redirect(url_for('auth.login'))
 
     student_id = request.form.get('student_id')
-    grade = request.form.get('grade')
+    grade = normalize_grade(request.form.get('grade'))
 
     db = get_db()
     cursor = db.cursor()
 
     try:
+        # The lock holds the old grade until commit, so two saves cannot both apply a delta from it
+        cursor.execute("SELECT Grade FROM Enrollments WITH (UPDLOCK, HOLDLOCK) WHERE CourseID = ? AND StudentID = ?",
+                       (course_id, student_id))
+        row = cursor.fetchone()
+        if row is None:
+            flash("Student is not enrolled in this course.", "warning")
+            return redirect(url_for('faculty.manage_course', course_id=course_id))
+
         cursor.execute(
             "UPDATE Enrollments SET Grade = ? WHERE CourseID = ? AND StudentID = ?",
             (grade, course_id, student_id)
         )
+        apply_grade_change(cursor, student_id, row[0], grade)
         db.commit()
         flash("Grade updated successfully!", "success")
     except Exception as e:
         db.rollback()
+        handled_error("Grade Error", e)
         flash(f"Error updating grade: {e}", "danger")
 
     return redirect(url_for('faculty.manage_course', course_id=course_id))
@@ -119,24 +124,46 @@ def mark_attendance(course_id):
     date = request.form.get('attendance_date')
     student_ids = request.form.getlist('student_ids')
 
+    records = [(sid, date, request.form.get(f'status_{sid}'))
+               for sid in student_ids if request.form.get(f'status_{sid}')]
+
     try:
-        for sid in student_ids:
-            status = request.form.get(f'status_{sid}')
-            if status:
-                cursor.execute("""
-                    INSERT INTO Attendance (CourseID, StudentID, AttendanceDate, Status)
-                    VALUES (?, ?, ?, ?)
-                """, (course_id, sid, date, status))
+        write_attendance(db, course_id, records)
         db.commit()
         flash("Attendance marked successfully!", "success")
     except Exception as e:
         db.rollback()
-        print(f"Attendance Error: {e}")
+        handled_error("Attendance Error", e)
         flash("Error marking attendance.", "danger")
 
     return redirect(url_for('faculty.manage_course', course_id=course_id))
 
 
+@faculty_bp.route('/import_attendance/<int:course_id>', methods=['POST'])
+def import_attendance(course_id):
+    if 'user_id' not in session or session.get('role') != 'Faculty':
+        return redirect(url_for('auth.login'))
+
+    file = request.files.get('file')
+    if not file or file.filename == '':
+        flash("No file selected!", "danger")
+        return redirect(url_for('faculty.manage_course', course_id=course_id))
+
+    db = get_db()
+    stats = {'rows': 0, 'skipped': 0}
+
+    try:
+        write_attendance(db, course_id, parse_rows(read_sheet(file), stats))
+        db.commit()
+        flash(f"Processed {stats['rows']} attendance rows ({stats['skipped']} unreadable rows skipped).", "success")
+    except Exception as e:
+        db.rollback()
+        handled_error("Attendance Import Error", e)
+        flash(f"Error importing attendance: {e}", "danger")
+
+    return redirect(url_for('faculty.manage_course', course_id=course_id))
+
+
 # --- 5. ADD ASSIGNMENT ---
 @faculty_bp.route('/add_assignment/<int:course_id>', methods=['POST'])
 def add_assignment(course_id):
@@ -147,30 +174,26 @@ def add_assignment(course_id):
     description = request.form.get('description')
     deadline = request.form.get('deadline')
     file = request.files.get('file')
-    file_path = None
+    file_path = file_hash = file_name = None
 
     if file and file.filename != '':
-        filename = secure_filename(file.filename)
-        upload_folder = os.path.join(current_app.root_path, 'static/uploads')
-        if not os.path.exists(upload_folder):
-            os.makedirs(upload_folder)
-        save_path = os.path.join(upload_folder, filename)
-        file.save(save_path)
-        file_path = f'uploads/{filename}'
+        file_hash, _ = store_upload(file)
+        file_path = blob_relpath(file_hash)
+        file_name = secure_filename(file.filename)
 
     db = get_db()
     cursor = db.cursor()
 
     try:
         cursor.execute("""
-            INSERT INTO Assignments (CourseID, Title, Description, Deadline, AttachmentPath, CreatedAt)
-            VALUES (?, ?, ?, ?, ?, GETDATE())
-        """, (course_id, title, description, deadline, file_path))
+            INSERT INTO Assignments (CourseID, Title, Description, Deadline, AttachmentPath, AttachmentHash, AttachmentName, CreatedAt)
+            VALUES (?, ?, ?, ?, ?, ?, ?, GETDATE())
+        """, (course_id, title, description, deadline, file_path, file_hash, file_name))
         db.commit()
         flash("Assignment uploaded successfully!", "success")
     except Exception as e:
         db.rollback()
-        print(f"Assignment Error: {e}")
+        handled_error("Assignment Error", e)
         flash("Error adding assignment.", "danger")
 
     return redirect(url_for('faculty.manage_course', course_id=course_id))
@@ -195,14 +218,15 @@ def settings():
                 flash("Settings updated successfully!", "success")
         except Exception as e:
             db.rollback()
+            handled_error("Settings Error", e)
             flash(f"Error updating settings: {e}", "danger")
         return redirect(url_for('faculty.settings'))
 
     cursor.execute("""
         SELECT F.Name, F.Email, F.Department, F.Designation, U.Password
         FROM Faculty F
-        JOIN Users U ON F.Email = U.Email
-        WHERE U.user_id = ?
+        JOIN Users U ON U.user_id = F.user_id
+        WHERE F.user_id = ?
     """, (user_id,))
     user_info = cursor.fetchone()
 
@@ -215,29 +239,25 @@ def reports():
     if 'user_id' not in session or session.get('role') != 'Faculty':
         return redirect(url_for('auth.login'))
 
-    user_id = session['user_id']
     db = get_db()
     cursor = db.cursor()
+    faculty_id = get_faculty_id(cursor)
 
     # Total students
     cursor.execute("""
         SELECT COUNT(DISTINCT E.StudentID)
         FROM Enrollments E
         JOIN Courses C ON E.CourseID = C.CourseID
-        JOIN Faculty F ON C.FacultyID = F.FacultyID
-        JOIN Users U ON F.Email = U.Email
-        WHERE U.user_id = ?
-    """, (user_id,))
+        WHERE C.FacultyID = ?
+    """, (faculty_id,))
     total_students = cursor.fetchone()[0]
 
     # Total courses
     cursor.execute("""
         SELECT COUNT(*)
         FROM Courses C
-        JOIN Faculty F ON C.FacultyID = F.FacultyID
-        JOIN Users U ON F.Email = U.Email
-        WHERE U.user_id = ?
-    """, (user_id,))
+        WHERE C.FacultyID = ?
+    """, (faculty_id,))
     total_courses = cursor.fetchone()[0]
 
     # Top performers
@@ -245,10 +265,8 @@ def reports():
         SELECT COUNT(E.Grade)
         FROM Enrollments E
         JOIN Courses C ON E.CourseID = C.CourseID
-        JOIN Faculty F ON C.FacultyID = F.FacultyID
-        JOIN Users U ON F.Email = U.Email
-        WHERE U.user_id = ? AND (E.Grade = 'A' OR E.Grade = 'B')
-    """, (user_id,))
+        WHERE C.FacultyID = ? AND (E.Grade = 'A' OR E.Grade = 'B')
+    """, (faculty_id,))
     top_performers = cursor.fetchone()[0]
 
     return render_template('faculty/reports.html', total_students=total_students, total_courses=total_courses, top_performers=top_performers)
@@ -260,16 +278,13 @@ def my_courses():
     if 'user_id' not in session or session.get('role') != 'Faculty':
         return redirect(url_for('auth.login'))
 
-    user_id = session['user_id']
     db = get_db()
     cursor = db.cursor()
     cursor.execute("""
         SELECT C.CourseID, C.CourseName, C.CourseCode, C.Credits, C.Room, C.Description
         FROM Courses C
-        JOIN Faculty F ON C.FacultyID = F.FacultyID
-        JOIN Users U ON F.Email = U.Email
-        WHERE U.user_id = ?
-    """, (user_id,))
+        WHERE C.FacultyID = ?
+    """, (get_faculty_id(cursor),))
     courses = cursor.fetchall()
 
     return render_template('faculty/my_courses.html', courses=courses)
@@ -281,7 +296,6 @@ def students():
     if 'user_id' not in session or session.get('role') != 'Faculty':
         return redirect(url_for('auth.login'))
 
-    user_id = session['user_id']
     db = get_db()
     cursor = db.cursor()
     cursor.execute("""
@@ -289,11 +303,9 @@ def students():
         FROM Students S
         JOIN Enrollments E ON S.StudentID = E.StudentID
         JOIN Courses C ON E.CourseID = C.CourseID
-        JOIN Faculty F ON C.FacultyID = F.FacultyID
-        JOIN Users U ON F.Email = U.Email
-        WHERE U.user_id = ?
+        WHERE C.FacultyID = ?
         ORDER BY C.CourseName, S.Name
-    """, (user_id,))
+    """, (get_faculty_id(cursor),))
     students_list = cursor.fetchall()
 
     return render_template('faculty/students.html', students=students_list)
@@ -301,68 +313,55 @@ def students():
 
 # --- 10. NOTIFICATION & MESSAGE SYSTEM ---
 @faculty_bp.context_processor
-def inject_notifications():
+def inject_unread_counts():
     if 'user_id' not in session:
-        return dict(unread_count=0)
-
-    current_user_id = session['user_id']
-    db = get_db()
-    cursor = db.cursor()
+        return dict(unread_count=0, unread_msg_count=0)
 
     try:
-        cursor.execute("SELECT COUNT(*) FROM Notifications WHERE user_id = ? AND IsRead = 0", (current_user_id,))
-        count_row = cursor.fetchone()
-        count = count_row[0] if count_row else 0
-    except:
-        count = 0
+        faculty_id = get_faculty_id(None)
+        notif_count = unread_notifications(session['user_id'], 'Faculty', faculty_id)
+        msg_count = unread_messages(faculty_id, 'Faculty') if faculty_id is not None else 0
+    except Exception as e:
+        handled_error("Unread Count Error", e)
+        notif_count, msg_count = 0, 0
 
-    return dict(unread_count=count)
+    return dict(unread_count=notif_count, unread_msg_count=msg_count)
 
 
-@faculty_bp.route('/notifications')
-def notifications():
+@faculty_bp.route('/events')
+def events():
+    """Server-sent events with live unread counts for the navbar badges."""
     if 'user_id' not in session:
-        return redirect(url_for('auth.login'))
-
-    current_user_id = session['user_id']
-    db = get_db()
-    cursor = db.cursor()
+        return '', 401
+    if session.get('role') != 'Faculty':
+        return '', 403
+    if not current_app.config.get('LIVE_UNREAD_ENABLED'):
+        return '', 404
 
-    cursor.execute("""
-        SELECT Message, CreatedAt, IsRead
-        FROM Notifications
-        WHERE user_id = ?
-        ORDER BY CreatedAt DESC
-    """, (current_user_id,))
-    notifs = cursor.fetchall()
-
-    cursor.execute("UPDATE Notifications SET IsRead = 1 WHERE user_id = ?", (current_user_id,))
-    db.commit()
-
-    return render_template('faculty/notifications.html', notifications=notifs)
+    cursor = get_db().cursor()
+    faculty_id = get_faculty_id(cursor)
+    return unread_events(cursor, session['user_id'], 'Faculty', faculty_id, faculty_id)
 
 
-@faculty_bp.context_processor
-def inject_messages_count():
+@faculty_bp.route('/notifications')
+def notifications():
     if 'user_id' not in session:
-        return dict(unread_msg_count=0)
+        return redirect(url_for('auth.login'))
 
-    user_id = session['user_id']
+    current_user_id = session['user_id']
     db = get_db()
     cursor = db.cursor()
 
-    try:
-        faculty_id = get_faculty_id_from_session(cursor, user_id)
-        cursor.execute("""
-            SELECT COUNT(*) FROM Messages
-            WHERE ReceiverID = ? AND ReceiverType = 'Faculty' AND IsRead = 0
-        """, (faculty_id,))
-        count_row = cursor.fetchone()
-        count = count_row[0] if count_row else 0
-    except:
-        count = 0
+    faculty_id = get_faculty_id(cursor)
+    notifs, next_cursor = notification_page(cursor, current_user_id, 'Faculty', faculty_id,
+                                            after=request.args.get('after'))
+    marked = mark_feed_read(cursor, current_user_id, 'Faculty', faculty_id, notifs)
+    if marked:
+        db.commit()
+        adjust_unread_notifications(current_user_id, -marked)
+        publish_notification(current_user_id, -marked)
 
-    return dict(unread_msg_count=count)
+    return render_template('faculty/notifications.html', notifications=notifs, next_cursor=next_cursor)
 
 
 # --- 11. MESSAGES ---
@@ -376,27 +375,42 @@ def messages():
     cursor = db.cursor()
 
     try:
-        faculty_id = get_faculty_id_from_session(cursor, user_id)
-        cursor.execute("""
-            SELECT Subject, Body, SentAt, IsRead, MessageID
-            FROM Messages
-            WHERE ReceiverID = ? AND ReceiverType = 'Faculty' AND (IsDeleted = 0 OR IsDeleted IS NULL)
-                  AND (IsArchived = 0 OR IsArchived IS NULL)
-            ORDER BY SentAt DESC
-        """, (faculty_id,))
-        msgs = cursor.fetchall()
-
-        cursor.execute("""
-            UPDATE Messages
-            SET IsRead = 1
-            WHERE ReceiverID = ? AND ReceiverType = 'Faculty' AND IsRead = 0 AND (IsDeleted = 0 OR IsDeleted IS NULL)
-        """, (faculty_id,))
-        db.commit()
+        faculty_id = get_faculty_id(cursor, user_id)
+        msgs, next_cursor = list_messages(cursor, faculty_id, 'Faculty', 'inbox', after=request.args.get('after'))
+
+        # Only the messages on the page shown count as read
+        unread_ids = [msg[4] for msg in msgs if not msg[3]]
+        if unread_ids:
+            placeholders = ', '.join('?' * len(unread_ids))
+            cursor.execute(f"""
+                UPDATE Messages
+                SET IsRead = 1
+                WHERE MessageID IN ({placeholders}) AND ReceiverID = ? AND IsRead = 0
+            """, (*unread_ids, faculty_id))
+            marked = cursor.rowcount
+            db.commit()
+            invalidate_messages(faculty_id, 'Faculty')
+            if marked > 0:
+                publish_message(faculty_id, 'Faculty', -marked)
     except Exception as e:
-        print(f"Messages Fetch Error: {e}")
-        msgs = []
+        handled_error("Messages Fetch Error", e)
+        msgs, next_cursor = [], None
+
+    return render_template('faculty/messages.html', messages=msgs, next_cursor=next_cursor)
+
+
+@faculty_bp.route('/message/<int:msg_id>')
+def message_body(msg_id):
+    if 'user_id' not in session:
+        return redirect(url_for('auth.login'))
+    if session.get('role') != 'Faculty':
+        return jsonify({'error': 'Forbidden'}), 403
 
-    return render_template('faculty/messages.html', messages=msgs)
+    cursor = get_db().cursor()
+    body = get_message_body(cursor, msg_id, get_faculty_id(cursor), 'Faculty')
+    if body is None:
+        return jsonify({'error': 'Message not found'}), 404
+    return jsonify({'id': msg_id, 'body': body})
 
 
 @faculty_bp.route('/send_message', methods=['POST'])
@@ -415,12 +429,7 @@ def send_message():
         receiver_id = 1
     else:
         student_id = request.form.get('student_id')
-        cursor.execute("""
-            SELECT u.user_id
-            FROM Users u
-            JOIN Students s ON u.name = s.Name
-            WHERE s.StudentID = ?
-        """, (student_id,))
+        cursor.execute("SELECT user_id FROM Students WHERE StudentID = ?", (student_id,))
         res = cursor.fetchone()
         receiver_id = res[0] if res else None
 
@@ -429,6 +438,8 @@ def send_message():
         VALUES (?, ?, ?, ?, ?, 0, GETDATE())
     """, (sender_id, receiver_id, subject, body, receiver_type))
     db.commit()
+    invalidate_messages(receiver_id, receiver_type)
+    publish_message(receiver_id, receiver_type)
     flash('Message sent successfully!', 'success')
 
     return redirect(url_for('faculty.messages'))
@@ -444,14 +455,15 @@ def delete_message(msg_id):
     cursor = db.cursor()
 
     try:
-        faculty_id = get_faculty_id_from_session(cursor, session['user_id'])
+        faculty_id = get_faculty_id(cursor)
         cursor.execute("UPDATE Messages SET IsDeleted = 1 WHERE MessageID = ? AND ReceiverID = ?", (msg_id, faculty_id))
         db.commit()
+        invalidate_messages(faculty_id, 'Faculty')
         flash('Message moved to trash!', 'success')
     except Exception as e:
         db.rollback()
         flash('Error deleting message.', 'danger')
-        print(f"Delete Error: {e}")
+        handled_error("Delete Error", e)
 
     return redirect(url_for('faculty.messages'))
 
@@ -466,12 +478,13 @@ def archive_message(msg_id):
     cursor = db.cursor()
 
     try:
-        faculty_id = get_faculty_id_from_session(cursor, session['user_id'])
+        faculty_id = get_faculty_id(cursor)
         cursor.execute("UPDATE Messages SET IsArchived = 1 WHERE MessageID = ? AND ReceiverID = ?", (msg_id, faculty_id))
         db.commit()
         flash('Message archived successfully!', 'info')
     except Exception as e:
         db.rollback()
+        handled_error("Archive Error", e)
         flash('Error archiving message.', 'danger')
 
     return redirect(url_for('faculty.messages'))
@@ -487,11 +500,20 @@ def mark_as_read(msg_id):
     cursor = db.cursor()
 
     try:
-        faculty_id = get_faculty_id_from_session(cursor, session['user_id'])
-        cursor.execute("UPDATE Messages SET IsRead = 1 WHERE MessageID = ? AND ReceiverID = ?", (msg_id, faculty_id))
+        faculty_id = get_faculty_id(cursor)
+        cursor.execute("""
+            UPDATE Messages
+            SET IsRead = 1
+            WHERE MessageID = ? AND ReceiverID = ? AND ReceiverType = 'Faculty' AND IsRead = 0
+        """, (msg_id, faculty_id))
+        marked = cursor.rowcount
         db.commit()
+        if marked > 0:
+            invalidate_messages(faculty_id, 'Faculty')
+            publish_message(faculty_id, 'Faculty', -marked)
     except Exception as e:
         db.rollback()
+        handled_error("Mark Read Error", e)
 
     return redirect(url_for('faculty.messages'))
 
@@ -505,17 +527,10 @@ def archived_messages():
     user_id = session['user_id']
     db = get_db()
     cursor = db.cursor()
-    faculty_id = get_faculty_id_from_session(cursor, user_id)
+    faculty_id = get_faculty_id(cursor, user_id)
+    archived_msgs, next_cursor = list_messages(cursor, faculty_id, 'Faculty', 'archived', after=request.args.get('after'))
 
-    cursor.execute("""
-        SELECT Subject, Body, SentAt, IsRead, MessageID
-        FROM Messages
-        WHERE ReceiverID = ? AND ReceiverType = 'Faculty' AND IsArchived = 1 AND (IsDeleted = 0 OR IsDeleted IS NULL)
-        ORDER BY SentAt DESC
-    """, (faculty_id,))
-    archived_msgs = cursor.fetchall()
-
-    return render_template('faculty/archived_messages.html', messages=archived_msgs)
+    return render_template('faculty/archived_messages.html', messages=archived_msgs, next_cursor=next_cursor)
 
 
 @faculty_bp.route('/unarchive_message/<int:msg_id>')
@@ -525,7 +540,7 @@ def unarchive_message(msg_id):
 
     db = get_db()
     cursor = db.cursor()
-    faculty_id = get_faculty_id_from_session(cursor, session['user_id'])
+    faculty_id = get_faculty_id(cursor)
     cursor.execute("UPDATE Messages SET IsArchived = 0 WHERE MessageID = ? AND ReceiverID = ?", (msg_id, faculty_id))
     db.commit()
     flash('Message restored to inbox!', 'success')
@@ -542,17 +557,10 @@ def trash_messages():
     user_id = session['user_id']
     db = get_db()
     cursor = db.cursor()
-    faculty_id = get_faculty_id_from_session(cursor, user_id)
-
-    cursor.execute("""
-        SELECT Subject, Body, SentAt, IsRead, MessageID
-        FROM Messages
-        WHERE ReceiverID = ? AND ReceiverType = 'Faculty' AND IsDeleted = 1
-        ORDER BY SentAt DESC
-    """, (faculty_id,))
-    msgs = cursor.fetchall()
+    faculty_id = get_faculty_id(cursor, user_id)
+    msgs, next_cursor = list_messages(cursor, faculty_id, 'Faculty', 'trash', after=request.args.get('after'))
 
-    return render_template('faculty/trash_messages.html', messages=msgs, title="Trash")
+    return render_template('faculty/trash_messages.html', messages=msgs, next_cursor=next_cursor, title="Trash")
 
 
 # --- 17. RESTORE MESSAGE ---
@@ -563,7 +571,7 @@ def restore_message(msg_id):
 
     db = get_db()
     cursor = db.cursor()
-    faculty_id = get_faculty_id_from_session(cursor, session['user_id'])
+    faculty_id = get_faculty_id(cursor)
     cursor.execute("""
         UPDATE Messages SET IsArchived = 0, IsDeleted = 0
         WHERE MessageID = ? AND ReceiverID = ?
@@ -582,17 +590,107 @@ def view_submissions(assignment_id):
 
     db = get_db()
     cursor = db.cursor()
+    submissions = _assignment_submissions(cursor, assignment_id)
 
+    cursor.execute("SELECT Title FROM Assignments WHERE AssignmentID = ?", (assignment_id,))
+    assignment_title = cursor.fetchone()[0]
+
+    # (has_image, text snippet, pending) per submission; never waits for the workers
+    previews = {sub[3]: preview_lookup(sub[4], sub[1]) for sub in submissions}
+    # Closest near-duplicate per submission: (score, other student's name)
+    matches = top_matches(cursor, assignment_id)
+
+    return render_template('faculty/submissions_list.html', submissions=submissions, previews=previews,
+                           matches=matches, title=assignment_title, assignment_id=assignment_id)
+
+
+# --- HELPER: Submissions of an assignment, newest first ---
+def _assignment_submissions(cursor, assignment_id):
+    """Rows are (Name, FileName, SubmissionDate, SubmissionID, FileHash, FilePath, StudentID)."""
     cursor.execute("""
-        SELECT s.Name, sub.FilePath, sub.SubmissionDate, sub.SubmissionID
+        SELECT s.Name, COALESCE(sub.FileName, sub.FilePath), sub.SubmissionDate, sub.SubmissionID,
+               sub.FileHash, sub.FilePath, s.StudentID
         FROM Submissions sub
         JOIN Students s ON sub.StudentID = s.StudentID
         WHERE sub.AssignmentID = ?
         ORDER BY sub.SubmissionDate DESC
     """, (assignment_id,))
-    submissions = cursor.fetchall()
+    return cursor.fetchall()
+
+
+def _zip_entries(submissions):
+    """One archive entry per submission file still on disk, named '<Student> (<ID>)/<file>'."""
+    entries, used = [], set()
+    for name, file_name, submitted_at, _, file_hash, file_path, student_id in submissions:
+        if file_hash:
+            path = blob_path(file_hash)
+        else:
+            path = legacy_path(file_path or '')
+        if not path or not os.path.isfile(path):
+            continue
+
+        folder = (name or 'Unknown').replace('/', '-').replace('\\', '-')
+        base = (file_name or 'submission').replace('/', '-').replace('\\', '-')
+        entry_name, copy = f"{folder} ({student_id})/{base}", 2
+        while entry_name in used:
+            stem, dot, ext = base.rpartition('.')
+            entry_name = f"{folder} ({student_id})/{stem or ext} ({copy}){dot + ext if stem else ''}"
+            copy += 1
+        used.add(entry_name)
+
+        crc = blob_crc32(file_hash) if file_hash else legacy_crc32(path)
+        entries.append(ZipEntry(entry_name, path, os.path.getsize(path), crc,
+                                submitted_at if isinstance(submitted_at, datetime) else None))
+    return entries
+
+
+@faculty_bp.route('/download_submissions/<int:assignment_id>')
+def download_submissions(assignment_id):
+    """
+    All submissions of an assignment as one ZIP, streamed from the upload store
+    with bounded memory. Supports Range/If-Range so interrupted downloads resume.
+    """
+    if 'user_id' not in session or session.get('role') != 'Faculty':
+        return redirect(url_for('auth.login'))
 
-    cursor.execute("SELECT Title FROM Assignments WHERE AssignmentID = ?", (assignment_id,))
-    assignment_title = cursor.fetchone()[0]
+    cursor = get_db().cursor()
+    cursor.execute("""
+        SELECT A.Title FROM Assignments A
+        JOIN Courses C ON A.CourseID = C.CourseID
+        WHERE A.AssignmentID = ? AND C.FacultyID = ?
+    """, (assignment_id, get_faculty_id(cursor)))
+    assignment = cursor.fetchone()
+    if not assignment:
+        abort(404)
+
+    archive = StreamingZip(_zip_entries(_assignment_submissions(cursor, assignment_id)))
+    etag = archive.etag()
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+
+    start, stop, status = 0, archive.size, 200
+    if_range = request.if_range
+    range_valid = if_range.etag == etag if (if_range.etag or if_range.date) else True
+    if request.range and range_valid and len(request.range.ranges) == 1:
+        bounds = request.range.range_for_length(archive.size)
+        if bounds is None:
+            response = Response(status=416)
+            response.headers['Content-Range'] = f"bytes */{archive.size}"
+            return response
+        (start, stop), status = bounds, 206
+
+    response = Response(archive.iter_range(start, stop), status=status, mimetype='application/zip',
+                        direct_passthrough=True)
+    response.content_length = stop - start
+    if status == 206:
+        response.headers['Content-Range'] = f"bytes {start}-{stop - 1}/{archive.size}"
+    response.headers['Accept-Ranges'] = 'bytes'
+    response.headers.set('Content-Disposition', 'attachment',
+                         filename=f"{secure_filename(assignment[0]) or 'assignment'}-submissions.zip")
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
 
-    return render_template('faculty/submissions_list.html', submissions=submissions, title=assignment_title)
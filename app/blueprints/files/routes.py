@@ -0,0 +1,101 @@
+from flask import Blueprint, session, redirect, url_for, abort, send_file
+from app.database import get_db
+from app.identity import get_student_id, get_faculty_id
+from app.uploads import send_blob, send_legacy
+from app import previews
+
+files_bp = Blueprint('files', __name__)
+
+
+# --- HELPER: May the logged-in user read files of this course? ---
+def _can_read_course(cursor, course_id):
+    role = session.get('role')
+    if role == 'Admin':
+        return True
+    if role == 'Faculty':
+        cursor.execute("SELECT 1 FROM Courses WHERE CourseID = ? AND FacultyID = ?",
+                       (course_id, get_faculty_id(cursor)))
+    elif role == 'Student':
+        cursor.execute("SELECT 1 FROM Enrollments WHERE CourseID = ? AND StudentID = ?",
+                       (course_id, get_student_id(cursor)))
+    else:
+        return False
+    return cursor.fetchone() is not None
+
+
+# --- 1. SUBMISSIONS ---
+@files_bp.route('/submission/<int:submission_id>')
+def submission(submission_id):
+    """A submitted file, for its student and the staff of its course."""
+    if 'user_id' not in session:
+        return redirect(url_for('auth.login'))
+
+    cursor = get_db().cursor()
+    cursor.execute("""
+        SELECT sub.FileHash, sub.FileName, sub.FilePath, sub.StudentID, A.CourseID
+        FROM Submissions sub
+        JOIN Assignments A ON sub.AssignmentID = A.AssignmentID
+        WHERE sub.SubmissionID = ?
+    """, (submission_id,))
+    row = cursor.fetchone()
+    if not row:
+        abort(404)
+
+    is_owner = session.get('role') == 'Student' and row[3] == get_student_id(cursor)
+    if not is_owner and (session.get('role') == 'Student' or not _can_read_course(cursor, row[4])):
+        abort(403)
+
+    if row[0]:
+        return send_blob(row[0], row[1])
+    return send_legacy(row[2])
+
+
+@files_bp.route('/submission/<int:submission_id>/preview')
+def submission_preview(submission_id):
+    """First-page preview image of a submission, for the staff of its course."""
+    if 'user_id' not in session:
+        return redirect(url_for('auth.login'))
+
+    cursor = get_db().cursor()
+    cursor.execute("""
+        SELECT sub.FileHash, A.CourseID
+        FROM Submissions sub
+        JOIN Assignments A ON sub.AssignmentID = A.AssignmentID
+        WHERE sub.SubmissionID = ?
+    """, (submission_id,))
+    row = cursor.fetchone()
+    if not row or not row[0]:
+        abort(404)
+    if session.get('role') == 'Student' or not _can_read_course(cursor, row[1]):
+        abort(403)
+
+    path = previews.image_path(row[0])
+    if not path:
+        abort(404)
+    response = send_file(path, mimetype='image/png', conditional=True, etag=row[0] + '-preview', max_age=3600)
+    response.cache_control.public = None
+    response.cache_control.private = True
+    return response
+
+
+# --- 2. ASSIGNMENT ATTACHMENTS ---
+@files_bp.route('/assignment/<int:assignment_id>')
+def assignment_attachment(assignment_id):
+    """The file attached to an assignment, for everyone in the course."""
+    if 'user_id' not in session:
+        return redirect(url_for('auth.login'))
+
+    cursor = get_db().cursor()
+    cursor.execute("""
+        SELECT AttachmentHash, AttachmentName, AttachmentPath, CourseID
+        FROM Assignments WHERE AssignmentID = ?
+    """, (assignment_id,))
+    row = cursor.fetchone()
+    if not row or not (row[0] or row[2]):
+        abort(404)
+    if not _can_read_course(cursor, row[3]):
+        abort(403)
+
+    if row[0]:
+        return send_blob(row[0], row[1])
+    return send_legacy(row[2])
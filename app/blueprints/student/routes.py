@@ -1,7 +1,18 @@
-import os
-from flask import render_template, session, redirect, url_for, request, flash, current_app
+from flask import current_app, render_template, session, redirect, url_for, request, flash, jsonify
+from werkzeug.utils import secure_filename
 from . import student_bp
 from app.database import get_db
+from app.broadcasts import notification_feed, notification_page, mark_feed_read
+from app.mailbox import list_messages, get_message_body
+from app.identity import get_student_id
+from app.uploads import store as store_upload, blob_relpath
+from app.previews import schedule as schedule_preview
+from app.pubsub import publish_message, publish_notification, unread_events
+from app.rollups import adjust_enrolled_count
+from app.metrics import handled_error
+from app.gpa import student_summary, invalidate as invalidate_gpa
+from app.unread import (unread_notifications, unread_messages, adjust_unread_notifications,
+                        adjust_unread_messages, invalidate_messages)
 from datetime import datetime
 
 
@@ -15,52 +26,15 @@ def dashboard():
     db = get_db()
     cursor = db.cursor()
 
-    # Fetch student basic information
-    cursor.execute("""
-        SELECT s.StudentID, s.Name
-        FROM Students s
-        JOIN Users u ON s.Name = u.name
-        WHERE u.user_id = ?
-    """, (user_id,))
-    student = cursor.fetchone()
-    student_id = student[0] if student else None
-
-    # Calculate enrolled courses count
-    cursor.execute("SELECT COUNT(*) FROM Enrollments WHERE StudentID = ?", (student_id,))
-    courses_count = cursor.fetchone()[0]
-
-    # GPA calculation
-    cursor.execute("SELECT Grade FROM Enrollments WHERE StudentID = ?", (student_id,))
-    grades = cursor.fetchall()
-    total_points = 0
-    valid_grades_count = 0
-    for g in grades:
-        if g[0]:
-            valid_grades_count += 1
-            if g[0] == 'A':
-                total_points += 4.0
-            elif g[0] == 'B':
-                total_points += 3.0
-            else:
-                total_points += 2.0
-    gpa = round(total_points / valid_grades_count, 2) if valid_grades_count > 0 else 0.0
-
-    # Fetch notifications
-    cursor.execute("""
-        SELECT Message, CreatedAt, IsRead
-        FROM Notifications
-        WHERE user_id = ?
-        ORDER BY CreatedAt DESC
-    """, (user_id,))
-    user_notifications = cursor.fetchall()
-
-    # Fetch unread messages count
-    cursor.execute("""
-        SELECT COUNT(*)
-        FROM Messages
-        WHERE ReceiverID = ? AND ReceiverType = 'Student' AND IsRead = 0
-    """, (user_id,))
-    unread_msg_count = cursor.fetchone()[0]
+    student_id = get_student_id(cursor, user_id)
+
+    # Enrolled courses count and GPA (cached totals, aggregated on first read)
+    courses_count, gpa = student_summary(db, student_id)
+
+    # Latest notifications (personal + broadcasts)
+    user_notifications = notification_feed(cursor, user_id, 'Student', student_id, limit=4)
+
+    unread_msg_count = unread_messages(user_id, 'Student')
 
     announcements_list = [
         {'title': 'Notification', 'body': n[0], 'time': n[1]} for n in user_notifications[:3]
@@ -91,33 +65,24 @@ def messages():
     db = get_db()
     cursor = db.cursor()
 
-    # Inbox messages
-    cursor.execute("""
-        SELECT Subject, Body, SentAt, IsRead, MessageID
-        FROM Messages
-        WHERE ReceiverID = ? AND ReceiverType = 'Student'
-        AND (IsDeleted = 0 OR IsDeleted IS NULL)
-        AND (IsArchived = 0 OR IsArchived IS NULL)
-        ORDER BY SentAt DESC
-    """, (user_id,))
-    msgs = cursor.fetchall()
+    # Inbox messages (one page)
+    msgs, next_cursor = list_messages(cursor, user_id, 'Student', 'inbox', after=request.args.get('after'))
 
     # Faculty list based on enrolled courses
+    student_id = get_student_id(cursor, user_id)
     cursor.execute("""
-        SELECT DISTINCT uf.user_id, f.Name
+        SELECT DISTINCT f.FacultyID, f.Name
         FROM Faculty f
-        JOIN Users uf ON f.Email = uf.Email
         JOIN Courses c ON f.FacultyID = c.FacultyID
         JOIN Enrollments e ON c.CourseID = e.CourseID
-        JOIN Students s ON e.StudentID = s.StudentID
-        JOIN Users us ON s.Name = us.name
-        WHERE us.user_id = ?
-    """, (user_id,))
+        WHERE e.StudentID = ?
+    """, (student_id,))
     enrolled_faculty = cursor.fetchall()
 
     return render_template(
         'student/messages.html',
         messages=msgs,
+        next_cursor=next_cursor,
         faculty_list=enrolled_faculty
     )
 
@@ -129,14 +94,8 @@ def archived_messages():
 
     db = get_db()
     cursor = db.cursor()
-    cursor.execute("""
-        SELECT Subject, Body, SentAt, IsRead, MessageID
-        FROM Messages
-        WHERE ReceiverID = ? AND ReceiverType = 'Student' AND IsArchived = 1
-        AND (IsDeleted = 0 OR IsDeleted IS NULL)
-        ORDER BY SentAt DESC
-    """, (session['user_id'],))
-    return render_template('student/archived_messages.html', messages=cursor.fetchall())
+    msgs, next_cursor = list_messages(cursor, session['user_id'], 'Student', 'archived', after=request.args.get('after'))
+    return render_template('student/archived_messages.html', messages=msgs, next_cursor=next_cursor)
 
 
 @student_bp.route('/trash_messages')
@@ -146,13 +105,21 @@ def trash_messages():
 
     db = get_db()
     cursor = db.cursor()
-    cursor.execute("""
-        SELECT Subject, Body, SentAt, IsRead, MessageID
-        FROM Messages
-        WHERE ReceiverID = ? AND ReceiverType = 'Student' AND IsDeleted = 1
-        ORDER BY SentAt DESC
-    """, (session['user_id'],))
-    return render_template('student/trash_messages.html', messages=cursor.fetchall())
+    msgs, next_cursor = list_messages(cursor, session['user_id'], 'Student', 'trash', after=request.args.get('after'))
+    return render_template('student/trash_messages.html', messages=msgs, next_cursor=next_cursor)
+
+
+@student_bp.route('/message/<int:msg_id>')
+def message_body(msg_id):
+    if 'user_id' not in session:
+        return redirect(url_for('auth.login'))
+    if session.get('role') != 'Student':
+        return jsonify({'error': 'Forbidden'}), 403
+
+    body = get_message_body(get_db().cursor(), msg_id, session['user_id'], 'Student')
+    if body is None:
+        return jsonify({'error': 'Message not found'}), 404
+    return jsonify({'id': msg_id, 'body': body})
 
 
 @student_bp.route('/send_message', methods=['POST'])
@@ -173,6 +140,8 @@ def send_message():
         VALUES (?, ?, ?, ?, 'Faculty', 0, ?)
     """, (session['user_id'], receiver_id, subject, body, now))
     db.commit()
+    invalidate_messages(receiver_id, 'Faculty')
+    publish_message(receiver_id, 'Faculty')
     flash('Message sent to faculty successfully.', 'success')
     return redirect(url_for('student.messages'))
 
@@ -185,16 +154,15 @@ def notifications():
 
     db = get_db()
     cursor = db.cursor()
-    cursor.execute("""
-        SELECT Message, CreatedAt, IsRead
-        FROM Notifications
-        WHERE user_id = ?
-        ORDER BY CreatedAt DESC
-    """, (session['user_id'],))
-    notifs = cursor.fetchall()
-    cursor.execute("UPDATE Notifications SET IsRead = 1 WHERE user_id = ?", (session['user_id'],))
-    db.commit()
-    return render_template('student/notifications.html', notifications=notifs)
+    student_id = get_student_id(cursor)
+    notifs, next_cursor = notification_page(cursor, session['user_id'], 'Student', student_id,
+                                            after=request.args.get('after'))
+    marked = mark_feed_read(cursor, session['user_id'], 'Student', student_id, notifs)
+    if marked:
+        db.commit()
+        adjust_unread_notifications(session['user_id'], -marked)
+        publish_notification(session['user_id'], -marked)
+    return render_template('student/notifications.html', notifications=notifs, next_cursor=next_cursor)
 
 
 # -------------------- UTILITIES --------------------
@@ -207,6 +175,7 @@ def delete_message(msg_id):
         WHERE MessageID = ? AND ReceiverID = ?
     """, (msg_id, session['user_id']))
     db.commit()
+    invalidate_messages(session['user_id'], 'Student')
     return redirect(url_for('student.messages'))
 
 
@@ -234,25 +203,29 @@ def restore_message(msg_id):
     return redirect(url_for('student.messages'))
 
 
-@student_bp.context_processor
-def inject_student_counts():
+@student_bp.route('/events')
+def events():
+    """Server-sent events with live unread counts for the sidebar badges."""
     if 'user_id' not in session:
-        return dict(unread_count=0, unread_msg_count=0)
+        return '', 401
+    if session.get('role') != 'Student':
+        return '', 403
+    if not current_app.config.get('LIVE_UNREAD_ENABLED'):
+        return '', 404
 
-    db = get_db()
-    cursor = db.cursor()
+    cursor = get_db().cursor()
     user_id = session['user_id']
+    return unread_events(cursor, user_id, 'Student', get_student_id(cursor), user_id)
 
-    cursor.execute("SELECT COUNT(*) FROM Notifications WHERE user_id = ? AND IsRead = 0", (user_id,))
-    unread_notifications = cursor.fetchone()[0]
 
-    cursor.execute("""
-        SELECT COUNT(*) FROM Messages
-        WHERE ReceiverID = ? AND ReceiverType = 'Student' AND IsRead = 0
-    """, (user_id,))
-    unread_messages = cursor.fetchone()[0]
+@student_bp.context_processor
+def inject_student_counts():
+    if 'user_id' not in session:
+        return dict(unread_count=0, unread_msg_count=0)
 
-    return dict(unread_count=unread_notifications, unread_msg_count=unread_messages)
+    user_id = session['user_id']
+    return dict(unread_count=unread_notifications(user_id, 'Student', get_student_id(None)),
+                unread_msg_count=unread_messages(user_id, 'Student'))
 
 
 # -------------------- COURSES & GRADES --------------------
@@ -267,10 +240,8 @@ def grades():
         SELECT c.CourseName, c.CourseCode, e.Grade, e.EnrollmentDate
         FROM Enrollments e
         JOIN Courses c ON e.CourseID = c.CourseID
-        JOIN Students s ON e.StudentID = s.StudentID
-        JOIN Users u ON s.Name = u.name
-        WHERE u.user_id = ?
-    """, (session['user_id'],))
+        WHERE e.StudentID = ?
+    """, (get_student_id(cursor),))
     return render_template('student/grades.html', grades=cursor.fetchall())
 
 
@@ -285,11 +256,9 @@ def courses():
         SELECT c.CourseName, c.CourseCode, f.Name, c.Description, c.Credits, c.Room, c.CourseID
         FROM Courses c
         JOIN Enrollments e ON c.CourseID = e.CourseID
-        JOIN Students s ON e.StudentID = s.StudentID
-        JOIN Users u ON s.Name = u.name
         LEFT JOIN Faculty f ON c.FacultyID = f.FacultyID
-        WHERE u.user_id = ?
-    """, (session['user_id'],))
+        WHERE e.StudentID = ?
+    """, (get_student_id(cursor),))
     return render_template('student/courses.html', courses=cursor.fetchall())
 
 
@@ -303,9 +272,13 @@ def mark_as_read(msg_id):
     cursor.execute("""
         UPDATE Messages
         SET IsRead = 1
-        WHERE MessageID = ? AND ReceiverID = ? AND ReceiverType = 'Student'
+        WHERE MessageID = ? AND ReceiverID = ? AND ReceiverType = 'Student' AND IsRead = 0
     """, (msg_id, session['user_id']))
+    marked = cursor.rowcount
     db.commit()
+    if marked > 0:
+        adjust_unread_messages(session['user_id'], 'Student', -marked)
+        publish_message(session['user_id'], 'Student', -marked)
     return redirect(url_for('student.messages'))
 
 
@@ -318,13 +291,17 @@ def course_detail(course_id):
     db = get_db()
     cursor = db.cursor()
     try:
-        cursor.execute("SELECT s.StudentID FROM Students s JOIN Users u ON s.Name = u.name WHERE u.user_id = ?", (session['user_id'],))
-        student_id = cursor.fetchone()[0]
+        student_id = get_student_id(cursor)
+        if student_id is None:
+            raise LookupError("Student profile not found")
 
         cursor.execute("SELECT CourseName, CourseCode, Room FROM Courses WHERE CourseID = ?", (course_id,))
         course_info = cursor.fetchone()
 
-        cursor.execute("SELECT AssignmentID, Title, Description FROM Assignments WHERE CourseID = ?", (course_id,))
+        cursor.execute("""
+            SELECT AssignmentID, Title, Description, COALESCE(AttachmentHash, AttachmentPath)
+            FROM Assignments WHERE CourseID = ?
+        """, (course_id,))
         assignments = cursor.fetchall()
 
         cursor.execute("SELECT AssignmentID FROM Submissions WHERE StudentID = ?", (student_id,))
@@ -340,7 +317,9 @@ def course_detail(course_id):
                                submitted_ids=submitted_ids,
                                course_id=course_id)
     except Exception as e:
-        return f"Error: {str(e)}"
+        handled_error("Course Detail Error", e)
+        flash("Error loading course details.", "danger")
+        return redirect(url_for('student.courses'))
 
 
 @student_bp.route('/submit_assignment/<int:assignment_id>', methods=['POST'])
@@ -356,23 +335,26 @@ def submit_assignment(assignment_id):
     db = get_db()
     cursor = db.cursor()
     try:
-        cursor.execute("SELECT StudentID FROM Students s JOIN Users u ON s.Name = u.name WHERE u.user_id = ?", (session['user_id'],))
-        student_id = cursor.fetchone()[0]
+        student_id = get_student_id(cursor)
+        if student_id is None:
+            raise LookupError("Student profile not found")
 
-        filename = file.filename
-        upload_path = os.path.join(current_app.root_path, 'static', 'uploads', filename)
-        os.makedirs(os.path.dirname(upload_path), exist_ok=True)
-        file.save(upload_path)
+        # Identical files are stored once; the row points at the blob by hash
+        file_hash, file_size = store_upload(file)
 
         now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         cursor.execute("""
-            INSERT INTO Submissions (AssignmentID, StudentID, FilePath, SubmissionDate)
-            VALUES (?, ?, ?, ?)
-        """, (assignment_id, student_id, filename, now))
+            INSERT INTO Submissions (AssignmentID, StudentID, FilePath, FileHash, FileName, FileSize, SubmissionDate)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (assignment_id, student_id, blob_relpath(file_hash), file_hash,
+              secure_filename(file.filename), file_size, now))
         db.commit()
+        # Preview image and text are made in the background
+        schedule_preview(file_hash, file.filename)
         flash('Assignment submitted successfully!', 'success')
     except Exception as e:
         db.rollback()
+        handled_error("Submission Error", e)
         flash(f'Submission failed: {str(e)}', 'danger')
     return redirect(request.referrer)
 
@@ -399,12 +381,10 @@ def enroll_in_course(course_id):
     db = get_db()
     cursor = db.cursor()
     try:
-        cursor.execute("SELECT s.StudentID FROM Students s JOIN Users u ON s.Name = u.name WHERE u.user_id = ?", (user_id,))
-        student = cursor.fetchone()
-        if not student:
+        student_id = get_student_id(cursor, user_id)
+        if student_id is None:
             flash("Student profile not found!", "danger")
             return redirect(url_for('student.enrollment'))
-        student_id = student[0]
 
         cursor.execute("SELECT * FROM Enrollments WHERE StudentID = ? AND CourseID = ?", (student_id, course_id))
         if cursor.fetchone():
@@ -413,11 +393,12 @@ def enroll_in_course(course_id):
 
         now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         cursor.execute("INSERT INTO Enrollments (StudentID, CourseID, EnrollmentDate) VALUES (?, ?, ?)", (student_id, course_id, now))
+        adjust_enrolled_count(cursor, course_id, 1)
         db.commit()
         flash("Successfully enrolled!", "success")
     except Exception as e:
         db.rollback()
-        print(f"!!! DATABASE ERROR: {e}")
+        handled_error("Enrollment Error", e)
         flash(f"Enrollment failed: {str(e)}", "danger")
     return redirect(url_for('student.enrollment'))
 
@@ -430,17 +411,17 @@ def drop_course(course_id):
     db = get_db()
     cursor = db.cursor()
     try:
-        cursor.execute("SELECT StudentID FROM Students s JOIN Users u ON s.Name = u.name WHERE u.user_id = ?", (session['user_id'],))
-        student = cursor.fetchone()
-        if student:
-            student_id = student[0]
+        student_id = get_student_id(cursor)
+        if student_id is not None:
+            invalidate_gpa(cursor, student_id)
             cursor.execute("DELETE FROM Enrollments WHERE CourseID = ? AND StudentID = ?", (course_id, student_id))
+            adjust_enrolled_count(cursor, course_id, -max(cursor.rowcount, 0))
             db.commit()
             flash("Course successfully dropped!", "success")
         else:
             flash("Error: Student record not found.", "danger")
     except Exception as e:
         db.rollback()
-        print(f"Drop Error: {e}")
+        handled_error("Drop Error", e)
         flash(f"Error dropping course: {str(e)}", "danger")
     return redirect(url_for('student.enrollment'))
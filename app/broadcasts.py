@@ -0,0 +1,216 @@
+from flask import current_app
+
+from app.pagination import encode_cursor, decode_cursor
+
+# A broadcast is stored once in Broadcasts together with its audience (role,
+# course, department; NULL means "everyone"). Who sees it is resolved at read
+# time, and each user's read state is one "read up to" watermark row in
+# BroadcastReads instead of a Notifications row per recipient.
+
+# Courses a profile belongs to, per role
+_COURSE_MEMBERSHIP = {
+    'Student': "SELECT CourseID FROM Enrollments WHERE StudentID = ?",
+    'Faculty': "SELECT CourseID FROM Courses WHERE FacultyID = ?",
+}
+
+# Department of a profile, per role
+_DEPARTMENT = {
+    'Student': "SELECT Department FROM Students WHERE StudentID = ?",
+    'Faculty': "SELECT Department FROM Faculty WHERE FacultyID = ?",
+}
+
+_WATERMARK = "COALESCE((SELECT LastReadBroadcastID FROM BroadcastReads WHERE user_id = ?), 0)"
+
+# Moves a watermark forward, creating it on first use; HOLDLOCK keeps two
+# first reads of the same user from both inserting
+_ADVANCE_WATERMARK = """
+    MERGE BroadcastReads WITH (HOLDLOCK) AS t
+    USING (SELECT ? AS user_id, ? AS LastReadBroadcastID) AS s
+    ON t.user_id = s.user_id
+    WHEN MATCHED THEN
+        UPDATE SET LastReadBroadcastID = CASE WHEN s.LastReadBroadcastID > t.LastReadBroadcastID
+                                              THEN s.LastReadBroadcastID ELSE t.LastReadBroadcastID END
+    WHEN NOT MATCHED THEN
+        INSERT (user_id, LastReadBroadcastID)
+        VALUES (s.user_id, s.LastReadBroadcastID);
+"""
+
+
+def _audience(role, profile_id):
+    """
+    Returns the WHERE fragment (on alias B) selecting the broadcasts visible to
+    a profile, and its parameters.
+    """
+    if role not in _COURSE_MEMBERSHIP:
+        return "1 = 0", ()
+    sql = (
+        "(B.TargetRole IS NULL OR B.TargetRole = ?)"
+        f" AND (B.CourseID IS NULL OR B.CourseID IN ({_COURSE_MEMBERSHIP[role]}))"
+        f" AND (B.Department IS NULL OR B.Department = ({_DEPARTMENT[role]}))"
+    )
+    return sql, (role, profile_id, profile_id)
+
+
+def audience_profile(cursor, role, profile_id):
+    """
+    Returns (department, course_ids) of a profile - what _audience() matches
+    broadcasts against - for filtering broadcasts outside SQL.
+    """
+    if role not in _COURSE_MEMBERSHIP or profile_id is None:
+        return None, []
+    cursor.execute(_DEPARTMENT[role], (profile_id,))
+    row = cursor.fetchone()
+    cursor.execute(_COURSE_MEMBERSHIP[role], (profile_id,))
+    return (row[0] if row else None), [course[0] for course in cursor.fetchall()]
+
+
+def publish(cursor, message, target_role=None, course_id=None, department=None):
+    """Stores a broadcast once; ``None`` for an audience field means everyone."""
+    cursor.execute("""
+        INSERT INTO Broadcasts (Message, TargetRole, CourseID, Department, CreatedAt)
+        VALUES (?, ?, ?, ?, GETDATE())
+    """, (message, target_role, course_id, department))
+
+
+def _seek(created_at, kind, item_id, after):
+    """
+    Returns the WHERE fragment continuing a feed branch of ``kind`` past the
+    cursor ``after`` = (CreatedAt, kind, id), and its parameters. The feed is
+    ordered by (CreatedAt, kind, id) descending, personal rows being kind 0 and
+    broadcasts kind 1. The cursor time is cast back to DATETIME so rows tying
+    with it compare equal.
+    """
+    if not after:
+        return "", ()
+    at, after_kind, after_id = after
+    if kind < after_kind:
+        return f" AND {created_at} <= CAST(? AS DATETIME)", (at,)
+    if kind > after_kind:
+        return f" AND {created_at} < CAST(? AS DATETIME)", (at,)
+    return (f" AND ({created_at} < CAST(? AS DATETIME) OR ({created_at} = CAST(? AS DATETIME) AND {item_id} < ?))",
+            (at, at, after_id))
+
+
+def notification_page(cursor, user_id, role, profile_id, after=None, page_size=None):
+    """
+    Returns (rows, next_cursor) for one page of a user's notifications, newest
+    first. Rows are (Message, CreatedAt, IsRead, BroadcastID, NotificationID):
+    personal Notifications rows (BroadcastID NULL) merged with the broadcasts
+    addressed to them. Each side is cut to one page before merging, and
+    ``after`` (a token from a previous page) is a keyset seek, not an OFFSET.
+    """
+    page_size = page_size or current_app.config.get('NOTIFICATIONS_PAGE_SIZE', 20)
+    position = decode_cursor(after, 2)
+
+    audience, audience_params = _audience(role, profile_id)
+    personal_seek, personal_params = _seek("N.CreatedAt", 0, "N.NotificationID", position)
+    broadcast_seek, broadcast_params = _seek("B.CreatedAt", 1, "B.BroadcastID", position)
+    cursor.execute(f"""
+        SELECT TOP (?) Message, CreatedAt, IsRead, BroadcastID, NotificationID FROM (
+            SELECT * FROM (
+                SELECT TOP (?) N.Message, N.CreatedAt, N.IsRead, NULL AS BroadcastID, N.NotificationID
+                FROM Notifications N
+                WHERE N.user_id = ?{personal_seek}
+                ORDER BY N.CreatedAt DESC, N.NotificationID DESC
+            ) personal
+            UNION ALL
+            SELECT * FROM (
+                SELECT TOP (?) B.Message, B.CreatedAt,
+                       CASE WHEN B.BroadcastID <= {_WATERMARK} THEN 1 ELSE 0 END AS IsRead,
+                       B.BroadcastID, NULL AS NotificationID
+                FROM Broadcasts B
+                WHERE {audience}{broadcast_seek}
+                ORDER BY B.CreatedAt DESC, B.BroadcastID DESC
+            ) broadcast
+        ) feed
+        ORDER BY CreatedAt DESC,
+                 CASE WHEN BroadcastID IS NULL THEN 0 ELSE 1 END DESC,
+                 COALESCE(BroadcastID, NotificationID) DESC
+    """, (page_size + 1, page_size + 1, user_id) + personal_params
+         + (page_size + 1, user_id) + audience_params + broadcast_params)
+    rows = cursor.fetchall()
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        if last[3] is None:
+            next_cursor = encode_cursor(last[1], 0, last[4])
+        else:
+            next_cursor = encode_cursor(last[1], 1, last[3])
+    return rows, next_cursor
+
+
+def notification_feed(cursor, user_id, role, profile_id, limit):
+    """Returns the newest ``limit`` feed rows, as notification_page() does."""
+    return notification_page(cursor, user_id, role, profile_id, page_size=limit)[0]
+
+
+def unread_count(cursor, user_id, role, profile_id):
+    """Counts unread personal notifications plus broadcasts past the watermark."""
+    audience, audience_params = _audience(role, profile_id)
+    cursor.execute(f"""
+        SELECT
+            (SELECT COUNT(*) FROM Notifications WHERE user_id = ? AND IsRead = 0)
+          + (SELECT COUNT(*) FROM Broadcasts B
+             WHERE B.BroadcastID > {_WATERMARK} AND {audience})
+    """, (user_id, user_id) + audience_params)
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
+
+def mark_read(cursor, user_id, up_to_broadcast_id):
+    """
+    Moves a user's watermark forward to ``up_to_broadcast_id``; it never moves
+    backwards. Does not commit.
+    """
+    if not up_to_broadcast_id:
+        return
+    cursor.execute(_ADVANCE_WATERMARK, (user_id, up_to_broadcast_id))
+
+
+def start_watermark(cursor, user_id):
+    """
+    Gives a new user a watermark at the newest broadcast, so only broadcasts
+    sent after the account was created show as unread. Does not commit.
+    """
+    cursor.execute("""
+        INSERT INTO BroadcastReads (user_id, LastReadBroadcastID)
+        SELECT ?, COALESCE(MAX(BroadcastID), 0) FROM Broadcasts
+    """, (user_id,))
+
+
+def mark_feed_read(cursor, user_id, role, profile_id, feed):
+    """
+    Marks read the unread rows of one page of the feed and nothing else:
+    personal rows by NotificationID, and broadcasts by moving the watermark up
+    to the newest shown broadcast that has no unread, unshown broadcast below
+    it. Returns how many notifications became read. Does not commit.
+    """
+    marked = 0
+    notification_ids = [row[4] for row in feed if row[3] is None and not row[2]]
+    if notification_ids:
+        placeholders = ', '.join('?' * len(notification_ids))
+        cursor.execute(f"""
+            UPDATE Notifications SET IsRead = 1
+            WHERE user_id = ? AND IsRead = 0 AND NotificationID IN ({placeholders})
+        """, [user_id] + notification_ids)
+        marked += max(cursor.rowcount, 0)
+
+    broadcast_ids = sorted(row[3] for row in feed if row[3] is not None and not row[2])
+    if broadcast_ids:
+        # The watermark cannot skip over an unread broadcast on another page
+        audience, audience_params = _audience(role, profile_id)
+        placeholders = ', '.join('?' * len(broadcast_ids))
+        cursor.execute(f"""
+            SELECT MIN(B.BroadcastID) FROM Broadcasts B
+            WHERE B.BroadcastID > {_WATERMARK} AND {audience}
+              AND B.BroadcastID NOT IN ({placeholders})
+        """, (user_id,) + audience_params + tuple(broadcast_ids))
+        row = cursor.fetchone()
+        unseen = row[0] if row else None
+        readable = [bid for bid in broadcast_ids if unseen is None or bid < unseen]
+        if readable:
+            mark_read(cursor, user_id, readable[-1])
+            marked += len(readable)
+    return marked
@@ -0,0 +1,79 @@
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Small thread-safe LRU mapping."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            value = self._data.get(key, _MISSING)
+            if value is _MISSING:
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class TTLCache(LRUCache):
+    """LRU mapping whose entries also expire ``ttl`` seconds after being set."""
+
+    def __init__(self, maxsize, ttl):
+        super().__init__(maxsize)
+        self.ttl = ttl
+
+    def get(self, key, default=None):
+        entry = super().get(key, _MISSING)
+        if entry is _MISSING:
+            return default
+        value, expires_at = entry
+        if time.monotonic() >= expires_at:
+            self.pop(key)
+            return default
+        return value
+
+    def set(self, key, value):
+        super().set(key, (value, time.monotonic() + self.ttl))
+
+    def update(self, key, func):
+        """
+        Applies ``func`` to a live entry in place, keeping its expiry.
+        Returns False (and changes nothing) when the key is not cached.
+        """
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING or time.monotonic() >= entry[1]:
+                return False
+            self._data[key] = (func(entry[0]), entry[1])
+            return True
+
+    def pop_matching(self, predicate):
+        """Drops every entry whose key satisfies ``predicate``."""
+        with self._lock:
+            for key in [k for k in self._data if predicate(k)]:
+                del self._data[key]
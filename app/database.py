@@ -1,33 +1,110 @@
-import pyodbc
+import os
+
 from flask import current_app, g
 
+from app.pool import ConnectionPool
+from app.sqltrace import TracedConnection, current_trace
+
+
+# --- Backends: each returns a function opening one DB-API connection ---
+def _mssql_connector(app):
+    # Imported here so the SQLite backend works without an ODBC driver installed
+    import pyodbc
+
+    def connect():
+        conn_str = app.config.get('DB_CONNECTION_STRING')
+        if not conn_str:
+            raise RuntimeError("Database connection string not configured")
+        return pyodbc.connect(conn_str)
+    return connect
+
+
+def sqlite_path(app):
+    return app.config.get('SQLITE_PATH') or os.path.join(app.instance_path, 'cms.sqlite3')
+
+
+def _sqlite_connector(app):
+    from app import sqlite_backend
+
+    path = sqlite_path(app)
+    sqlite_backend.bootstrap(path)
+
+    def connect():
+        return sqlite_backend.connect(path)
+    return connect
+
+
+BACKENDS = {
+    'mssql': _mssql_connector,
+    'sqlite': _sqlite_connector,
+}
+
+
+def _create_pool(app):
+    """
+    Builds the connection pool from the app configuration.
+    Connections are opened lazily; only the SQLite backend touches its
+    database file up front, to create the schema.
+    """
+    backend = app.config.get('DB_BACKEND', 'mssql')
+    if backend not in BACKENDS:
+        raise RuntimeError(f"Unknown DB_BACKEND {backend!r}, expected one of {', '.join(BACKENDS)}")
+    connect = BACKENDS[backend](app)
+
+    return ConnectionPool(
+        connect,
+        min_size=app.config.get('DB_POOL_MIN_SIZE', 1),
+        max_size=app.config.get('DB_POOL_MAX_SIZE', 10),
+        timeout=app.config.get('DB_POOL_TIMEOUT', 30),
+        recycle_uses=app.config.get('DB_POOL_RECYCLE_USES', 1000),
+        max_age=app.config.get('DB_POOL_MAX_AGE', 3600),
+        ping_after=app.config.get('DB_POOL_PING_AFTER', 5),
+    )
+
+
+def get_pool(app=None):
+    """
+    Returns the connection pool of the given (or current) app.
+    """
+    app = app or current_app
+    return app.extensions['db_pool']
+
 
 def get_db():
     """
     Returns a database connection for the current request.
-    Creates a new connection if one does not already exist.
+    Borrows one from the pool if one is not already checked out; on requests
+    sampled for SQL tracing it is wrapped to record every statement.
     """
     if 'db' not in g:
-        conn_str = current_app.config.get('DB_CONNECTION_STRING')
-        if not conn_str:
-            raise RuntimeError("Database connection string not configured")
-
-        g.db = pyodbc.connect(conn_str)
+        db = get_pool().acquire()
+        trace = current_trace()
+        g.db = TracedConnection(db, trace) if trace is not None else db
 
     return g.db
 
 
 def close_db(e=None):
     """
-    Closes the database connection at the end of the request.
+    Returns the request's database connection to the pool.
     """
     db = g.pop('db', None)
+    if isinstance(db, TracedConnection):
+        db = db.raw
     if db is not None:
-        db.close()
+        get_pool().release(db)
+
+
+def pool_stats():
+    """
+    Returns usage statistics for the current app's connection pool.
+    """
+    return get_pool().stats()
 
 
 def init_app(app):
     """
-    Registers database teardown handler with the Flask app.
+    Creates the connection pool and registers the teardown handler.
     """
+    app.extensions['db_pool'] = _create_pool(app)
     app.teardown_appcontext(close_db)
@@ -0,0 +1,112 @@
+from flask import current_app
+
+# GPA is the unweighted mean of grade points over graded enrollments. Points
+# come from the GRADE_POINTS config table; any other non-empty grade is worth
+# GPA_DEFAULT_POINTS. StudentGPA caches the running totals per student.
+# Grades are compared trimmed and upper-cased on both the SQL and the Python
+# side, so 'a' and 'A ' score the same as 'A' whatever the collation.
+
+
+def normalize_grade(grade):
+    """A grade as stored and looked up: trimmed and upper-cased; None stays None."""
+    return grade.strip().upper() if grade is not None else None
+
+
+def _grade_table():
+    points = {normalize_grade(grade): value for grade, value in current_app.config.get('GRADE_POINTS', {}).items()}
+    default = current_app.config.get('GPA_DEFAULT_POINTS', 2.0)
+    return points, default
+
+
+def grade_points(grade):
+    """Returns (points, counted) for a single grade value."""
+    grade = normalize_grade(grade)
+    if not grade:
+        return 0.0, 0
+    points, default = _grade_table()
+    return float(points.get(grade, default)), 1
+
+
+def _aggregate(cursor, student_id):
+    """
+    Computes (enrolled, total_points, graded) for a student in one aggregate
+    query, joining the grade table in as a VALUES list.
+    """
+    points, default = _grade_table()
+    if points:
+        rows = ', '.join(['(?, ?)'] * len(points))
+        grade_join = f"LEFT JOIN (VALUES {rows}) AS gp(Grade, Points) ON gp.Grade = UPPER(LTRIM(RTRIM(e.Grade)))"
+        grade_params = tuple(value for item in points.items() for value in item)
+        points_expr = "COALESCE(gp.Points, ?)"
+    else:
+        grade_join, grade_params, points_expr = "", (), "?"
+
+    cursor.execute(f"""
+        SELECT COUNT(*),
+               COALESCE(SUM(CASE WHEN LTRIM(RTRIM(e.Grade)) <> '' THEN {points_expr} END), 0),
+               COALESCE(SUM(CASE WHEN LTRIM(RTRIM(e.Grade)) <> '' THEN 1 ELSE 0 END), 0)
+        FROM Enrollments e
+        {grade_join}
+        WHERE e.StudentID = ?
+    """, (default,) + grade_params + (student_id,))
+    return cursor.fetchone()
+
+
+def _gpa(total_points, graded):
+    return round(total_points / graded, 2) if graded else 0.0
+
+
+def student_summary(db, student_id):
+    """
+    Returns (enrolled_courses, gpa) for a student. Reads the cached totals when
+    present; otherwise aggregates once and stores them.
+    """
+    cursor = db.cursor()
+    cursor.execute("""
+        SELECT (SELECT COUNT(*) FROM Enrollments WHERE StudentID = ?), TotalPoints, GradedCount
+        FROM StudentGPA WHERE StudentID = ?
+    """, (student_id, student_id))
+    row = cursor.fetchone()
+    if row:
+        return row[0], _gpa(row[1], row[2])
+
+    enrolled, total_points, graded = _aggregate(cursor, student_id)
+    if student_id is not None:
+        cursor.execute("""
+            INSERT INTO StudentGPA (StudentID, TotalPoints, GradedCount, UpdatedAt)
+            SELECT ?, ?, ?, GETDATE()
+            WHERE NOT EXISTS (SELECT 1 FROM StudentGPA WHERE StudentID = ?)
+        """, (student_id, total_points, graded, student_id))
+        db.commit()
+    return enrolled, _gpa(total_points, graded)
+
+
+def apply_grade_change(cursor, student_id, old_grade, new_grade):
+    """
+    Adjusts a student's cached totals for one grade change. Students without a
+    cached row are left alone; their next read aggregates from scratch.
+    Does not commit.
+    """
+    old_points, old_counted = grade_points(old_grade)
+    new_points, new_counted = grade_points(new_grade)
+    if (old_points, old_counted) == (new_points, new_counted):
+        return
+    cursor.execute("""
+        UPDATE StudentGPA
+        SET TotalPoints = TotalPoints + ?, GradedCount = GradedCount + ?, UpdatedAt = GETDATE()
+        WHERE StudentID = ?
+    """, (new_points - old_points, new_counted - old_counted, student_id))
+
+
+def invalidate(cursor, student_id=None, enrollment_id=None):
+    """
+    Drops a student's cached totals (looked up via ``enrollment_id`` if given),
+    e.g. before one of their enrollments is deleted. Does not commit.
+    """
+    if enrollment_id is not None:
+        cursor.execute("""
+            DELETE FROM StudentGPA
+            WHERE StudentID = (SELECT StudentID FROM Enrollments WHERE EnrollmentID = ?)
+        """, (enrollment_id,))
+    else:
+        cursor.execute("DELETE FROM StudentGPA WHERE StudentID = ?", (student_id,))
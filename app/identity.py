@@ -0,0 +1,78 @@
+from flask import session
+
+from app.cache import LRUCache
+from app.database import get_db
+
+# How many resolved user -> profile mappings each worker keeps in memory
+LRU_SIZE = 4096
+
+# Maps a session user_id onto the matching row of the role's profile table
+_PROFILE_QUERIES = {
+    'Student': "SELECT StudentID FROM Students WHERE user_id = ?",
+    'Faculty': "SELECT FacultyID FROM Faculty WHERE user_id = ?",
+}
+
+_profiles = LRUCache(LRU_SIZE)        # (role, user_id) -> profile_id
+
+
+def _resolve(cursor, role, user_id):
+    if cursor is None:
+        cursor = get_db().cursor()
+    cursor.execute(_PROFILE_QUERIES[role], (user_id,))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def _remember(role, user_id, profile_id):
+    _profiles.set((role, user_id), profile_id)
+    if session.get('user_id') == user_id:
+        session['profile'] = {'role': role, 'id': profile_id}
+
+
+def get_profile_id(cursor, role, user_id=None):
+    """
+    Returns the StudentID/FacultyID belonging to a user (default: the
+    logged-in user). Checks the session, then the in-process LRU, and only
+    queries the database on a miss (borrowing a cursor if ``cursor`` is None).
+    Missing profiles are never cached.
+    """
+    if user_id is None:
+        user_id = session.get('user_id')
+    if user_id is None:
+        return None
+
+    if session.get('user_id') == user_id:
+        cached = session.get('profile')
+        if cached and cached.get('role') == role:
+            return cached['id']
+
+    cached = _profiles.get((role, user_id))
+    if cached is not None:
+        if session.get('user_id') == user_id:
+            session['profile'] = {'role': role, 'id': cached}
+        return cached
+
+    profile_id = _resolve(cursor, role, user_id)
+    if profile_id is not None:
+        _remember(role, user_id, profile_id)
+    return profile_id
+
+
+def get_student_id(cursor, user_id=None):
+    return get_profile_id(cursor, 'Student', user_id)
+
+
+def get_faculty_id(cursor, user_id=None):
+    return get_profile_id(cursor, 'Faculty', user_id)
+
+
+def cache_profile_at_login(cursor, user_id, role):
+    """
+    Resolves the profile ID once while logging in so that later requests can
+    read it straight from the session.
+    """
+    session.pop('profile', None)
+    if role in _PROFILE_QUERIES:
+        _profiles.pop((role, user_id))
+        get_profile_id(cursor, role, user_id)
+
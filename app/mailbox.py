@@ -0,0 +1,58 @@
+from flask import current_app
+
+from app.pagination import encode_cursor, decode_cursor
+
+# Extra WHERE conditions for each mailbox folder
+FOLDERS = {
+    'inbox': "(IsDeleted = 0 OR IsDeleted IS NULL) AND (IsArchived = 0 OR IsArchived IS NULL)",
+    'archived': "IsArchived = 1 AND (IsDeleted = 0 OR IsDeleted IS NULL)",
+    'trash': "IsDeleted = 1",
+}
+
+
+def list_messages(cursor, receiver_id, receiver_type, folder, after=None, page_size=None):
+    """
+    Returns (rows, next_cursor) for one page of a folder, newest first. Rows are
+    (Subject, Preview, SentAt, IsRead, MessageID); the preview is a prefix of
+    the body, the full body is fetched separately with get_message_body().
+    Seeks past ``after`` (a token from a previous page) on (SentAt, MessageID)
+    instead of using OFFSET, so deep pages cost the same as the first.
+    """
+    page_size = page_size or current_app.config.get('MESSAGES_PAGE_SIZE', 25)
+    preview_chars = current_app.config.get('MESSAGE_PREVIEW_CHARS', 160)
+
+    where = f"ReceiverID = ? AND ReceiverType = ? AND {FOLDERS[folder]}"
+    params = [receiver_id, receiver_type]
+
+    # The cursor is bound as datetime2; cast it back so ties with the last
+    # row shown compare equal at DATETIME's 1/300 s precision
+    position = decode_cursor(after)
+    if position:
+        where += " AND (SentAt < CAST(? AS DATETIME) OR (SentAt = CAST(? AS DATETIME) AND MessageID < ?))"
+        params += [position[0], position[0], position[1]]
+
+    cursor.execute(f"""
+        SELECT TOP (?) Subject, LEFT(Body, ?) AS Preview, SentAt, IsRead, MessageID
+        FROM Messages
+        WHERE {where}
+        ORDER BY SentAt DESC, MessageID DESC
+    """, [page_size + 1, preview_chars] + params)
+    rows = cursor.fetchall()
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor(rows[-1][2], rows[-1][4])
+    return rows, next_cursor
+
+
+def get_message_body(cursor, message_id, receiver_id, receiver_type):
+    """
+    Returns the full body of one message addressed to ``receiver_id`` of
+    ``receiver_type``, or None. The type matters: student, faculty and admin
+    inboxes are keyed by different ID ranges that overlap.
+    """
+    cursor.execute("SELECT Body FROM Messages WHERE MessageID = ? AND ReceiverID = ? AND ReceiverType = ?",
+                   (message_id, receiver_id, receiver_type))
+    row = cursor.fetchone()
+    return row[0] if row else None
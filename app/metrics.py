@@ -0,0 +1,178 @@
+import bisect
+import hmac
+import logging
+import threading
+import time
+from collections import deque
+
+from flask import Response, current_app, g, has_request_context, request
+
+from app import sqltrace
+from app.database import pool_stats
+
+# Operational metrics in the Prometheus text format, served at /metrics:
+# per-route request counts and latency histograms, per-statement SQL call
+# counts and latency quantiles, connection pool gauges, and counters for the
+# errors the routes catch and recover from. Values live in this process; with
+# several worker processes Prometheus scrapes and sums each one.
+#
+# SQL numbers come from the requests sqltrace records: all of them with
+# SQL_TRACE_RECORD_ALL, otherwise only the sampled ones. Recorded statements
+# over SLOW_QUERY_SECONDS go to the slow-query log.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUANTILES = (0.5, 0.95, 0.99)
+# Latest durations kept per statement for its quantiles
+SQL_SAMPLES = 1024
+SQL_LABEL_CHARS = 200
+
+log = logging.getLogger('app.errors')
+slow_log = logging.getLogger('app.slow_sql')
+
+_lock = threading.Lock()
+_requests = {}        # (endpoint, method, status) -> count
+_latency = {}         # (endpoint, method) -> [bucket counts..., sum, count]
+_statements = {}      # normalized sql -> [calls, total seconds, deque of recent durations]
+_errors = {}          # (endpoint, label, exception type) -> count
+
+
+def handled_error(label, e, detail=None):
+    """
+    Records an exception a caller caught and recovered from: counts it by
+    endpoint, label and type, and logs it. ``label`` is a short fixed
+    description such as "Dashboard Error"; ``detail`` only goes to the log.
+    """
+    endpoint = request.endpoint if has_request_context() else None
+    key = (endpoint or 'background', label, type(e).__name__)
+    with _lock:
+        _errors[key] = _errors.get(key, 0) + 1
+    where = f"{key[0]}, {detail}" if detail else key[0]
+    log.error(f"{label} ({where}): {e}")
+
+
+# --- Collection ---
+def _start_timer():
+    g.metrics_started = time.perf_counter()
+
+
+def _observe_request(response):
+    started = g.pop('metrics_started', None)
+    if started is None:
+        return response
+    seconds = time.perf_counter() - started
+    endpoint = request.endpoint or 'unmatched'
+    with _lock:
+        key = (endpoint, request.method, response.status_code)
+        _requests[key] = _requests.get(key, 0) + 1
+        histogram = _latency.setdefault((endpoint, request.method), [0] * (len(LATENCY_BUCKETS) + 2))
+        histogram[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        histogram[-2] += seconds
+        histogram[-1] += 1
+    return response
+
+
+def _observe_statements(trace):
+    threshold = current_app.config.get('SLOW_QUERY_SECONDS', 0.5)
+    with _lock:
+        for statement in trace.statements:
+            sql = sqltrace.normalize(statement.sql)
+            entry = _statements.get(sql)
+            if entry is None:
+                entry = _statements[sql] = [0, 0.0, deque(maxlen=SQL_SAMPLES)]
+            entry[0] += 1
+            entry[1] += statement.seconds
+            entry[2].append(statement.seconds)
+    for statement in trace.statements:
+        if statement.seconds >= threshold:
+            slow_log.warning(f"{statement.seconds * 1000:.1f} ms ({trace.endpoint}) params={statement.params} "
+                             f"batch={statement.batch} rows={statement.rows}: {sqltrace.normalize(statement.sql)}")
+
+
+# --- Exposition ---
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def _quantile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    with _lock:
+        requests = dict(_requests)
+        latency = {key: list(values) for key, values in _latency.items()}
+        statements = {sql: (calls, total, sorted(samples)) for sql, (calls, total, samples) in _statements.items()}
+        errors = dict(_errors)
+
+    lines = ['# HELP cms_requests_total Requests by endpoint, method and status.',
+             '# TYPE cms_requests_total counter']
+    for (endpoint, method, status), count in sorted(requests.items()):
+        lines.append(f"cms_requests_total{_labels(endpoint=endpoint, method=method, status=status)} {count}")
+
+    lines += ['# HELP cms_request_duration_seconds Request latency by endpoint and method.',
+              '# TYPE cms_request_duration_seconds histogram']
+    for (endpoint, method), values in sorted(latency.items()):
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), values):
+            cumulative += count
+            labels = _labels(endpoint=endpoint, method=method, le=bound)
+            lines.append(f"cms_request_duration_seconds_bucket{labels} {cumulative}")
+        labels = _labels(endpoint=endpoint, method=method)
+        lines.append(f"cms_request_duration_seconds_sum{labels} {values[-2]:.6f}")
+        lines.append(f"cms_request_duration_seconds_count{labels} {values[-1]}")
+
+    lines += ['# HELP cms_sql_duration_seconds SQL statement latency; quantiles over the latest calls.',
+              '# TYPE cms_sql_duration_seconds summary']
+    for sql, (calls, total, ordered) in sorted(statements.items()):
+        label = sql[:SQL_LABEL_CHARS]
+        for q in QUANTILES:
+            lines.append(f"cms_sql_duration_seconds{_labels(sql=label, quantile=q)} {_quantile(ordered, q):.6f}")
+        lines.append(f"cms_sql_duration_seconds_sum{_labels(sql=label)} {total:.6f}")
+        lines.append(f"cms_sql_duration_seconds_count{_labels(sql=label)} {calls}")
+
+    lines += ['# HELP cms_handled_errors_total Exceptions caught and recovered from, by where and type.',
+              '# TYPE cms_handled_errors_total counter']
+    for (endpoint, label, kind), count in sorted(errors.items()):
+        lines.append(f"cms_handled_errors_total{_labels(endpoint=endpoint, error=label, type=kind)} {count}")
+
+    pool = pool_stats()
+    for name in ('size', 'idle', 'in_use', 'max_size', 'peak_in_use'):
+        lines += [f'# TYPE cms_db_pool_{name} gauge', f"cms_db_pool_{name} {pool[name]}"]
+    for name in ('checkouts', 'waits', 'timeouts', 'created', 'closed', 'recycled', 'failed_health_checks'):
+        lines += [f'# TYPE cms_db_pool_{name}_total counter', f"cms_db_pool_{name}_total {pool[name]}"]
+    lines += ['# TYPE cms_db_pool_wait_seconds_total counter', f"cms_db_pool_wait_seconds_total {pool['wait_seconds']}"]
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view():
+    token = current_app.config.get('METRICS_TOKEN')
+    if token:
+        supplied = request.headers.get('Authorization', '')
+        if not hmac.compare_digest(supplied.encode(), f"Bearer {token}".encode()):
+            return Response("Unauthorized\n", status=401, mimetype='text/plain')
+    elif not (current_app.config.get('METRICS_ALLOW_LOCAL') and request.remote_addr in ('127.0.0.1', '::1')):
+        # Statement texts are only served to a scraper that proves who it is
+        return Response("Forbidden\n", status=403, mimetype='text/plain')
+    return Response(render(), mimetype='text/plain; version=0.0.4')
+
+
+def init_app(app):
+    """Collects request and SQL metrics and serves them at /metrics (METRICS_ENABLED)."""
+    if not app.config.get('METRICS_ENABLED'):
+        return
+    app.before_request(_start_timer)
+    app.after_request(_observe_request)
+    if _observe_statements not in sqltrace.on_finished:
+        sqltrace.on_finished.append(_observe_statements)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
+
+    slow_file = app.config.get('SLOW_QUERY_LOG')
+    if slow_file and not slow_log.handlers:
+        handler = logging.FileHandler(slow_file, encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+        slow_log.addHandler(handler)
@@ -0,0 +1,564 @@
+# Versioned schema migrations. Each migration is a list of T-SQL statements
+# guarded so that running it against a database which already has (part of)
+# the change is a no-op; SchemaVersion records which versions were applied,
+# so migrate() only runs the ones that are missing, in order. Add new changes
+# as a new version at the end - never edit one that has shipped.
+
+SCHEMA_VERSION_TABLE = """
+IF OBJECT_ID('dbo.SchemaVersion', 'U') IS NULL
+    CREATE TABLE SchemaVersion (
+        Version INT PRIMARY KEY,
+        Description NVARCHAR(200) NOT NULL,
+        AppliedAt DATETIME NOT NULL DEFAULT GETDATE()
+    );
+"""
+
+
+def _index(name, table, definition):
+    """CREATE INDEX guarded by the table existing and the index not existing yet."""
+    return f"""
+IF OBJECT_ID('dbo.{table}', 'U') IS NOT NULL
+   AND NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = '{name}' AND object_id = OBJECT_ID('dbo.{table}'))
+    CREATE {definition.format(name=name, table=table)};
+"""
+
+
+def _column(table, column, definition):
+    """ALTER TABLE ADD guarded by the table existing and the column not existing yet."""
+    return f"""
+IF OBJECT_ID('dbo.{table}', 'U') IS NOT NULL AND COL_LENGTH('dbo.{table}', '{column}') IS NULL
+    ALTER TABLE {table} ADD {column} {definition};
+"""
+
+
+# --- 1. Base tables the blueprints query ---
+_BASE_TABLES = [
+    """
+IF OBJECT_ID('dbo.Users', 'U') IS NULL
+    CREATE TABLE Users (
+        user_id INT IDENTITY(1,1) PRIMARY KEY,
+        name VARCHAR(100) NOT NULL,
+        email VARCHAR(100) UNIQUE NOT NULL,
+        password VARCHAR(255) NOT NULL,
+        role VARCHAR(20) CHECK (role IN ('Admin', 'Faculty', 'Student')) NOT NULL
+    );
+""",
+    """
+IF OBJECT_ID('dbo.Students', 'U') IS NULL
+    CREATE TABLE Students (
+        StudentID INT IDENTITY(1,1) PRIMARY KEY,
+        Name VARCHAR(100) NOT NULL,
+        Email VARCHAR(100) NOT NULL,
+        Password VARCHAR(255) NULL,
+        Department VARCHAR(100) NULL
+    );
+""",
+    """
+IF OBJECT_ID('dbo.Faculty', 'U') IS NULL
+    CREATE TABLE Faculty (
+        FacultyID INT IDENTITY(1,1) PRIMARY KEY,
+        Name VARCHAR(100) NOT NULL,
+        Email VARCHAR(100) NOT NULL,
+        Password VARCHAR(255) NULL,
+        Department VARCHAR(100) NULL,
+        Designation VARCHAR(100) NULL
+    );
+""",
+    """
+IF OBJECT_ID('dbo.Courses', 'U') IS NULL
+    CREATE TABLE Courses (
+        CourseID INT IDENTITY(1,1) PRIMARY KEY,
+        CourseCode VARCHAR(20) UNIQUE NOT NULL,
+        CourseName VARCHAR(100) NOT NULL,
+        Description NVARCHAR(MAX) NULL,
+        FacultyID INT NULL REFERENCES Faculty(FacultyID),
+        Credits INT NOT NULL DEFAULT 3,
+        Room VARCHAR(20) NULL,
+        Status VARCHAR(20) NOT NULL DEFAULT 'active',
+        capacity INT NOT NULL DEFAULT 30,
+        enrolled_count INT NOT NULL DEFAULT 0
+    );
+""",
+    _column('Courses', 'Status', "VARCHAR(20) NOT NULL DEFAULT 'active'"),
+    _column('Courses', 'enrolled_count', "INT NOT NULL DEFAULT 0"),
+    """
+IF OBJECT_ID('dbo.Enrollments', 'U') IS NULL
+    CREATE TABLE Enrollments (
+        EnrollmentID INT IDENTITY(1,1) PRIMARY KEY,
+        StudentID INT NOT NULL REFERENCES Students(StudentID),
+        CourseID INT NOT NULL REFERENCES Courses(CourseID),
+        Grade VARCHAR(5) NULL,
+        EnrollmentDate DATETIME NOT NULL DEFAULT GETDATE(),
+        attendance_percentage FLOAT NOT NULL DEFAULT 0,
+        CONSTRAINT UQ_Enrollments_Student_Course UNIQUE (StudentID, CourseID)
+    );
+""",
+    _column('Enrollments', 'attendance_percentage', "FLOAT NOT NULL DEFAULT 0"),
+    """
+IF OBJECT_ID('dbo.Assignments', 'U') IS NULL
+    CREATE TABLE Assignments (
+        AssignmentID INT IDENTITY(1,1) PRIMARY KEY,
+        CourseID INT NOT NULL REFERENCES Courses(CourseID),
+        Title NVARCHAR(200) NOT NULL,
+        Description NVARCHAR(MAX) NULL,
+        Deadline DATETIME NULL,
+        AttachmentPath NVARCHAR(500) NULL,
+        CreatedAt DATETIME NOT NULL DEFAULT GETDATE()
+    );
+""",
+    """
+IF OBJECT_ID('dbo.Attendance', 'U') IS NULL
+    CREATE TABLE Attendance (
+        AttendanceID INT IDENTITY(1,1) PRIMARY KEY,
+        CourseID INT NOT NULL REFERENCES Courses(CourseID),
+        StudentID INT NOT NULL REFERENCES Students(StudentID),
+        AttendanceDate DATE NOT NULL,
+        Status VARCHAR(10) NOT NULL CHECK (Status IN ('Present', 'Absent', 'Late'))
+    );
+""",
+    """
+IF OBJECT_ID('dbo.Submissions', 'U') IS NULL
+    CREATE TABLE Submissions (
+        SubmissionID INT IDENTITY(1,1) PRIMARY KEY,
+        AssignmentID INT NOT NULL REFERENCES Assignments(AssignmentID),
+        StudentID INT NOT NULL REFERENCES Students(StudentID),
+        FilePath NVARCHAR(500) NOT NULL,
+        SubmissionDate DATETIME NOT NULL DEFAULT GETDATE()
+    );
+""",
+    """
+IF OBJECT_ID('dbo.Messages', 'U') IS NULL
+    CREATE TABLE Messages (
+        MessageID INT IDENTITY(1,1) PRIMARY KEY,
+        SenderID INT NOT NULL,
+        ReceiverID INT NOT NULL,
+        ReceiverType VARCHAR(20) NULL,
+        Subject NVARCHAR(200) NULL,
+        Body NVARCHAR(MAX) NULL,
+        SentAt DATETIME NOT NULL DEFAULT GETDATE(),
+        IsRead BIT NOT NULL DEFAULT 0,
+        IsArchived BIT NOT NULL DEFAULT 0,
+        IsDeleted BIT NOT NULL DEFAULT 0
+    );
+""",
+    _column('Messages', 'IsArchived', "BIT NOT NULL DEFAULT 0"),
+    _column('Messages', 'IsDeleted', "BIT NOT NULL DEFAULT 0"),
+    """
+IF OBJECT_ID('dbo.Notifications', 'U') IS NULL
+    CREATE TABLE Notifications (
+        NotificationID INT IDENTITY(1,1) PRIMARY KEY,
+        user_id INT NOT NULL REFERENCES Users(user_id),
+        Message NVARCHAR(MAX) NOT NULL,
+        IsRead BIT NOT NULL DEFAULT 0,
+        CreatedAt DATETIME NOT NULL DEFAULT GETDATE()
+    );
+""",
+    """
+IF OBJECT_ID('dbo.portal_settings', 'U') IS NULL
+    CREATE TABLE portal_settings (
+        setting_name VARCHAR(50) PRIMARY KEY,
+        is_active BIT NOT NULL DEFAULT 1
+    );
+""",
+    """
+IF NOT EXISTS (SELECT 1 FROM portal_settings WHERE setting_name = 'enrollment_status')
+    INSERT INTO portal_settings (setting_name, is_active) VALUES ('enrollment_status', 1);
+""",
+]
+
+# --- 2. Tables derived from the base tables ---
+_DERIVED_TABLES = [
+    """
+-- Broadcasts are stored once; audience columns left NULL mean "everyone"
+IF OBJECT_ID('dbo.Broadcasts', 'U') IS NULL
+    CREATE TABLE Broadcasts (
+        BroadcastID INT IDENTITY(1,1) PRIMARY KEY,
+        Message NVARCHAR(MAX) NOT NULL,
+        TargetRole VARCHAR(20) NULL,
+        CourseID INT NULL,
+        Department VARCHAR(100) NULL,
+        CreatedAt DATETIME NOT NULL DEFAULT GETDATE()
+    );
+""",
+    """
+-- Per-user "read up to" watermark over Broadcasts
+IF OBJECT_ID('dbo.BroadcastReads', 'U') IS NULL
+    CREATE TABLE BroadcastReads (
+        user_id INT PRIMARY KEY REFERENCES Users(user_id),
+        LastReadBroadcastID INT NOT NULL DEFAULT 0
+    );
+""",
+    """
+-- Cached GPA totals per student, kept current by faculty.update_grade
+IF OBJECT_ID('dbo.StudentGPA', 'U') IS NULL
+    CREATE TABLE StudentGPA (
+        StudentID INT PRIMARY KEY,
+        TotalPoints FLOAT NOT NULL DEFAULT 0,
+        GradedCount INT NOT NULL DEFAULT 0,
+        GPA AS CASE WHEN GradedCount > 0 THEN ROUND(TotalPoints / GradedCount, 2) ELSE 0 END,
+        UpdatedAt DATETIME NOT NULL DEFAULT GETDATE()
+    );
+""",
+    """
+-- Read notifications moved out of Notifications by archive_notifications.py
+IF OBJECT_ID('dbo.NotificationsArchive', 'U') IS NULL
+    CREATE TABLE NotificationsArchive (
+        NotificationID INT PRIMARY KEY,
+        user_id INT NOT NULL,
+        Message NVARCHAR(MAX) NOT NULL,
+        IsRead BIT NOT NULL,
+        CreatedAt DATETIME NOT NULL,
+        ArchivedAt DATETIME NOT NULL DEFAULT GETDATE()
+    );
+""",
+]
+
+# --- 3. Uploads reference content-addressed blobs by SHA-256 ---
+_UPLOAD_COLUMNS = [
+    _column('Submissions', 'FileHash', "CHAR(64) NULL"),
+    _column('Submissions', 'FileName', "NVARCHAR(255) NULL"),
+    _column('Submissions', 'FileSize', "BIGINT NULL"),
+    _column('Assignments', 'AttachmentHash', "CHAR(64) NULL"),
+    _column('Assignments', 'AttachmentName', "NVARCHAR(255) NULL"),
+]
+
+# --- 4. Near-duplicate index over submission text (app/similarity.py) ---
+_SIMILARITY_TABLES = [
+    """
+IF OBJECT_ID('dbo.SubmissionSignatures', 'U') IS NULL
+    CREATE TABLE SubmissionSignatures (
+        SubmissionID INT PRIMARY KEY,
+        AssignmentID INT NOT NULL,
+        Signature VARBINARY(512) NOT NULL,
+        UpdatedAt DATETIME NOT NULL DEFAULT GETDATE()
+    );
+""",
+    """
+IF OBJECT_ID('dbo.SubmissionLSH', 'U') IS NULL
+    CREATE TABLE SubmissionLSH (
+        AssignmentID INT NOT NULL,
+        Band TINYINT NOT NULL,
+        BucketHash BIGINT NOT NULL,
+        SubmissionID INT NOT NULL,
+        PRIMARY KEY (AssignmentID, Band, BucketHash, SubmissionID)
+    );
+""",
+    """
+IF OBJECT_ID('dbo.SubmissionSimilarity', 'U') IS NULL
+    CREATE TABLE SubmissionSimilarity (
+        AssignmentID INT NOT NULL,
+        SubmissionID INT NOT NULL,
+        OtherSubmissionID INT NOT NULL,
+        Score FLOAT NOT NULL,
+        PRIMARY KEY (SubmissionID, OtherSubmissionID)
+    );
+""",
+]
+
+# --- 5. Indexes for the paginated feeds: (name, table, definition) ---
+_FEED_INDEXES = [
+    # Keyset pagination of message folders: seek on receiver + folder, ordered by SentAt
+    ('IX_Messages_Receiver_Folder_SentAt', 'Messages',
+     "INDEX {name} ON {table} (ReceiverID, ReceiverType, IsDeleted, IsArchived, SentAt DESC) "
+     "INCLUDE (Subject, IsRead)"),
+    # Keyset pagination of a user's notifications, newest first
+    ('IX_Notifications_User_CreatedAt', 'Notifications',
+     "INDEX {name} ON {table} (user_id, CreatedAt DESC, NotificationID DESC) INCLUDE (IsRead)"),
+    # Retention scan for archive_notifications.py: only read rows, oldest first
+    ('IX_Notifications_Read_CreatedAt', 'Notifications',
+     "INDEX {name} ON {table} (CreatedAt) WHERE IsRead = 1"),
+    # Broadcast feed pages are read newest first
+    ('IX_Broadcasts_CreatedAt', 'Broadcasts',
+     "INDEX {name} ON {table} (CreatedAt DESC, BroadcastID DESC)"),
+    ('IX_SubmissionSimilarity_Assignment', 'SubmissionSimilarity',
+     "INDEX {name} ON {table} (AssignmentID, SubmissionID, Score DESC)"),
+]
+
+# --- 6. Covering indexes for the per-request lookups ---
+_LOOKUP_INDEXES = [
+    # Unread message badge: COUNT(*) over a receiver's unread rows only
+    ('IX_Messages_Receiver_Unread', 'Messages',
+     "INDEX {name} ON {table} (ReceiverID, ReceiverType) WHERE IsRead = 0"),
+    # Unread notification badge and mark-read
+    ('IX_Notifications_User_IsRead', 'Notifications',
+     "INDEX {name} ON {table} (user_id, IsRead)"),
+    # A student's courses, grades and GPA
+    ('IX_Enrollments_Student', 'Enrollments',
+     "INDEX {name} ON {table} (StudentID) INCLUDE (CourseID, Grade, EnrollmentDate)"),
+    # A course's roster, counters and attendance rollup
+    ('IX_Enrollments_Course', 'Enrollments',
+     "INDEX {name} ON {table} (CourseID) INCLUDE (StudentID, Grade, attendance_percentage)"),
+    # Attendance history, the MERGE upsert and the percentage rollup
+    ('IX_Attendance_Course_Student', 'Attendance',
+     "INDEX {name} ON {table} (CourseID, StudentID, AttendanceDate) INCLUDE (Status)"),
+    # Submission lists and the ZIP download of an assignment
+    ('IX_Submissions_Assignment', 'Submissions',
+     "INDEX {name} ON {table} (AssignmentID) "
+     "INCLUDE (StudentID, SubmissionDate, FileHash, FileName, FilePath)"),
+    # Which submissions share a freshly extracted blob (similarity hook)
+    ('IX_Submissions_FileHash', 'Submissions',
+     "INDEX {name} ON {table} (FileHash) WHERE FileHash IS NOT NULL"),
+    # A faculty member's courses, and the active course catalogue
+    ('IX_Courses_Faculty', 'Courses',
+     "INDEX {name} ON {table} (FacultyID) INCLUDE (CourseCode, CourseName, Credits, Room, Status)"),
+    # Assignment lists of a course
+    ('IX_Assignments_Course', 'Assignments',
+     "INDEX {name} ON {table} (CourseID, Deadline)"),
+]
+
+# --- 7. Link Students/Faculty to Users by integer key instead of name/email ---
+def _link_profiles(table, key, role):
+    """
+    Adds <table>.user_id and backfills it: first by email, then by name, and
+    only where the match is unambiguous on both sides. Rows left NULL are
+    listed by unlinked_profiles() for an admin to resolve by hand.
+    """
+    def backfill(column, user_column):
+        return f"""
+UPDATE p SET user_id = u.user_id
+FROM {table} p
+JOIN Users u ON u.role = '{role}' AND LOWER(LTRIM(RTRIM(u.{user_column}))) = LOWER(LTRIM(RTRIM(p.{column})))
+WHERE p.user_id IS NULL
+  AND (SELECT COUNT(*) FROM Users u2
+       WHERE u2.role = '{role}' AND LOWER(LTRIM(RTRIM(u2.{user_column}))) = LOWER(LTRIM(RTRIM(p.{column})))) = 1
+  AND (SELECT COUNT(*) FROM {table} p2
+       WHERE LOWER(LTRIM(RTRIM(p2.{column}))) = LOWER(LTRIM(RTRIM(p.{column})))) = 1
+  AND NOT EXISTS (SELECT 1 FROM {table} p3 WHERE p3.user_id = u.user_id);
+"""
+    return [
+        _column(table, 'user_id', "INT NULL"),
+        backfill('Email', 'email'),
+        backfill('Name', 'name'),
+        f"""
+IF OBJECT_ID('FK_{table}_Users', 'F') IS NULL
+    ALTER TABLE {table} ADD CONSTRAINT FK_{table}_Users FOREIGN KEY (user_id) REFERENCES Users(user_id);
+""",
+        _index(f'UX_{table}_User', table, "UNIQUE INDEX {name} ON {table} (user_id) "
+                                          f"INCLUDE ({key}) WHERE user_id IS NOT NULL"),
+    ]
+
+
+_PROFILE_LINKS = _link_profiles('Students', 'StudentID', 'Student') + _link_profiles('Faculty', 'FacultyID', 'Faculty')
+
+# --- 8. Indexes for the admin student directory: keyset pages per sort and filter ---
+_DIRECTORY_INDEXES = [
+    # Sorted by name, and name prefix search
+    ('IX_Students_Name', 'Students',
+     "INDEX {name} ON {table} (Name, StudentID) INCLUDE (Email, Department)"),
+    # One department, newest first
+    ('IX_Students_Department', 'Students',
+     "INDEX {name} ON {table} (Department, StudentID) INCLUDE (Name, Email)"),
+    # One department, by name
+    ('IX_Students_Department_Name', 'Students',
+     "INDEX {name} ON {table} (Department, Name, StudentID) INCLUDE (Email)"),
+]
+
+# --- 9. Broadcast watermarks for users who have none yet ---
+# Without a BroadcastReads row every broadcast ever sent counts as unread, so
+# accounts start at the newest broadcast, as admin.add_student/add_faculty do
+_WATERMARK_BACKFILL = [
+    """
+INSERT INTO BroadcastReads (user_id, LastReadBroadcastID)
+SELECT u.user_id, (SELECT COALESCE(MAX(BroadcastID), 0) FROM Broadcasts)
+FROM Users u
+WHERE NOT EXISTS (SELECT 1 FROM BroadcastReads r WHERE r.user_id = u.user_id);
+""",
+]
+
+# --- 10. One attendance row per course, student and day ---
+# Imports before the MERGE upsert could add the same day twice, which skews
+# attendance_percentage; keep the newest row of each day, then enforce it.
+# Migration 11 then rebuilds the attendance counters from the remaining rows.
+_ATTENDANCE_UNIQUE = [
+    """
+DELETE a FROM Attendance a
+WHERE EXISTS (SELECT 1 FROM Attendance b
+              WHERE b.CourseID = a.CourseID AND b.StudentID = a.StudentID
+                AND b.AttendanceDate = a.AttendanceDate AND b.AttendanceID > a.AttendanceID);
+""",
+    _index('UX_Attendance_Course_Student_Date', 'Attendance',
+           "UNIQUE INDEX {name} ON {table} (CourseID, StudentID, AttendanceDate) INCLUDE (Status)"),
+]
+
+# --- 11. Attended/held counts per enrollment, so attendance writes apply deltas ---
+_ATTENDANCE_COUNTS = [
+    _column('Enrollments', 'attended_count', "INT NOT NULL DEFAULT 0"),
+    _column('Enrollments', 'held_count', "INT NOT NULL DEFAULT 0"),
+    """
+UPDATE e SET attended_count = agg.Attended, held_count = agg.Held,
+             attendance_percentage = 100.0 * agg.Attended / agg.Held
+FROM Enrollments e
+JOIN (SELECT CourseID, StudentID, COUNT(*) AS Held,
+             SUM(CASE WHEN Status IN ('Present', 'Late') THEN 1 ELSE 0 END) AS Attended
+      FROM Attendance GROUP BY CourseID, StudentID) agg
+    ON agg.CourseID = e.CourseID AND agg.StudentID = e.StudentID;
+""",
+]
+
+# (version, description, statements), in the order they are applied
+MIGRATIONS = [
+    (1, "Base tables used by the blueprints", _BASE_TABLES),
+    (2, "Broadcasts, GPA cache and notification archive", _DERIVED_TABLES),
+    (3, "Content-addressed upload columns", _UPLOAD_COLUMNS),
+    (4, "Submission similarity index tables", _SIMILARITY_TABLES),
+    (5, "Indexes for the paginated feeds", [_index(*spec) for spec in _FEED_INDEXES]),
+    (6, "Covering indexes for per-request lookups", [_index(*spec) for spec in _LOOKUP_INDEXES]),
+    (7, "Students.user_id and Faculty.user_id foreign keys, backfilled", _PROFILE_LINKS),
+    (8, "Indexes for the paginated student directory", [_index(*spec) for spec in _DIRECTORY_INDEXES]),
+    (9, "Broadcast watermarks for existing users", _WATERMARK_BACKFILL),
+    (10, "Unique attendance per course, student and day, deduplicated", _ATTENDANCE_UNIQUE),
+    (11, "Enrollments.attended_count and held_count, backfilled", _ATTENDANCE_COUNTS),
+]
+
+# Tables and columns the code expects after the last migration, for check_tables.py
+EXPECTED_COLUMNS = {
+    'SchemaVersion': ['Version', 'Description', 'AppliedAt'],
+    'Users': ['user_id', 'name', 'email', 'password', 'role'],
+    'Students': ['StudentID', 'user_id', 'Name', 'Email', 'Password', 'Department'],
+    'Faculty': ['FacultyID', 'user_id', 'Name', 'Email', 'Password', 'Department', 'Designation'],
+    'Courses': ['CourseID', 'CourseCode', 'CourseName', 'Description', 'FacultyID', 'Credits', 'Room',
+                'Status', 'capacity', 'enrolled_count'],
+    'Enrollments': ['EnrollmentID', 'StudentID', 'CourseID', 'Grade', 'EnrollmentDate', 'attendance_percentage',
+                    'attended_count', 'held_count'],
+    'Assignments': ['AssignmentID', 'CourseID', 'Title', 'Description', 'Deadline', 'AttachmentPath',
+                    'AttachmentHash', 'AttachmentName', 'CreatedAt'],
+    'Attendance': ['CourseID', 'StudentID', 'AttendanceDate', 'Status'],
+    'Submissions': ['SubmissionID', 'AssignmentID', 'StudentID', 'FilePath', 'SubmissionDate',
+                    'FileHash', 'FileName', 'FileSize'],
+    'Messages': ['MessageID', 'SenderID', 'ReceiverID', 'ReceiverType', 'Subject', 'Body', 'SentAt',
+                 'IsRead', 'IsArchived', 'IsDeleted'],
+    'Notifications': ['NotificationID', 'user_id', 'Message', 'IsRead', 'CreatedAt'],
+    'portal_settings': ['setting_name', 'is_active'],
+    'Broadcasts': ['BroadcastID', 'Message', 'TargetRole', 'CourseID', 'Department', 'CreatedAt'],
+    'BroadcastReads': ['user_id', 'LastReadBroadcastID'],
+    'StudentGPA': ['StudentID', 'TotalPoints', 'GradedCount', 'GPA', 'UpdatedAt'],
+    'NotificationsArchive': ['NotificationID', 'user_id', 'Message', 'IsRead', 'CreatedAt', 'ArchivedAt'],
+    'SubmissionSignatures': ['SubmissionID', 'AssignmentID', 'Signature', 'UpdatedAt'],
+    'SubmissionLSH': ['AssignmentID', 'Band', 'BucketHash', 'SubmissionID'],
+    'SubmissionSimilarity': ['AssignmentID', 'SubmissionID', 'OtherSubmissionID', 'Score'],
+}
+
+# (table, index name) of every index created by a migration
+EXPECTED_INDEXES = [(table, name) for name, table, _ in _FEED_INDEXES + _LOOKUP_INDEXES + _DIRECTORY_INDEXES] + [
+    ('Students', 'UX_Students_User'), ('Faculty', 'UX_Faculty_User'),
+    ('Attendance', 'UX_Attendance_Course_Student_Date'),
+]
+
+
+# Demo accounts for a fresh database (create_tables.py, and the SQLite backend)
+SEED_SCRIPT = """
+INSERT INTO Users (name, email, password, role) VALUES
+('Super Admin', 'admin@uni.com', 'admin123', 'Admin'),
+('Sir Ali', 'ali@uni.com', 'teacher123', 'Faculty'),
+('Ahmed Khan', 'ahmed@uni.com', 'student123', 'Student');
+
+INSERT INTO Faculty (user_id, Name, Email, Password, Department, Designation)
+SELECT user_id, name, email, password, 'Computer Science', 'Lecturer' FROM Users WHERE email = 'ali@uni.com';
+
+INSERT INTO Students (user_id, Name, Email, Password, Department)
+SELECT user_id, name, email, password, 'Computer Science' FROM Users WHERE email = 'ahmed@uni.com';
+"""
+
+
+# --- Runner ---
+def applied_versions(cursor, create=True):
+    """Versions recorded in SchemaVersion; creates the table first unless ``create`` is False."""
+    if create:
+        cursor.execute(SCHEMA_VERSION_TABLE)
+    else:
+        cursor.execute("SELECT OBJECT_ID('dbo.SchemaVersion', 'U')")
+        if cursor.fetchone()[0] is None:
+            return set()
+    cursor.execute("SELECT Version FROM SchemaVersion")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def pending(db):
+    """(version, description) of the migrations not applied yet, in order. Read-only."""
+    applied = applied_versions(db.cursor(), create=False)
+    return [(version, description) for version, description, _ in MIGRATIONS if version not in applied]
+
+
+def migrate(db, target=None):
+    """
+    Applies every pending migration up to ``target`` (default: all), each in
+    its own transaction together with its SchemaVersion row. Returns the
+    (version, description) pairs that were applied.
+    """
+    cursor = db.cursor()
+    applied = applied_versions(cursor)
+    db.commit()
+
+    done = []
+    for version, description, statements in MIGRATIONS:
+        if version in applied or (target is not None and version > target):
+            continue
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+            cursor.execute("INSERT INTO SchemaVersion (Version, Description) VALUES (?, ?)",
+                           (version, description))
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        done.append((version, description))
+    return done
+
+
+# --- Drift ---
+def schema_drift(cursor):
+    """
+    Compares the live schema with EXPECTED_COLUMNS and EXPECTED_INDEXES.
+    Returns {'tables': [...], 'columns': [(table, column)], 'indexes': [(table, index)],
+    'extra_tables': [...]}.
+    """
+    cursor.execute("""
+        SELECT c.TABLE_NAME, c.COLUMN_NAME
+        FROM INFORMATION_SCHEMA.COLUMNS c
+        JOIN INFORMATION_SCHEMA.TABLES t ON t.TABLE_NAME = c.TABLE_NAME AND t.TABLE_SCHEMA = c.TABLE_SCHEMA
+        WHERE t.TABLE_TYPE = 'BASE TABLE' AND t.TABLE_SCHEMA = 'dbo'
+    """)
+    live = {}
+    for table, column in cursor.fetchall():
+        live.setdefault(table.lower(), set()).add(column.lower())
+
+    cursor.execute("""
+        SELECT OBJECT_NAME(object_id), name FROM sys.indexes
+        WHERE name IS NOT NULL AND OBJECTPROPERTY(object_id, 'IsUserTable') = 1
+    """)
+    live_indexes = {(table.lower(), name.lower()) for table, name in cursor.fetchall()}
+
+    expected = {table.lower() for table in EXPECTED_COLUMNS}
+    report = {'tables': [], 'columns': [], 'indexes': [],
+              'extra_tables': sorted(table for table in live if table not in expected)}
+    for table, columns in EXPECTED_COLUMNS.items():
+        if table.lower() not in live:
+            report['tables'].append(table)
+            continue
+        report['columns'] += [(table, column) for column in columns
+                              if column.lower() not in live[table.lower()]]
+    report['indexes'] = [(table, name) for table, name in EXPECTED_INDEXES
+                         if table.lower() in live and (table.lower(), name.lower()) not in live_indexes]
+    return report
+
+
+def unlinked_profiles(cursor):
+    """
+    Students/Faculty rows without a user_id, as (role, profile_id, name, email,
+    users matching the email, users matching the name). Zero matches means
+    there is no login for the profile; more than one, or a profile sharing its
+    email/name with another, is a duplicate the backfill would not guess at.
+    """
+    cursor.execute("""
+        SELECT 'Student', s.StudentID, s.Name, s.Email,
+               (SELECT COUNT(*) FROM Users u WHERE u.role = 'Student' AND u.email = s.Email),
+               (SELECT COUNT(*) FROM Users u WHERE u.role = 'Student' AND u.name = s.Name)
+        FROM Students s WHERE s.user_id IS NULL
+        UNION ALL
+        SELECT 'Faculty', f.FacultyID, f.Name, f.Email,
+               (SELECT COUNT(*) FROM Users u WHERE u.role = 'Faculty' AND u.email = f.Email),
+               (SELECT COUNT(*) FROM Users u WHERE u.role = 'Faculty' AND u.name = f.Name)
+        FROM Faculty f WHERE f.user_id IS NULL
+    """)
+    return cursor.fetchall()
@@ -0,0 +1,53 @@
+import base64
+import json
+from datetime import datetime
+
+# Keyset pagination cursors: the sort key of the last row shown, a timestamp
+# followed by integer tie-breakers, packed into an opaque URL-safe token.
+# Lists sorted on other columns use encode_position(), which takes any mix of
+# strings, integers and NULLs.
+
+
+def encode_cursor(timestamp, *keys):
+    raw = '|'.join([timestamp.isoformat()] + [str(key) for key in keys]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token, key_count=1):
+    """
+    Reverses encode_cursor(); returns (timestamp, *keys) or None for a missing
+    or malformed token.
+    """
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+        parts = raw.split('|')
+        if len(parts) != key_count + 1:
+            return None
+        return (datetime.fromisoformat(parts[0]),) + tuple(int(part) for part in parts[1:])
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def encode_position(*values):
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_position(token, key_count):
+    """
+    Reverses encode_position(); returns the tuple of values or None for a
+    missing or malformed token.
+    """
+    if not token:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode())
+    except (ValueError, UnicodeDecodeError):
+        return None
+    if not isinstance(values, list) or len(values) != key_count:
+        return None
+    if not all(value is None or isinstance(value, (str, int)) for value in values):
+        return None
+    return tuple(values)
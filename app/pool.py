@@ -0,0 +1,251 @@
+import threading
+import time
+
+
+class PoolTimeout(RuntimeError):
+    """Raised when no connection could be checked out within the timeout."""
+
+
+class _PooledConnection:
+    """Book-keeping wrapper around a raw DB-API connection."""
+
+    __slots__ = ('raw', 'created_at', 'last_used', 'uses')
+
+    def __init__(self, raw):
+        now = time.monotonic()
+        self.raw = raw
+        self.created_at = now
+        self.last_used = now
+        self.uses = 0
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of DB-API connections.
+
+    Connections are created lazily up to ``max_size``; ``min_size`` of them are
+    kept warm once the pool has been used. A connection is health-checked on
+    borrow when it has been idle for longer than ``ping_after`` seconds, and it
+    is retired after ``recycle_uses`` checkouts or ``max_age`` seconds. On
+    return, any open transaction is rolled back so the next borrower starts
+    from a clean state.
+    """
+
+    def __init__(self, connect, min_size=1, max_size=10, timeout=30.0,
+                 recycle_uses=1000, max_age=3600, ping_after=5.0,
+                 ping_query='SELECT 1'):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+
+        self._connect = connect
+        self.min_size = max(0, min(min_size, max_size))
+        self.max_size = max_size
+        self.timeout = timeout
+        self.recycle_uses = recycle_uses
+        self.max_age = max_age
+        self.ping_after = ping_after
+        self.ping_query = ping_query
+
+        self._lock = threading.Condition()
+        self._idle = []               # LIFO stack: most recently returned first
+        self._in_use = {}             # id(raw) -> _PooledConnection
+        self._size = 0                # idle + in use + being opened
+        self._closed = False
+
+        self._stats = {
+            'created': 0,
+            'closed': 0,
+            'recycled': 0,
+            'failed_health_checks': 0,
+            'reset_failures': 0,
+            'checkouts': 0,
+            'waits': 0,
+            'wait_seconds': 0.0,
+            'timeouts': 0,
+            'peak_in_use': 0,
+        }
+
+    # --- Checkout / return ---
+    def acquire(self):
+        """
+        Borrows a connection, waiting up to ``timeout`` seconds for one to
+        become available. Raises PoolTimeout if none does.
+        """
+        deadline = time.monotonic() + self.timeout
+        waited = False
+
+        while True:
+            create = False
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed")
+
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolTimeout(
+                            f"No database connection available within {self.timeout}s "
+                            f"(max_size={self.max_size})"
+                        )
+                    if not waited:
+                        waited = True
+                        self._stats['waits'] += 1
+                    started = time.monotonic()
+                    self._lock.wait(remaining)
+                    self._stats['wait_seconds'] += time.monotonic() - started
+
+                if self._idle:
+                    pooled = self._idle.pop()
+                else:
+                    pooled = None
+                    create = True
+                    self._size += 1
+
+            if create:
+                pooled = self._open()
+                if pooled is None:
+                    continue
+            elif self._expired(pooled):
+                self._discard(pooled, 'recycled')
+                continue
+            elif not self._healthy(pooled):
+                self._discard(pooled, 'failed_health_checks')
+                continue
+
+            return self._checkout(pooled)
+
+    def release(self, raw, discard=False):
+        """
+        Returns a connection to the pool. Its transaction is rolled back; it is
+        closed instead of being pooled if ``discard`` is set, the reset fails,
+        or it has reached its use/age limit.
+        """
+        with self._lock:
+            pooled = self._in_use.pop(id(raw), None)
+        if pooled is None:
+            # Not ours (or already returned) - just make sure it goes away.
+            self._close_raw(raw)
+            return
+
+        if not discard:
+            try:
+                raw.rollback()
+            except Exception:
+                with self._lock:
+                    self._stats['reset_failures'] += 1
+                discard = True
+
+        if discard:
+            self._discard(pooled, 'closed')
+            return
+        if self._expired(pooled):
+            self._discard(pooled, 'recycled')
+            return
+
+        pooled.last_used = time.monotonic()
+        with self._lock:
+            if self._closed:
+                keep = False
+            else:
+                keep = True
+                self._idle.append(pooled)
+                self._lock.notify()
+        if not keep:
+            self._discard(pooled, 'closed')
+
+    def close(self):
+        """Closes every idle connection and refuses further checkouts."""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._lock.notify_all()
+        for pooled in idle:
+            self._discard(pooled, 'closed')
+
+    # --- Statistics ---
+    def stats(self):
+        """Returns a snapshot of pool sizing and usage counters."""
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot.update({
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': len(self._in_use),
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+            })
+        snapshot['wait_seconds'] = round(snapshot['wait_seconds'], 4)
+        return snapshot
+
+    # --- Internals ---
+    def _open(self):
+        try:
+            raw = self._connect()
+        except Exception:
+            with self._lock:
+                self._size -= 1
+                self._lock.notify()
+            raise
+        with self._lock:
+            self._stats['created'] += 1
+        return _PooledConnection(raw)
+
+    def _checkout(self, pooled):
+        pooled.uses += 1
+        with self._lock:
+            self._in_use[id(pooled.raw)] = pooled
+            self._stats['checkouts'] += 1
+            if len(self._in_use) > self._stats['peak_in_use']:
+                self._stats['peak_in_use'] = len(self._in_use)
+            top_up = self._size < self.min_size
+            if top_up:
+                self._size += 1
+        if top_up:
+            self._warm_one()
+        return pooled.raw
+
+    def _warm_one(self):
+        """Opens one extra idle connection so the pool reaches min_size."""
+        try:
+            pooled = self._open()
+        except Exception:
+            return
+        with self._lock:
+            self._idle.insert(0, pooled)
+            self._lock.notify()
+
+    def _expired(self, pooled):
+        if self.recycle_uses and pooled.uses >= self.recycle_uses:
+            return True
+        if self.max_age and time.monotonic() - pooled.created_at >= self.max_age:
+            return True
+        return False
+
+    def _healthy(self, pooled):
+        if time.monotonic() - pooled.last_used < self.ping_after:
+            return True
+        try:
+            cursor = pooled.raw.cursor()
+            cursor.execute(self.ping_query)
+            cursor.fetchall()
+            cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, pooled, reason):
+        self._close_raw(pooled.raw)
+        with self._lock:
+            self._size -= 1
+            self._stats[reason] += 1
+            if reason != 'closed':
+                self._stats['closed'] += 1
+            self._lock.notify()
+
+    @staticmethod
+    def _close_raw(raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
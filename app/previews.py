@@ -0,0 +1,273 @@
+import os
+import re
+import threading
+import traceback
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from xml.etree import ElementTree
+
+from flask import current_app
+
+from app.metrics import handled_error
+from app.uploads import blob_path
+
+# First-page preview images and extracted text for uploaded files, made by a
+# small worker pool so the upload request never waits for them. Both are keyed
+# by the blob hash (identical files share one preview) and live in a cache
+# directory capped at PREVIEW_CACHE_MAX_BYTES; the least recently used
+# image/text pairs are evicted together and simply regenerated the next time
+# someone asks for them.
+
+KINDS = {
+    '.pdf': 'pdf',
+    '.png': 'image', '.jpg': 'image', '.jpeg': 'image', '.gif': 'image',
+    '.bmp': 'image', '.webp': 'image', '.tif': 'image', '.tiff': 'image',
+    '.txt': 'text', '.md': 'text', '.py': 'text', '.csv': 'text',
+    '.docx': 'docx',
+}
+
+_WORD_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+_executor = None
+_inflight = set()
+_lock = threading.Lock()
+_cache_bytes = {}
+
+# Called as hook(digest, text) in the worker, inside an app context, after
+# text was extracted
+on_extracted = []
+
+
+def kind_of(file_name):
+    return KINDS.get(os.path.splitext(file_name or '')[1].lower())
+
+
+def preview_root():
+    return current_app.config.get('PREVIEW_FOLDER') or os.path.join(current_app.instance_path, 'previews')
+
+
+def _paths(root, digest):
+    folder = os.path.join(root, digest[:2])
+    return os.path.join(folder, digest + '.png'), os.path.join(folder, digest + '.txt')
+
+
+def _pool():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=current_app.config.get('PREVIEW_WORKERS', 2),
+                                           thread_name_prefix='preview')
+        return _executor
+
+
+# --- Extractors: each writes the PNG (if it can) and returns the text ---
+def _render_pdf(source, image_path, width, text_chars):
+    import pymupdf
+
+    with pymupdf.open(source, filetype='pdf') as document:
+        if document.page_count:
+            page = document[0]
+            scale = width / max(page.rect.width, 1)
+            page.get_pixmap(matrix=pymupdf.Matrix(scale, scale), alpha=False).save(image_path, output='png')
+        text = []
+        length = 0
+        for page in document:
+            chunk = page.get_text()
+            text.append(chunk)
+            length += len(chunk)
+            if length >= text_chars:
+                break
+    return ''.join(text)
+
+
+def _render_image(source, image_path, width, text_chars):
+    from PIL import Image
+
+    with Image.open(source) as image:
+        image.thumbnail((width, width * 2))
+        if image.mode not in ('RGB', 'RGBA', 'L'):
+            image = image.convert('RGBA')
+        image.save(image_path, 'PNG')
+    return ''
+
+
+def _read_text(source, image_path, width, text_chars):
+    with open(source, 'rb') as f:
+        return f.read(text_chars * 4).decode('utf-8', 'replace')
+
+
+def _read_docx(source, image_path, width, text_chars):
+    paragraphs = []
+    length = 0
+    with zipfile.ZipFile(source) as archive, archive.open('word/document.xml') as xml:
+        for _, element in ElementTree.iterparse(xml):
+            if element.tag == _WORD_NS + 'p':
+                paragraph = ''.join(node.text or '' for node in element.iter(_WORD_NS + 't'))
+                paragraphs.append(paragraph)
+                length += len(paragraph)
+                element.clear()
+                if length >= text_chars:
+                    break
+    return '\n'.join(paragraphs)
+
+
+_EXTRACTORS = {'pdf': _render_pdf, 'image': _render_image, 'text': _read_text, 'docx': _read_docx}
+
+
+# --- Cache bookkeeping ---
+def _scan(root):
+    total = 0
+    for folder, _, files in os.walk(root):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(folder, name))
+            except OSError:
+                pass
+    return total
+
+
+def _evict(root, limit):
+    """
+    Deletes least recently used previews until the cache is at 90% of
+    ``limit``. A blob's image and text go together, last used being the
+    newer of their mtimes (lookup() and image_path() touch them).
+    """
+    pairs = {}      # path without extension -> [last used, size, paths]
+    for folder, _, files in os.walk(root):
+        for name in files:
+            if name.endswith('.tmp'):
+                continue
+            path = os.path.join(folder, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entry = pairs.setdefault(os.path.splitext(path)[0], [0.0, 0, []])
+            entry[0] = max(entry[0], stat.st_mtime)
+            entry[1] += stat.st_size
+            entry[2].append(path)
+    total = sum(size for _, size, _ in pairs.values())
+    for _, _, paths in sorted(pairs.values(), key=lambda entry: entry[0]):
+        if total <= limit * 0.9:
+            break
+        for path in paths:
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+    return total
+
+
+def _account(root, limit, added):
+    with _lock:
+        if root not in _cache_bytes:
+            _cache_bytes[root] = _scan(root)
+        else:
+            _cache_bytes[root] += added
+        over = _cache_bytes[root] > limit
+    if over:
+        remaining = _evict(root, limit)
+        with _lock:
+            _cache_bytes[root] = remaining
+
+
+def _generate(app, source, kind, root, digest, settings):
+    image_path, text_path = _paths(root, digest)
+    try:
+        os.makedirs(os.path.dirname(image_path), exist_ok=True)
+        text = _EXTRACTORS[kind](source, image_path + '.tmp', settings['width'], settings['text_chars'])
+        text = re.sub(r'[ \t]+', ' ', text or '')[:settings['text_chars']].strip()
+        if os.path.exists(image_path + '.tmp'):
+            os.replace(image_path + '.tmp', image_path)
+        with open(text_path + '.tmp', 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(text_path + '.tmp', text_path)
+
+        added = os.path.getsize(text_path) + (os.path.getsize(image_path) if os.path.exists(image_path) else 0)
+        _account(root, settings['max_bytes'], added)
+        with app.app_context():
+            for hook in on_extracted:
+                hook(digest, text)
+    except Exception as e:
+        handled_error("Preview Error", e, detail=digest)
+        traceback.print_exc()
+        # An empty text file keeps a broken upload from being retried on every view
+        try:
+            if not os.path.exists(text_path):
+                open(text_path, 'w').close()
+        except OSError:
+            pass
+    finally:
+        for leftover in (image_path + '.tmp', text_path + '.tmp'):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+        with _lock:
+            _inflight.discard(digest)
+
+
+# --- Public API ---
+def schedule(digest, file_name):
+    """
+    Queues preview generation for a stored blob and returns at once. Returns
+    False when the type is not previewable or the work is already queued.
+    """
+    kind = kind_of(file_name)
+    source = blob_path(digest)
+    if not kind or not source:
+        return False
+    with _lock:
+        if digest in _inflight:
+            return False
+        _inflight.add(digest)
+
+    config = current_app.config
+    settings = {
+        'width': config.get('PREVIEW_WIDTH', 480),
+        'text_chars': config.get('PREVIEW_TEXT_CHARS', 200000),
+        'max_bytes': config.get('PREVIEW_CACHE_MAX_BYTES', 512 * 1024 * 1024),
+    }
+    _pool().submit(_generate, current_app._get_current_object(), source, kind, preview_root(), digest, settings)
+    return True
+
+
+def lookup(digest, file_name, snippet_chars=200):
+    """
+    Returns (has_image, text_snippet, pending) for a blob. Missing previews of
+    previewable files (new, or evicted) are queued and reported as pending.
+    """
+    if not digest or not kind_of(file_name):
+        return False, None, False
+    image_path, text_path = _paths(preview_root(), digest)
+    if not os.path.exists(text_path):
+        with _lock:
+            pending = digest in _inflight
+        return False, None, pending or schedule(digest, file_name)
+    with open(text_path, encoding='utf-8') as f:
+        snippet = f.read(snippet_chars)
+    # Mark the pair as recently used, as image_path() does for the image
+    try:
+        os.utime(text_path)
+    except OSError:
+        pass
+    return os.path.exists(image_path), snippet, False
+
+
+def image_path(digest):
+    """Path of a blob's preview image, marked as recently used; None if there is none."""
+    path = _paths(preview_root(), digest)[0]
+    if not os.path.exists(path):
+        return None
+    os.utime(path)
+    return path
+
+
+def extracted_text(digest):
+    """The full extracted text of a blob, or None if it has not been extracted."""
+    text_path = _paths(preview_root(), digest)[1]
+    try:
+        with open(text_path, encoding='utf-8') as f:
+            return f.read()
+    except OSError:
+        return None
@@ -0,0 +1,130 @@
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from flask import current_app, g, request, session
+
+from app.metrics import handled_error
+
+# Opt-in stack sampling of live requests. A sampled request (PROFILE_SAMPLE_RATE,
+# or an admin sending PROFILE_HEADER) gets a sampler thread that records the
+# request thread's Python stack every PROFILE_INTERVAL_MS until the response
+# is ready. The stacks are written in the collapsed format ("outer;inner;leaf
+# count" per line) that flamegraph.pl, speedscope and inferno read, one file
+# per request under PROFILE_FOLDER/<endpoint>/, keeping the newest
+# PROFILE_KEEP files per endpoint.
+
+_UNSAFE = re.compile(r'[^\w.-]')
+
+
+def profile_root():
+    return current_app.config.get('PROFILE_FOLDER') or os.path.join(current_app.instance_path, 'profiles')
+
+
+def _label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """
+    Counts the stacks of one thread, sampled from a helper thread. Samples
+    are kept as tuples of code objects and only turned into text on write,
+    so each sample costs little time under the GIL.
+    """
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.started = time.perf_counter()
+        self.seconds = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            codes = []
+            while frame is not None:
+                codes.append(frame.f_code)
+                frame = frame.f_back
+            if codes:
+                self.stacks[tuple(codes)] += 1
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.seconds = time.perf_counter() - self.started
+        return self.stacks
+
+
+def _rotate(folder, keep):
+    """Deletes all but the newest ``keep`` profiles in ``folder``."""
+    names = sorted(name for name in os.listdir(folder) if name.endswith('.folded'))
+    for name in names[:max(0, len(names) - keep)]:
+        try:
+            os.remove(os.path.join(folder, name))
+        except OSError:
+            pass
+
+
+def write_profile(sampler, endpoint):
+    """Writes a sampler's stacks to a new file for ``endpoint`` and returns its path."""
+    folder = os.path.join(profile_root(), _UNSAFE.sub('_', endpoint or 'unmatched'))
+    os.makedirs(folder, exist_ok=True)
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+    path = os.path.join(folder, f"{stamp}-{sampler.seconds * 1000:.0f}ms.folded")
+    labels = {}
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        for codes, count in sampler.stacks.most_common():
+            # Sampled innermost first; collapsed stacks read outermost first
+            stack = ';'.join(labels.get(code) or labels.setdefault(code, _label(code)) for code in reversed(codes))
+            f.write(f"{stack} {count}\n")
+    os.replace(path + '.tmp', path)
+    _rotate(folder, current_app.config.get('PROFILE_KEEP', 50))
+    return path
+
+
+# --- Request hooks ---
+def _start():
+    config = current_app.config
+    rate = config.get('PROFILE_SAMPLE_RATE', 0.0)
+    header = config.get('PROFILE_HEADER')
+    forced = header and request.headers.get(header) and session.get('role') == 'Admin'
+    if forced or (rate > 0 and random.random() < rate):
+        g.profiler = StackSampler(threading.get_ident(), config.get('PROFILE_INTERVAL_MS', 5) / 1000)
+
+
+def _finish(response):
+    sampler = g.pop('profiler', None)
+    if sampler is None:
+        return response
+    # Requests shorter than one interval have nothing to show
+    if not sampler.stop():
+        return response
+    try:
+        path = write_profile(sampler, request.endpoint)
+        response.headers['X-Profile-File'] = os.path.basename(path)
+    except OSError as e:
+        handled_error("Profile Write Error", e)
+    return response
+
+
+def _abandon(e=None):
+    # after_request does not run when the view raised
+    sampler = g.pop('profiler', None)
+    if sampler is not None:
+        sampler.stop()
+
+
+def init_app(app):
+    """Samples requests for stack profiling as configured by PROFILE_*."""
+    app.before_request(_start)
+    app.after_request(_finish)
+    app.teardown_request(_abandon)
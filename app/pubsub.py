@@ -0,0 +1,182 @@
+import json
+import queue
+import threading
+import time
+
+from flask import Response, current_app
+
+from app import unread
+from app.broadcasts import audience_profile
+
+# In-process publish/subscribe for unread-count deltas. Writers publish to a
+# topic, every open /events stream subscribed to it gets the event on its own
+# queue. Nothing is persisted and nothing crosses worker processes: a client
+# connected to another worker catches up from the counts sent when it
+# (re)connects, which EventSource does on its own once the stream ends.
+
+# Events buffered per subscriber before the oldest are dropped
+QUEUE_SIZE = 100
+
+
+def messages_topic(receiver_id, receiver_type):
+    return f"messages:{receiver_type}:{receiver_id}"
+
+
+def notifications_topic(user_id):
+    return f"notifications:{user_id}"
+
+
+BROADCASTS_TOPIC = "broadcasts"
+
+
+class Subscription:
+    """One client's queue of events; ``accept`` can filter events before queueing."""
+
+    def __init__(self, topics, accept=None):
+        self.topics = tuple(topics)
+        self.accept = accept
+        self.queue = queue.Queue(QUEUE_SIZE)
+
+    def put(self, event):
+        if self.accept is not None and not self.accept(event):
+            return
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            # A stalled client loses its oldest delta rather than blocking writers
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                pass
+            self.queue.put_nowait(event)
+
+    def get(self, timeout):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class Hub:
+    def __init__(self):
+        self._topics = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, topics, accept=None):
+        subscription = Subscription(topics, accept)
+        with self._lock:
+            for topic in subscription.topics:
+                self._topics.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for topic in subscription.topics:
+                subscribers = self._topics.get(topic)
+                if subscribers:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._topics[topic]
+
+    def publish(self, topic, event):
+        """Queues ``event`` for every subscriber of ``topic``; returns how many got it."""
+        with self._lock:
+            subscribers = list(self._topics.get(topic, ()))
+        for subscription in subscribers:
+            subscription.put(event)
+        return len(subscribers)
+
+
+hub = Hub()
+
+
+# --- Publishing ---
+def publish_message(receiver_id, receiver_type, delta=1):
+    """A receiver's unread message count changed by ``delta``."""
+    hub.publish(messages_topic(receiver_id, receiver_type), {'kind': 'messages', 'delta': delta})
+
+
+def publish_notification(user_id, delta=1):
+    """A user's unread notification count changed by ``delta``."""
+    hub.publish(notifications_topic(user_id), {'kind': 'notifications', 'delta': delta})
+
+
+def publish_broadcast(target_role=None, course_id=None, department=None):
+    """A broadcast was stored; each subscriber decides whether it is in the audience."""
+    hub.publish(BROADCASTS_TOPIC, {
+        'kind': 'notifications', 'delta': 1,
+        'audience': {'role': target_role, 'course_id': course_id, 'department': department},
+    })
+
+
+def broadcast_filter(role, department, course_ids):
+    """Returns an ``accept`` function passing broadcasts addressed to this profile."""
+    course_ids = set(course_ids)
+
+    def accept(event):
+        audience = event.get('audience')
+        if audience is None:
+            return True
+        return ((audience['role'] is None or audience['role'] == role)
+                and (audience['course_id'] is None or audience['course_id'] in course_ids)
+                and (audience['department'] is None or audience['department'] == department))
+    return accept
+
+
+# --- Streaming ---
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def event_stream(subscription, counts):
+    """
+    Returns a text/event-stream Response: the current ``counts`` first, then a
+    ``delta`` event per published change, with keep-alive comments in between.
+    The stream ends after SSE_MAX_SECONDS so worker threads are recycled; the
+    browser reconnects by itself and gets fresh counts.
+    """
+    keepalive = current_app.config.get('SSE_KEEPALIVE_SECONDS', 25)
+    lifetime = current_app.config.get('SSE_MAX_SECONDS', 300)
+
+    def generate():
+        deadline = time.monotonic() + lifetime
+        yield "retry: 5000\n\n"
+        yield _sse('counts', counts)
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            event = subscription.get(min(keepalive, remaining))
+            if event is None:
+                yield ": keep-alive\n\n"
+            else:
+                yield _sse('delta', {'kind': event['kind'], 'delta': event['delta']})
+
+    response = Response(generate(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # Runs when the server closes the response, also if the client went away
+    response.call_on_close(lambda: hub.unsubscribe(subscription))
+    return response
+
+
+def unread_events(cursor, user_id, role, profile_id, receiver_id):
+    """
+    Opens the unread-count stream of one user: subscribes to their message and
+    notification topics and to broadcasts in their audience, then streams the
+    current counts followed by deltas. Only the setup touches the database.
+    """
+    department, course_ids = audience_profile(cursor, role, profile_id)
+    topics = [notifications_topic(user_id), BROADCASTS_TOPIC]
+    if receiver_id is not None:
+        topics.append(messages_topic(receiver_id, role))
+    # Subscribe before reading the counts so no change falls in between
+    subscription = hub.subscribe(topics, accept=broadcast_filter(role, department, course_ids))
+    try:
+        counts = {
+            'notifications': unread.unread_notifications(user_id, role, profile_id),
+            'messages': unread.unread_messages(receiver_id, role) if receiver_id is not None else 0,
+        }
+    except Exception:
+        hub.unsubscribe(subscription)
+        raise
+    return event_stream(subscription, counts)
@@ -0,0 +1,42 @@
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+# Read notifications older than the retention window are moved out of the hot
+# Notifications table into NotificationsArchive, one bounded batch per
+# transaction so the job never holds long locks on the table users read from.
+
+BATCH_SIZE = 5000
+
+_ARCHIVE_BATCH_SQL = """
+    DELETE TOP (?) FROM Notifications
+    OUTPUT deleted.NotificationID, deleted.user_id, deleted.Message, deleted.IsRead, deleted.CreatedAt, GETDATE()
+    INTO NotificationsArchive (NotificationID, user_id, Message, IsRead, CreatedAt, ArchivedAt)
+    WHERE IsRead = 1 AND CreatedAt < ?
+"""
+
+
+def archive_read_notifications(db, older_than_days=None, batch_size=BATCH_SIZE, dry_run=False):
+    """
+    Moves read notifications created more than ``older_than_days`` ago (default
+    NOTIFICATION_RETENTION_DAYS) into NotificationsArchive, committing after
+    every batch. Unread rows are never moved. Returns the number of rows
+    archived, or with ``dry_run`` the number that would be.
+    """
+    if older_than_days is None:
+        older_than_days = current_app.config.get('NOTIFICATION_RETENTION_DAYS', 90)
+    cutoff = datetime.now() - timedelta(days=older_than_days)
+    cursor = db.cursor()
+
+    if dry_run:
+        cursor.execute("SELECT COUNT(*) FROM Notifications WHERE IsRead = 1 AND CreatedAt < ?", (cutoff,))
+        return cursor.fetchone()[0]
+
+    archived = 0
+    while True:
+        cursor.execute(_ARCHIVE_BATCH_SQL, (batch_size, cutoff))
+        moved = max(cursor.rowcount, 0)
+        db.commit()
+        archived += moved
+        if moved < batch_size:
+            return archived
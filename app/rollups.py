@@ -0,0 +1,164 @@
+from datetime import date, datetime
+
+# Denormalized counters: Enrollments.attended_count, held_count and
+# attendance_percentage, and Courses.enrolled_count. Write paths shift them by
+# the change they make; reconcile() rebuilds them in bulk and reports how far
+# they had drifted.
+
+# Statuses that count as having attended a class
+ATTENDED_STATUSES = ('Present', 'Late')
+
+_ATTENDED_CASE = "CASE WHEN a.Status IN ({}) THEN 1 ELSE 0 END".format(
+    ', '.join(f"'{status}'" for status in ATTENDED_STATUSES)
+)
+
+# Attendance counts and percentage per enrollment, computed from Attendance
+_ATTENDANCE_AGGREGATE = f"""
+    SELECT a.CourseID, a.StudentID,
+           SUM({_ATTENDED_CASE}) AS Attended, COUNT(*) AS Held,
+           100.0 * SUM({_ATTENDED_CASE}) / COUNT(*) AS Percentage
+    FROM Attendance a
+    {{where}}
+    GROUP BY a.CourseID, a.StudentID
+"""
+
+
+def _day(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value).strip()[:10])
+
+
+def _attended(status):
+    return 1 if status in ATTENDED_STATUSES else 0
+
+
+def attendance_deltas(cursor, course_id, records):
+    """
+    Returns {student_id: (attended, held)}, how upserting ``records`` =
+    [(student_id, day, status)] into one course shifts each student's counts,
+    from the statuses they replace. The days written are read with an update
+    lock, so nobody changes them before the upsert commits. Reads only those
+    days, not the course's whole history. Does not commit.
+    """
+    keyed = [(int(student_id), _day(day), status) for student_id, day, status in records]
+    if not keyed:
+        return {}
+    days = [day for _, day, _ in keyed]
+    cursor.execute("""
+        SELECT StudentID, AttendanceDate, Status FROM Attendance WITH (UPDLOCK, HOLDLOCK)
+        WHERE CourseID = ? AND AttendanceDate BETWEEN ? AND ?
+    """, (course_id, min(days), max(days)))
+    statuses = {(row[0], _day(row[1])): row[2] for row in cursor.fetchall()}
+
+    deltas = {}
+    for student_id, day, status in keyed:
+        old = statuses.get((student_id, day))
+        attended, held = deltas.get(student_id, (0, 0))
+        deltas[student_id] = (attended + _attended(status) - _attended(old), held + (old is None))
+        # A later record for the same day replaces this one
+        statuses[(student_id, day)] = status
+    return deltas
+
+
+def apply_attendance_deltas(cursor, course_id, deltas):
+    """
+    Shifts the attended/held counts of each student in ``deltas`` (from
+    attendance_deltas) and recomputes their percentage from the new counts.
+    Does not commit.
+    """
+    rows = [(attended, held, held, attended, held, course_id, student_id)
+            for student_id, (attended, held) in deltas.items() if attended or held]
+    if rows:
+        cursor.executemany("""
+            UPDATE Enrollments
+            SET attended_count = attended_count + ?, held_count = held_count + ?,
+                attendance_percentage = CASE WHEN held_count + ? > 0
+                                             THEN 100.0 * (attended_count + ?) / (held_count + ?)
+                                             ELSE 0 END
+            WHERE CourseID = ? AND StudentID = ?
+        """, rows)
+
+
+def adjust_enrolled_count(cursor, course_id, delta):
+    """Shifts Courses.enrolled_count by ``delta``. Does not commit."""
+    if delta:
+        cursor.execute("""
+            UPDATE Courses SET enrolled_count = COALESCE(enrolled_count, 0) + ?
+            WHERE CourseID = ?
+        """, (delta, course_id))
+
+
+def enrollment_removed(cursor, enrollment_id):
+    """
+    Decrements the enrolled count of the course an enrollment belongs to.
+    Must run before the enrollment row is deleted. Does not commit.
+    """
+    cursor.execute("""
+        UPDATE Courses SET enrolled_count = COALESCE(enrolled_count, 0) - 1
+        WHERE CourseID = (SELECT CourseID FROM Enrollments WHERE EnrollmentID = ?)
+    """, (enrollment_id,))
+
+
+# --- Bulk reconcile ---
+def enrolled_count_drift(cursor):
+    """Returns (CourseID, stored, actual) for courses whose count is off."""
+    cursor.execute("""
+        SELECT c.CourseID, COALESCE(c.enrolled_count, 0), COUNT(e.EnrollmentID)
+        FROM Courses c
+        LEFT JOIN Enrollments e ON e.CourseID = c.CourseID
+        GROUP BY c.CourseID, c.enrolled_count
+        HAVING COALESCE(c.enrolled_count, 0) <> COUNT(e.EnrollmentID)
+    """)
+    return cursor.fetchall()
+
+
+def attendance_drift(cursor, tolerance=0.01):
+    """
+    Returns (CourseID, StudentID, stored, actual) percentages for enrollments
+    whose percentage or attended/held counts are off.
+    """
+    aggregate = _ATTENDANCE_AGGREGATE.format(where="")
+    cursor.execute(f"""
+        SELECT e.CourseID, e.StudentID, COALESCE(e.attendance_percentage, 0), COALESCE(agg.Percentage, 0)
+        FROM Enrollments e
+        LEFT JOIN ({aggregate}) agg ON agg.CourseID = e.CourseID AND agg.StudentID = e.StudentID
+        WHERE ABS(COALESCE(e.attendance_percentage, 0) - COALESCE(agg.Percentage, 0)) > ?
+           OR e.attended_count <> COALESCE(agg.Attended, 0) OR e.held_count <> COALESCE(agg.Held, 0)
+    """, (tolerance,))
+    return cursor.fetchall()
+
+
+def rebuild_counters(cursor):
+    """Rewrites the counters from the base tables in two set-based statements."""
+    cursor.execute("""
+        UPDATE c SET enrolled_count = COALESCE(agg.Enrolled, 0)
+        FROM Courses c
+        LEFT JOIN (SELECT CourseID, COUNT(*) AS Enrolled FROM Enrollments GROUP BY CourseID) agg
+            ON agg.CourseID = c.CourseID
+    """)
+    aggregate = _ATTENDANCE_AGGREGATE.format(where="")
+    cursor.execute(f"""
+        UPDATE e SET attended_count = COALESCE(agg.Attended, 0), held_count = COALESCE(agg.Held, 0),
+                     attendance_percentage = COALESCE(agg.Percentage, 0)
+        FROM Enrollments e
+        LEFT JOIN ({aggregate}) agg ON agg.CourseID = e.CourseID AND agg.StudentID = e.StudentID
+    """)
+
+
+def reconcile(db, fix=True):
+    """
+    Reports counter drift and, unless ``fix`` is False, rebuilds the counters.
+    Returns {'enrolled_count': [...], 'attendance_percentage': [...]}.
+    """
+    cursor = db.cursor()
+    report = {
+        'enrolled_count': enrolled_count_drift(cursor),
+        'attendance_percentage': attendance_drift(cursor),
+    }
+    if fix and (report['enrolled_count'] or report['attendance_percentage']):
+        rebuild_counters(cursor)
+        db.commit()
+    return report
@@ -0,0 +1,84 @@
+from flask import current_app
+
+from app.pagination import encode_position, decode_position
+
+# Sort orders of the admin student list: key columns (the last one unique)
+# and direction. Each has a matching index from migration 8, so a page is an
+# index seek of page_size rows however many students there are.
+SORTS = {
+    'newest': (('s.StudentID',), 'DESC'),
+    'oldest': (('s.StudentID',), 'ASC'),
+    'name': (('s.Name', 's.StudentID'), 'ASC'),
+    'name_desc': (('s.Name', 's.StudentID'), 'DESC'),
+}
+
+
+def _seek(columns, direction, position):
+    """WHERE fragment continuing ``columns`` past ``position`` in ``direction``, and its parameters."""
+    op = '<' if direction == 'DESC' else '>'
+    if len(columns) == 1:
+        return f" AND {columns[0]} {op} ?", position
+    first, second = columns
+    return f" AND ({first} {op} ? OR ({first} = ? AND {second} {op} ?))", (position[0], position[0], position[1])
+
+
+def _like_prefix(text):
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_').replace('[', '\\[') + '%'
+
+
+def student_page(cursor, sort='newest', department=None, name=None, after=None, page_size=None):
+    """
+    Returns (students, next_cursor) for one page of the student directory.
+    Students are dicts with id, name, email, department and the names of the
+    courses they are enrolled in. ``department`` filters exactly, ``name`` by
+    prefix; ``after`` (a token from a previous page) is a keyset seek.
+    Costs two queries: the page of students, then the enrollments of just
+    those students.
+    """
+    page_size = page_size or current_app.config.get('STUDENTS_PAGE_SIZE', 50)
+    columns, direction = SORTS.get(sort, SORTS['newest'])
+
+    where = "1 = 1"
+    params = []
+    if department:
+        where += " AND s.Department = ?"
+        params.append(department)
+    if name:
+        where += " AND s.Name LIKE ? ESCAPE '\\'"
+        params.append(_like_prefix(name))
+    position = decode_position(after, len(columns))
+    if position:
+        seek, seek_params = _seek(columns, direction, position)
+        where += seek
+        params += seek_params
+
+    order = ', '.join(f"{column} {direction}" for column in columns)
+    cursor.execute(f"""
+        SELECT TOP (?) s.StudentID, s.Name, s.Email, s.Department
+        FROM Students s
+        WHERE {where}
+        ORDER BY {order}
+    """, [page_size + 1] + params)
+    rows = cursor.fetchall()
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_position(*([last[1], last[0]] if len(columns) == 2 else [last[0]]))
+
+    students = [{'id': row[0], 'name': row[1], 'email': row[2], 'department': row[3], 'courses': []}
+                for row in rows]
+    if students:
+        by_id = {student['id']: student for student in students}
+        placeholders = ', '.join('?' * len(by_id))
+        cursor.execute(f"""
+            SELECT e.StudentID, c.CourseName
+            FROM Enrollments e
+            JOIN Courses c ON c.CourseID = e.CourseID
+            WHERE e.StudentID IN ({placeholders})
+            ORDER BY c.CourseName
+        """, list(by_id))
+        for student_id, course_name in cursor.fetchall():
+            by_id[student_id]['courses'].append(course_name)
+    return students, next_cursor
@@ -0,0 +1,178 @@
+import hashlib
+import re
+
+import numpy as np
+from flask import current_app
+
+from app import previews
+from app.database import get_db
+from app.metrics import handled_error
+
+# Near-duplicate detection between submissions of the same assignment.
+# Extracted text is shingled into word 5-grams and summarised by a MinHash
+# signature; LSH splits each signature into bands and only submissions that
+# share a band bucket are compared. Each new submission therefore costs a
+# handful of indexed lookups instead of a pass over every other submission.
+
+NUM_PERM = 128
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+SHINGLE_WORDS = 5
+
+# (a * x + b) mod P with x < 2**32 and a < P stays below 2**64
+_PRIME = np.uint64(4294967291)
+_rng = np.random.default_rng(20240501)
+_A = _rng.integers(1, 4294967291, NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, 4294967291, NUM_PERM, dtype=np.uint64)
+
+_WORDS = re.compile(r'\w+')
+
+
+def shingles(text):
+    """Set of 32-bit hashes of the word n-grams of ``text``."""
+    words = _WORDS.findall((text or '').lower())
+    if not words:
+        return set()
+    size = min(SHINGLE_WORDS, len(words))
+    return {
+        int.from_bytes(hashlib.blake2b(' '.join(words[i:i + size]).encode(), digest_size=4).digest(), 'little')
+        for i in range(len(words) - size + 1)
+    }
+
+
+def minhash(shingle_set):
+    """MinHash signature (NUM_PERM uint32 values) of a shingle set, or None if empty."""
+    if not shingle_set:
+        return None
+    values = np.fromiter(shingle_set, dtype=np.uint64, count=len(shingle_set))
+    signature = np.full(NUM_PERM, np.iinfo(np.uint64).max, dtype=np.uint64)
+    # Chunks bound the (NUM_PERM x chunk) intermediate for very long texts
+    for start in range(0, len(values), 4096):
+        chunk = values[start:start + 4096]
+        hashed = (np.outer(_A, chunk) + _B[:, None]) % _PRIME
+        signature = np.minimum(signature, hashed.min(axis=1))
+    return signature.astype(np.uint32)
+
+
+def band_buckets(signature):
+    """(band, bucket) pairs of a signature; equal buckets mean equal rows in that band."""
+    buckets = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS:(band + 1) * ROWS].tobytes()
+        bucket = int.from_bytes(hashlib.blake2b(rows, digest_size=8).digest(), 'little', signed=True)
+        buckets.append((band, bucket))
+    return buckets
+
+
+def estimate(signature, other):
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.mean(signature == other))
+
+
+def _signature_from_db(value):
+    return np.frombuffer(bytes(value), dtype=np.uint32)
+
+
+# --- Index maintenance ---
+def index_submission(cursor, submission_id, assignment_id, signature):
+    """
+    Stores a submission's signature and LSH buckets and records its scores
+    against the candidates it shares a bucket with. Does not commit.
+    """
+    threshold = current_app.config.get('SIMILARITY_THRESHOLD', 0.5)
+    buckets = band_buckets(signature)
+
+    cursor.execute("""
+        INSERT INTO SubmissionSignatures (SubmissionID, AssignmentID, Signature, UpdatedAt)
+        VALUES (?, ?, ?, GETDATE())
+    """, (submission_id, assignment_id, signature.tobytes()))
+
+    # A student's resubmissions are not compared with their own earlier files
+    values = ', '.join(['(?, ?)'] * len(buckets))
+    cursor.execute(f"""
+        SELECT DISTINCT sig.SubmissionID, sig.Signature
+        FROM SubmissionLSH l
+        JOIN (VALUES {values}) AS b(Band, BucketHash) ON b.Band = l.Band AND b.BucketHash = l.BucketHash
+        JOIN SubmissionSignatures sig ON sig.SubmissionID = l.SubmissionID
+        JOIN Submissions other ON other.SubmissionID = l.SubmissionID
+        JOIN Submissions mine ON mine.SubmissionID = ?
+        WHERE l.AssignmentID = ? AND l.SubmissionID <> mine.SubmissionID
+          AND other.StudentID <> mine.StudentID
+    """, tuple(value for bucket in buckets for value in bucket) + (submission_id, assignment_id))
+    candidates = cursor.fetchall()
+
+    cursor.fast_executemany = True
+    cursor.executemany("""
+        INSERT INTO SubmissionLSH (AssignmentID, Band, BucketHash, SubmissionID) VALUES (?, ?, ?, ?)
+    """, [(assignment_id, band, bucket, submission_id) for band, bucket in buckets])
+
+    pairs = []
+    for other_id, other_signature in candidates:
+        score = estimate(signature, _signature_from_db(other_signature))
+        if score >= threshold:
+            pairs += [(assignment_id, submission_id, other_id, score),
+                      (assignment_id, other_id, submission_id, score)]
+    if pairs:
+        cursor.executemany("""
+            INSERT INTO SubmissionSimilarity (AssignmentID, SubmissionID, OtherSubmissionID, Score)
+            VALUES (?, ?, ?, ?)
+        """, pairs)
+    return len(pairs) // 2
+
+
+def index_blob(digest, text):
+    """
+    previews.on_extracted hook: indexes every not yet indexed submission of
+    the blob whose text was just extracted.
+    """
+    db = get_db()
+    cursor = db.cursor()
+    cursor.execute("""
+        SELECT sub.SubmissionID, sub.AssignmentID
+        FROM Submissions sub
+        LEFT JOIN SubmissionSignatures sig ON sig.SubmissionID = sub.SubmissionID
+        WHERE sub.FileHash = ? AND sig.SubmissionID IS NULL
+    """, (digest,))
+    pending = cursor.fetchall()
+    if not pending:
+        return
+
+    signature = minhash(shingles(text))
+    if signature is None:
+        return
+    try:
+        for submission_id, assignment_id in pending:
+            index_submission(cursor, submission_id, assignment_id, signature)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        handled_error("Similarity Index Error", e)
+
+
+# --- Reads ---
+def top_matches(cursor, assignment_id):
+    """
+    Returns {SubmissionID: (score, other student's name)} with the closest
+    match of every flagged submission of an assignment. Pairs between two
+    submissions of the same student are ignored.
+    """
+    cursor.execute("""
+        SELECT ranked.SubmissionID, ranked.Score, st.Name
+        FROM (
+            SELECT ss.SubmissionID, ss.OtherSubmissionID, ss.Score, other.StudentID,
+                   ROW_NUMBER() OVER (PARTITION BY ss.SubmissionID ORDER BY ss.Score DESC) AS Position
+            FROM SubmissionSimilarity ss
+            JOIN Submissions mine ON mine.SubmissionID = ss.SubmissionID
+            JOIN Submissions other ON other.SubmissionID = ss.OtherSubmissionID
+            WHERE ss.AssignmentID = ? AND other.StudentID <> mine.StudentID
+        ) ranked
+        JOIN Students st ON st.StudentID = ranked.StudentID
+        WHERE ranked.Position = 1
+    """, (assignment_id,))
+    return {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+
+
+def init_app(app):
+    """Indexes submission text as soon as the preview workers extract it."""
+    if index_blob not in previews.on_extracted:
+        previews.on_extracted.append(index_blob)
@@ -0,0 +1,577 @@
+import os
+import re
+import sqlite3
+from datetime import date, datetime
+
+from app.cache import LRUCache
+from app.migrations import MIGRATIONS, SEED_SCRIPT
+
+# Local stand-in for SQL Server: a SQLite database behind connection and
+# cursor wrappers that rewrite the T-SQL the application sends into SQLite
+# before running it. Only the constructs the code actually uses are handled
+# (GETDATE, TOP, LEFT, table hints, OUTPUT, VALUES aliases, UPDATE ... FROM,
+# MERGE, CAST to DATETIME); anything else is passed through unchanged. Rewrites are cached per
+# statement text, so a hot query is only translated once per worker.
+
+TRANSLATION_CACHE_SIZE = 1024
+
+_NOW = "datetime('now', 'localtime')"
+
+_translations = LRUCache(TRANSLATION_CACHE_SIZE)
+_primary_keys = {}
+
+
+# --- Type mapping: give the routes the same Python types pyodbc does ---
+def _to_datetime(value):
+    return datetime.fromisoformat(value.decode())
+
+
+def _to_date(value):
+    return date.fromisoformat(value.decode()[:10])
+
+
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+sqlite3.register_converter('DATETIME', _to_datetime)
+sqlite3.register_converter('DATE', _to_date)
+sqlite3.register_converter('BIT', lambda value: bool(int(value)))
+
+
+# --- Translation ---
+_TOKENS = re.compile(r"'(?:[^']|'')*'|\?")
+
+
+def _number_params(sql):
+    """Turns every ? outside string literals into ?1, ?2, ... so rewrites may move them."""
+    position = 0
+
+    def number(match):
+        nonlocal position
+        if match.group(0) != '?':
+            return match.group(0)
+        position += 1
+        return f"?{position}"
+    return _TOKENS.sub(number, sql)
+
+
+def _closing(sql, start):
+    """Index of the parenthesis closing the one opened just before ``start``."""
+    depth = 1
+    for index in range(start, len(sql)):
+        if sql[index] == '(':
+            depth += 1
+        elif sql[index] == ')':
+            depth -= 1
+            if depth == 0:
+                return index
+    return len(sql)
+
+
+def _split_top_level(text, separator=','):
+    parts, depth, last = [], 0, 0
+    for index, char in enumerate(text):
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == separator and depth == 0:
+            parts.append(text[last:index])
+            last = index + 1
+    parts.append(text[last:])
+    return parts
+
+
+def _find_top_level(sql, pattern, start=0):
+    """Last match of ``pattern`` in ``sql`` that is not inside parentheses."""
+    depth, found = 0, None
+    regex = re.compile(pattern, re.I)
+    index = start
+    while index < len(sql):
+        char = sql[index]
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif depth == 0:
+            match = regex.match(sql, index)
+            if match:
+                found = match
+        index += 1
+    return found
+
+
+_HINTS = re.compile(r"\s+WITH\s*\(\s*(?:HOLDLOCK|UPDLOCK|ROWLOCK|NOLOCK|READPAST|TABLOCK)"
+                    r"(?:\s*,\s*\w+)*\s*\)", re.I)
+# SQLite keeps datetimes as text; a NUMERIC-affinity CAST would turn them into years
+_CAST_DATETIME = re.compile(r"\bCAST\(\s*(\?\d+)\s+AS\s+DATETIME\s*\)", re.I)
+_NOW_CALLS = re.compile(r"\bGETDATE\(\)|\bCURRENT_TIMESTAMP\b", re.I)
+_VALUES_ALIAS = re.compile(r"\(VALUES\s+((?:\([^()]*\)\s*,?\s*)+)\)\s+AS\s+(\w+)\s*\(([^)]*)\)", re.I)
+_TOP = re.compile(r"\bSELECT\s+TOP\s*\(\s*(\?\d+|\d+)\s*\)|\bSELECT\s+TOP\s+(\d+)", re.I)
+_OUTPUT_INSERTED = re.compile(r"\bOUTPUT\s+((?:INSERTED\.\w+\s*,?\s*)+)(?=VALUES|SELECT)", re.I)
+_DELETE_OUTPUT_INTO = re.compile(
+    r"^\s*DELETE\s+TOP\s*\(\s*(\?\d+|\d+)\s*\)\s+FROM\s+(\w+)\s+OUTPUT\s+(.*?)\s+INTO\s+(\w+)\s*\(([^)]*)\)"
+    r"\s+WHERE\s+(.*?)\s*;?\s*$", re.I | re.S)
+_UPDATE_FROM = re.compile(r"^\s*UPDATE\s+(\w+)\s+SET\s+(.*?)\s+FROM\s+(\w+)\s+(?:AS\s+)?(\w+)\b(.*)$", re.I | re.S)
+_MERGE = re.compile(
+    r"^\s*MERGE\s+(?:INTO\s+)?(\w+)\s+AS\s+(\w+)\s+USING\s+(\(.*?\))\s+AS\s+(\w+)\s+ON\s+(.*?)"
+    r"\s+WHEN\s+MATCHED\s+THEN\s+UPDATE\s+SET\s+(.*?)"
+    r"\s+WHEN\s+NOT\s+MATCHED(?:\s+BY\s+TARGET)?\s+THEN\s+INSERT\s*\(([^)]*)\)\s*VALUES\s*\((.*)\)\s*;?\s*$",
+    re.I | re.S)
+
+
+def _rewrite_left(sql):
+    # LEFT(text, n) -> SUBSTR(text, 1, n); LEFT JOIN never has a parenthesis right after LEFT
+    while True:
+        match = re.search(r"\bLEFT\s*\(", sql, re.I)
+        if not match:
+            return sql
+        end = _closing(sql, match.end())
+        text, length = _split_top_level(sql[match.end():end])
+        sql = f"{sql[:match.start()]}SUBSTR({text.strip()}, 1, {length.strip()}){sql[end + 1:]}"
+
+
+def _rewrite_values_alias(sql):
+    # (VALUES (..), (..)) AS b(x, y) -> (SELECT column1 AS x, column2 AS y FROM (VALUES ...)) AS b
+    def rewrite(match):
+        names = [name.strip() for name in match.group(3).split(',')]
+        columns = ', '.join(f"column{index} AS {name}" for index, name in enumerate(names, 1))
+        return f"(SELECT {columns} FROM (VALUES {match.group(1).strip()})) AS {match.group(2)}"
+    return _VALUES_ALIAS.sub(rewrite, sql)
+
+
+def _rewrite_top(sql):
+    # SELECT TOP (n) ... -> SELECT ... LIMIT n, at the end of that SELECT's parenthesis level
+    while True:
+        match = _TOP.search(sql)
+        if not match:
+            return sql
+        limit = match.group(1) or match.group(2)
+        depth, end = 0, len(sql)
+        for index in range(match.end(), len(sql)):
+            if sql[index] == '(':
+                depth += 1
+            elif sql[index] == ')':
+                if depth == 0:
+                    end = index
+                    break
+                depth -= 1
+        body = sql[match.end():end].rstrip()
+        semicolon = body.endswith(';')
+        body = body.rstrip(';').rstrip()
+        sql = f"{sql[:match.start()]}SELECT{body} LIMIT {limit}{';' if semicolon else ''}{sql[end:]}"
+
+
+def _rewrite_output_inserted(sql):
+    # INSERT ... OUTPUT INSERTED.a VALUES (...) -> INSERT ... VALUES (...) RETURNING a
+    match = _OUTPUT_INSERTED.search(sql)
+    if not match:
+        return sql
+    columns = re.sub(r"INSERTED\.", '', match.group(1), flags=re.I).strip().rstrip(',')
+    sql = (sql[:match.start()] + sql[match.end():]).rstrip().rstrip(';')
+    return f"{sql} RETURNING {columns}"
+
+
+def _primary_key(raw, table):
+    key = _primary_keys.get(table.lower())
+    if key is None:
+        columns = raw.execute(f"PRAGMA table_info({table})").fetchall()
+        key = next((column[1] for column in columns if column[5] == 1), 'rowid')
+        _primary_keys[table.lower()] = key
+    return key
+
+
+def _rewrite_update_from(sql, raw):
+    # UPDATE a SET ... FROM T a JOIN ... WHERE w -> UPDATE T SET ... FROM T AS a JOIN ... WHERE T.pk = a.pk AND w
+    # (SQLite cannot reference the rowid of a joined table here, so the primary key is looked up)
+    match = _UPDATE_FROM.match(sql)
+    if not match or match.group(1).lower() != match.group(4).lower():
+        return sql
+    alias, assignments, table, _, rest = match.groups()
+    where = _find_top_level(rest, r"\s+WHERE\s+")
+    joins, condition = (rest[:where.start()], rest[where.end():]) if where else (rest, None)
+    key = _primary_key(raw, table)
+    condition = f"{table}.{key} = {alias}.{key}" + (f" AND ({condition.strip().rstrip(';')})" if condition else '')
+    return f"UPDATE {table} SET {assignments} FROM {table} AS {alias}{joins} WHERE {condition}"
+
+
+def _rewrite_merge(sql):
+    # The MERGE upsert shape used by attendance.py -> UPDATE ... FROM, then INSERT ... WHERE NOT EXISTS
+    match = _MERGE.match(sql)
+    if not match:
+        return None
+    table, target, source, source_alias, on, assignments, columns, values = match.groups()
+    return [
+        f"UPDATE {table} AS {target} SET {assignments} FROM {source} AS {source_alias} WHERE {on}",
+        f"INSERT INTO {table} ({columns}) SELECT {values} FROM {source} AS {source_alias} "
+        f"WHERE NOT EXISTS (SELECT 1 FROM {table} AS {target} WHERE {on})",
+    ]
+
+
+def _rewrite_delete_output_into(sql):
+    # DELETE TOP (n) FROM T OUTPUT deleted.* INTO A (...) WHERE w -> DELETE ... RETURNING, then INSERT INTO A
+    match = _DELETE_OUTPUT_INTO.match(sql)
+    if not match:
+        return None
+    limit, table, output, archive, columns, condition = match.groups()
+    output = re.sub(r"\bdeleted\.", '', output, flags=re.I)
+    placeholders = ', '.join('?' * len(columns.split(',')))
+    return (f"DELETE FROM {table} WHERE rowid IN (SELECT rowid FROM {table} WHERE {condition} LIMIT {limit}) "
+            f"RETURNING {output}",
+            f"INSERT INTO {archive} ({columns}) VALUES ({placeholders})")
+
+
+def translate(sql, raw):
+    """
+    Rewrites one T-SQL statement for SQLite (``raw`` is a sqlite3 connection,
+    used to look up primary keys). Returns (statements, output_into): the
+    statements to run in order with the original parameters, and for
+    DELETE ... OUTPUT ... INTO the INSERT that receives the deleted rows.
+    """
+    cached = _translations.get(sql)
+    if cached is not None:
+        return cached
+
+    text = _number_params(sql)
+    text = _HINTS.sub('', text)
+    text = _NOW_CALLS.sub(_NOW, text)
+    text = _CAST_DATETIME.sub(r'\1', text)
+    text = _rewrite_left(text)
+    text = _rewrite_values_alias(text)
+    text = _rewrite_top(text)
+
+    output_into = _rewrite_delete_output_into(text)
+    merge = _rewrite_merge(text)
+    if output_into:
+        result = ([output_into[0]], output_into[1])
+    elif merge:
+        result = (merge, None)
+    else:
+        text = _rewrite_output_inserted(text)
+        text = _rewrite_update_from(text, raw)
+        result = ([text], None)
+
+    _translations.set(sql, result)
+    return result
+
+
+# --- DB-API wrappers ---
+_row_classes = LRUCache(256)
+
+
+def _row_class(names):
+    positions = {}
+    for position, name in enumerate(names):
+        positions.setdefault(name, position)
+
+    def __getattr__(self, name):
+        try:
+            return self[positions[name]]
+        except KeyError:
+            raise AttributeError(name) from None
+    return type('Row', (tuple,), {'__slots__': (), '__getattr__': __getattr__})
+
+
+def _row_factory(cursor, values):
+    # Tuples that also allow row.ColumnName, like pyodbc rows
+    names = tuple(column[0] for column in cursor.description)
+    row_class = _row_classes.get(names)
+    if row_class is None:
+        row_class = _row_class(names)
+        _row_classes.set(names, row_class)
+    return row_class(values)
+
+
+class Cursor:
+    """A sqlite3 cursor that accepts the application's T-SQL."""
+
+    def __init__(self, connection):
+        self._connection = connection
+        self._cursor = connection.cursor()
+        self.rowcount = -1
+        # pyodbc-only switch some callers set; SQLite has nothing to switch
+        self.fast_executemany = False
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def _run(self, statements, output_into, params):
+        params = tuple(params or ())
+        if output_into:
+            self._cursor.execute(statements[0], params)
+            rows = self._cursor.fetchall()
+            if rows:
+                self._connection.executemany(output_into, rows)
+            self.rowcount = len(rows)
+            return
+        counts = []
+        for statement in statements:
+            self._cursor.execute(statement, params)
+            counts.append(self._cursor.rowcount)
+        # SELECTs report -1, like pyodbc; MERGE reports both halves together
+        self.rowcount = sum(counts) if all(count >= 0 for count in counts) else counts[-1]
+
+    def execute(self, sql, params=()):
+        statements, output_into = translate(sql, self._connection)
+        self._run(statements, output_into, params)
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        statements, output_into = translate(sql, self._connection)
+        total = 0
+        for params in seq_of_params:
+            self._run(statements, output_into, params)
+            total += max(self.rowcount, 0)
+        self.rowcount = total
+        return self
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def fetchmany(self, size=None):
+        return self._cursor.fetchmany(size or self._cursor.arraysize)
+
+    def close(self):
+        self._cursor.close()
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+
+class Connection:
+    """The subset of a pyodbc connection the application uses."""
+
+    def __init__(self, raw):
+        self._raw = raw
+
+    def cursor(self):
+        return Cursor(self._raw)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def commit(self):
+        self._raw.commit()
+
+    def rollback(self):
+        self._raw.rollback()
+
+    def close(self):
+        self._raw.close()
+
+
+def _open(path):
+    raw = sqlite3.connect(path, detect_types=sqlite3.PARSE_DECLTYPES, timeout=30, check_same_thread=False)
+    raw.row_factory = _row_factory
+    raw.execute("PRAGMA foreign_keys = ON")
+    raw.execute("PRAGMA journal_mode = WAL")
+    raw.execute("PRAGMA synchronous = NORMAL")
+    return raw
+
+
+def connect(path):
+    """Opens a wrapped connection; the pool may hand it to any thread, one at a time."""
+    return Connection(_open(path))
+
+
+# --- Schema bootstrap: the tables and indexes app/migrations.py creates on SQL Server ---
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS SchemaVersion (
+    Version INTEGER PRIMARY KEY,
+    Description TEXT NOT NULL,
+    AppliedAt DATETIME NOT NULL DEFAULT (datetime('now', 'localtime'))
+);
+CREATE TABLE IF NOT EXISTS Users (
+    user_id INTEGER PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    email VARCHAR(100) UNIQUE NOT NULL,
+    password VARCHAR(255) NOT NULL,
+    role VARCHAR(20) NOT NULL CHECK (role IN ('Admin', 'Faculty', 'Student'))
+);
+CREATE TABLE IF NOT EXISTS Students (
+    StudentID INTEGER PRIMARY KEY,
+    user_id INTEGER NULL REFERENCES Users(user_id),
+    Name VARCHAR(100) NOT NULL,
+    Email VARCHAR(100) NOT NULL,
+    Password VARCHAR(255) NULL,
+    Department VARCHAR(100) NULL
+);
+CREATE TABLE IF NOT EXISTS Faculty (
+    FacultyID INTEGER PRIMARY KEY,
+    user_id INTEGER NULL REFERENCES Users(user_id),
+    Name VARCHAR(100) NOT NULL,
+    Email VARCHAR(100) NOT NULL,
+    Password VARCHAR(255) NULL,
+    Department VARCHAR(100) NULL,
+    Designation VARCHAR(100) NULL
+);
+CREATE TABLE IF NOT EXISTS Courses (
+    CourseID INTEGER PRIMARY KEY,
+    CourseCode VARCHAR(20) UNIQUE NOT NULL,
+    CourseName VARCHAR(100) NOT NULL,
+    Description TEXT NULL,
+    FacultyID INTEGER NULL REFERENCES Faculty(FacultyID),
+    Credits INTEGER NOT NULL DEFAULT 3,
+    Room VARCHAR(20) NULL,
+    Status VARCHAR(20) NOT NULL DEFAULT 'active',
+    capacity INTEGER NOT NULL DEFAULT 30,
+    enrolled_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS Enrollments (
+    EnrollmentID INTEGER PRIMARY KEY,
+    StudentID INTEGER NOT NULL REFERENCES Students(StudentID),
+    CourseID INTEGER NOT NULL REFERENCES Courses(CourseID),
+    Grade VARCHAR(5) NULL,
+    EnrollmentDate DATETIME NOT NULL DEFAULT (datetime('now', 'localtime')),
+    attendance_percentage FLOAT NOT NULL DEFAULT 0,
+    attended_count INTEGER NOT NULL DEFAULT 0,
+    held_count INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (StudentID, CourseID)
+);
+CREATE TABLE IF NOT EXISTS Assignments (
+    AssignmentID INTEGER PRIMARY KEY,
+    CourseID INTEGER NOT NULL REFERENCES Courses(CourseID),
+    Title TEXT NOT NULL,
+    Description TEXT NULL,
+    Deadline DATETIME NULL,
+    AttachmentPath TEXT NULL,
+    AttachmentHash CHAR(64) NULL,
+    AttachmentName TEXT NULL,
+    CreatedAt DATETIME NOT NULL DEFAULT (datetime('now', 'localtime'))
+);
+CREATE TABLE IF NOT EXISTS Attendance (
+    AttendanceID INTEGER PRIMARY KEY,
+    CourseID INTEGER NOT NULL REFERENCES Courses(CourseID),
+    StudentID INTEGER NOT NULL REFERENCES Students(StudentID),
+    AttendanceDate DATE NOT NULL,
+    Status VARCHAR(10) NOT NULL CHECK (Status IN ('Present', 'Absent', 'Late'))
+);
+CREATE TABLE IF NOT EXISTS Submissions (
+    SubmissionID INTEGER PRIMARY KEY,
+    AssignmentID INTEGER NOT NULL REFERENCES Assignments(AssignmentID),
+    StudentID INTEGER NOT NULL REFERENCES Students(StudentID),
+    FilePath TEXT NOT NULL,
+    SubmissionDate DATETIME NOT NULL DEFAULT (datetime('now', 'localtime')),
+    FileHash CHAR(64) NULL,
+    FileName TEXT NULL,
+    FileSize BIGINT NULL
+);
+CREATE TABLE IF NOT EXISTS Messages (
+    MessageID INTEGER PRIMARY KEY,
+    SenderID INTEGER NOT NULL,
+    ReceiverID INTEGER NOT NULL,
+    ReceiverType VARCHAR(20) NULL,
+    Subject TEXT NULL,
+    Body TEXT NULL,
+    SentAt DATETIME NOT NULL DEFAULT (datetime('now', 'localtime')),
+    IsRead BIT NOT NULL DEFAULT 0,
+    IsArchived BIT NOT NULL DEFAULT 0,
+    IsDeleted BIT NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS Notifications (
+    NotificationID INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES Users(user_id),
+    Message TEXT NOT NULL,
+    IsRead BIT NOT NULL DEFAULT 0,
+    CreatedAt DATETIME NOT NULL DEFAULT (datetime('now', 'localtime'))
+);
+CREATE TABLE IF NOT EXISTS portal_settings (
+    setting_name VARCHAR(50) PRIMARY KEY,
+    is_active BIT NOT NULL DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS Broadcasts (
+    BroadcastID INTEGER PRIMARY KEY,
+    Message TEXT NOT NULL,
+    TargetRole VARCHAR(20) NULL,
+    CourseID INTEGER NULL,
+    Department VARCHAR(100) NULL,
+    CreatedAt DATETIME NOT NULL DEFAULT (datetime('now', 'localtime'))
+);
+CREATE TABLE IF NOT EXISTS BroadcastReads (
+    user_id INTEGER PRIMARY KEY REFERENCES Users(user_id),
+    LastReadBroadcastID INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS StudentGPA (
+    StudentID INTEGER PRIMARY KEY,
+    TotalPoints FLOAT NOT NULL DEFAULT 0,
+    GradedCount INTEGER NOT NULL DEFAULT 0,
+    GPA FLOAT GENERATED ALWAYS AS
+        (CASE WHEN GradedCount > 0 THEN ROUND(TotalPoints / GradedCount, 2) ELSE 0 END) VIRTUAL,
+    UpdatedAt DATETIME NOT NULL DEFAULT (datetime('now', 'localtime'))
+);
+CREATE TABLE IF NOT EXISTS NotificationsArchive (
+    NotificationID INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    Message TEXT NOT NULL,
+    IsRead BIT NOT NULL,
+    CreatedAt DATETIME NOT NULL,
+    ArchivedAt DATETIME NOT NULL DEFAULT (datetime('now', 'localtime'))
+);
+CREATE TABLE IF NOT EXISTS SubmissionSignatures (
+    SubmissionID INTEGER PRIMARY KEY,
+    AssignmentID INTEGER NOT NULL,
+    Signature BLOB NOT NULL,
+    UpdatedAt DATETIME NOT NULL DEFAULT (datetime('now', 'localtime'))
+);
+CREATE TABLE IF NOT EXISTS SubmissionLSH (
+    AssignmentID INTEGER NOT NULL,
+    Band INTEGER NOT NULL,
+    BucketHash BIGINT NOT NULL,
+    SubmissionID INTEGER NOT NULL,
+    PRIMARY KEY (AssignmentID, Band, BucketHash, SubmissionID)
+);
+CREATE TABLE IF NOT EXISTS SubmissionSimilarity (
+    AssignmentID INTEGER NOT NULL,
+    SubmissionID INTEGER NOT NULL,
+    OtherSubmissionID INTEGER NOT NULL,
+    Score FLOAT NOT NULL,
+    PRIMARY KEY (SubmissionID, OtherSubmissionID)
+);
+
+CREATE INDEX IF NOT EXISTS IX_Messages_Receiver_Folder_SentAt
+    ON Messages (ReceiverID, ReceiverType, IsDeleted, IsArchived, SentAt DESC);
+CREATE INDEX IF NOT EXISTS IX_Notifications_User_CreatedAt ON Notifications (user_id, CreatedAt DESC, NotificationID DESC);
+CREATE INDEX IF NOT EXISTS IX_Notifications_Read_CreatedAt ON Notifications (CreatedAt) WHERE IsRead = 1;
+CREATE INDEX IF NOT EXISTS IX_Broadcasts_CreatedAt ON Broadcasts (CreatedAt DESC, BroadcastID DESC);
+CREATE INDEX IF NOT EXISTS IX_SubmissionSimilarity_Assignment ON SubmissionSimilarity (AssignmentID, SubmissionID, Score DESC);
+CREATE INDEX IF NOT EXISTS IX_Messages_Receiver_Unread ON Messages (ReceiverID, ReceiverType) WHERE IsRead = 0;
+CREATE INDEX IF NOT EXISTS IX_Notifications_User_IsRead ON Notifications (user_id, IsRead);
+CREATE INDEX IF NOT EXISTS IX_Enrollments_Student ON Enrollments (StudentID, CourseID, Grade);
+CREATE INDEX IF NOT EXISTS IX_Enrollments_Course ON Enrollments (CourseID, StudentID);
+CREATE INDEX IF NOT EXISTS IX_Attendance_Course_Student ON Attendance (CourseID, StudentID, AttendanceDate);
+CREATE UNIQUE INDEX IF NOT EXISTS UX_Attendance_Course_Student_Date ON Attendance (CourseID, StudentID, AttendanceDate);
+CREATE INDEX IF NOT EXISTS IX_Submissions_Assignment ON Submissions (AssignmentID, StudentID);
+CREATE INDEX IF NOT EXISTS IX_Submissions_FileHash ON Submissions (FileHash) WHERE FileHash IS NOT NULL;
+CREATE INDEX IF NOT EXISTS IX_Courses_Faculty ON Courses (FacultyID);
+CREATE INDEX IF NOT EXISTS IX_Assignments_Course ON Assignments (CourseID, Deadline);
+CREATE UNIQUE INDEX IF NOT EXISTS UX_Students_User ON Students (user_id) WHERE user_id IS NOT NULL;
+CREATE UNIQUE INDEX IF NOT EXISTS UX_Faculty_User ON Faculty (user_id) WHERE user_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS IX_Students_Name ON Students (Name, StudentID);
+CREATE INDEX IF NOT EXISTS IX_Students_Department ON Students (Department, StudentID);
+CREATE INDEX IF NOT EXISTS IX_Students_Department_Name ON Students (Department, Name, StudentID);
+
+INSERT OR IGNORE INTO portal_settings (setting_name, is_active) VALUES ('enrollment_status', 1);
+"""
+
+
+def bootstrap(path, seed=True):
+    """
+    Creates the schema in a SQLite database file if it is not there yet, marks
+    every migration as applied, and on an empty database adds the same demo
+    accounts create_tables.py seeds.
+    """
+    folder = os.path.dirname(os.path.abspath(path))
+    os.makedirs(folder, exist_ok=True)
+    raw = _open(path)
+    try:
+        raw.executescript(SCHEMA)
+        raw.executemany("INSERT OR IGNORE INTO SchemaVersion (Version, Description) VALUES (?, ?)",
+                        [(version, description) for version, description, _ in MIGRATIONS])
+        if seed and raw.execute("SELECT COUNT(*) FROM Users").fetchone()[0] == 0:
+            raw.executescript(SEED_SCRIPT)
+        raw.commit()
+    finally:
+        raw.close()
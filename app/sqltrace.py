@@ -0,0 +1,205 @@
+import random
+import re
+import time
+from functools import lru_cache
+
+from flask import current_app, g, request, session
+
+# Per-request SQL tracing. For a traced request get_db() hands out a
+# TracedConnection whose cursors record every statement: its text, how many
+# parameters it was given, how long it took and how many rows came back.
+# When a sampled request ends the trace is summarised into a Server-Timing
+# header and a log line, and statements that ran again and again with different
+# parameters (the N+1 pattern) are called out. Recording is two clock reads
+# and a list append per statement, cheap enough to sample in production.
+# Requests that are not traced get the plain connection and pay nothing;
+# SQL_TRACE_RECORD_ALL records every request, unreported, for on_finished
+# hooks such as app.metrics.
+
+_WHITESPACE = re.compile(r'\s+')
+# Runs of placeholders, and of placeholder tuples, that callers build to size
+_PLACEHOLDERS = re.compile(r'\?(?:, \?)+')
+_TUPLES = re.compile(r'(\((?:\?|\?, \.\.\.)\))(?:, \1)+')
+
+# Called as hook(trace) after every traced request, inside the request
+on_finished = []
+
+
+class Statement:
+    """One execute()/executemany() call."""
+
+    __slots__ = ('sql', 'params', 'seconds', 'rows', 'batch')
+
+    def __init__(self, sql, params, seconds, rows, batch):
+        self.sql = sql
+        self.params = params
+        self.seconds = seconds
+        self.rows = rows
+        self.batch = batch
+
+
+class RequestTrace:
+    """Every statement one request executed, in order."""
+
+    def __init__(self, endpoint=None, report=True):
+        self.endpoint = endpoint
+        self.report = report
+        self.statements = []
+
+    @property
+    def queries(self):
+        return len(self.statements)
+
+    @property
+    def seconds(self):
+        return sum(statement.seconds for statement in self.statements)
+
+    def repeated(self, threshold):
+        """[(sql, times)] of statements executed at least ``threshold`` times, most repeated first."""
+        counts = {}
+        for statement in self.statements:
+            counts[statement.sql] = counts.get(statement.sql, 0) + 1
+        return sorted(((sql, times) for sql, times in counts.items() if times >= threshold),
+                      key=lambda item: -item[1])
+
+
+class TracedCursor:
+    """A DB-API cursor that records what it executes into a RequestTrace."""
+
+    def __init__(self, cursor, trace):
+        self._cursor = cursor
+        self._trace = trace
+        self._current = None
+
+    # pyodbc's batch switch lives on the real cursor
+    @property
+    def fast_executemany(self):
+        return self._cursor.fast_executemany
+
+    @fast_executemany.setter
+    def fast_executemany(self, value):
+        self._cursor.fast_executemany = value
+
+    def _record(self, sql, params, started, batch):
+        seconds = time.perf_counter() - started
+        rows = self._cursor.rowcount
+        self._current = Statement(sql, params, seconds, rows if rows >= 0 else 0, batch)
+        self._trace.statements.append(self._current)
+
+    def execute(self, sql, params=()):
+        started = time.perf_counter()
+        self._cursor.execute(sql, params)
+        self._record(sql, len(params), started, 1)
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        seq_of_params = list(seq_of_params)
+        started = time.perf_counter()
+        self._cursor.executemany(sql, seq_of_params)
+        self._record(sql, len(seq_of_params[0]) if seq_of_params else 0, started, len(seq_of_params))
+        return self
+
+    # Rows of SELECTs are counted as they are fetched
+    def _fetched(self, count):
+        if self._current is not None:
+            self._current.rows += count
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        self._fetched(row is not None)
+        return row
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._fetched(len(rows))
+        return rows
+
+    def fetchmany(self, size=None):
+        rows = self._cursor.fetchmany(size) if size else self._cursor.fetchmany()
+        self._fetched(len(rows))
+        return rows
+
+    def __iter__(self):
+        for row in self._cursor:
+            self._fetched(1)
+            yield row
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class TracedConnection:
+    """A pooled connection whose cursors are traced. ``raw`` goes back to the pool."""
+
+    def __init__(self, raw, trace):
+        self.raw = raw
+        self.trace = trace
+
+    def cursor(self):
+        return TracedCursor(self.raw.cursor(), self.trace)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+
+@lru_cache(maxsize=2048)
+def normalize(sql):
+    """
+    Statement text with whitespace collapsed and generated placeholder lists
+    shortened to "?, ...", for grouping and logging.
+    """
+    sql = _WHITESPACE.sub(' ', sql).strip()
+    sql = _PLACEHOLDERS.sub('?, ...', sql.replace('( ?', '(?').replace('? )', '?)'))
+    return _TUPLES.sub(r'\1, ...', sql)
+
+
+def current_trace():
+    """The RequestTrace of the current request, or None if it is not traced."""
+    return g.get('sql_trace')
+
+
+# --- Request hooks ---
+def _start():
+    rate = current_app.config.get('SQL_TRACE_SAMPLE_RATE', 0.0)
+    header = current_app.config.get('SQL_TRACE_HEADER')
+    # Admins can ask for a trace of a single request regardless of sampling
+    forced = header and request.headers.get(header) and session.get('role') == 'Admin'
+    sampled = bool(forced or (rate > 0 and random.random() < rate))
+    # Hooks may want every request's statements; only sampled ones are reported
+    if sampled or current_app.config.get('SQL_TRACE_RECORD_ALL'):
+        g.sql_trace = RequestTrace(request.endpoint, report=sampled)
+
+
+def _summarise(trace, response):
+    milliseconds = trace.seconds * 1000
+    repeated = trace.repeated(current_app.config.get('SQL_TRACE_REPEAT_THRESHOLD', 3))
+    response.headers.add('Server-Timing', f'db;dur={milliseconds:.2f};desc="{trace.queries} queries"')
+
+    summary = f"SQL {request.method} {request.path} ({trace.endpoint}): {trace.queries} queries in {milliseconds:.1f} ms"
+    if repeated:
+        detail = '; '.join(f"{times}x {normalize(sql)[:120]}" for sql, times in repeated)
+        current_app.logger.warning(f"{summary}, possible N+1: {detail}")
+    else:
+        current_app.logger.info(summary)
+
+
+def _finish(response):
+    trace = g.get('sql_trace')
+    if trace is None:
+        return response
+
+    if trace.report:
+        _summarise(trace, response)
+
+    for hook in on_finished:
+        hook(trace)
+    return response
+
+
+def init_app(app):
+    """Samples requests for SQL tracing as configured by SQL_TRACE_*."""
+    app.before_request(_start)
+    app.after_request(_finish)
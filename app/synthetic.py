@@ -0,0 +1,304 @@
+import random
+import time
+from bisect import bisect
+from datetime import datetime, timedelta
+from itertools import accumulate, islice
+
+from werkzeug.security import generate_password_hash
+
+from app.rollups import reconcile
+
+# Synthetic university for load and scale testing. Everything is drawn from
+# one random.Random(seed), so the same sizes and seed always produce the same
+# rows. Popularity is skewed the way real data is: a few courses take most of
+# the enrollments, a few inboxes get most of the mail, a few students miss
+# most of the classes. Rows are streamed to the database in executemany()
+# batches and committed per batch, so memory and transaction size stay flat.
+
+EMAIL_DOMAIN = 'synthetic.example.edu'
+PASSWORD = 'password123'
+BATCH_SIZE = 1000
+
+DEPARTMENTS = [
+    ('Computer Science', 'CS', 0.35),
+    ('Software Engineering', 'SE', 0.25),
+    ('Business Administration', 'BA', 0.25),
+    ('Electrical Engineering', 'EE', 0.15),
+]
+DESIGNATIONS = (('Lecturer', 0.45), ('Assistant Professor', 0.3), ('Associate Professor', 0.15), ('Professor', 0.1))
+GRADES = (('A', 0.18), ('B', 0.27), ('C', 0.2), ('D', 0.07), ('F', 0.03), (None, 0.25))
+CREDITS = ((3, 0.6), (4, 0.15), (2, 0.15), (1, 0.1))
+FIRST_NAMES = ('Ahmed', 'Ali', 'Ayesha', 'Bilal', 'Fatima', 'Hamza', 'Hina', 'Imran', 'Maryam', 'Omar',
+               'Sana', 'Usman', 'Zainab', 'Hassan', 'Noor', 'Saad', 'Amna', 'Danish', 'Iqra', 'Faisal')
+LAST_NAMES = ('Khan', 'Ahmed', 'Malik', 'Hussain', 'Raza', 'Qureshi', 'Sheikh', 'Butt', 'Chaudhry', 'Siddiqui',
+              'Mirza', 'Iqbal', 'Javed', 'Aslam', 'Farooq')
+TOPICS = ('Programming', 'Data Structures', 'Algorithms', 'Databases', 'Networks', 'Operating Systems',
+          'Accounting', 'Marketing', 'Finance', 'Circuits', 'Signals', 'Machine Learning', 'Statistics',
+          'Calculus', 'Ethics', 'Software Design', 'Economics', 'Management', 'Electronics', 'Compilers')
+SUBJECTS = ('Question about the assignment', 'Attendance query', 'Meeting request', 'Grade review',
+            'Lecture slides', 'Deadline extension', 'Project proposal', 'Exam schedule')
+WORDS = ('please', 'could', 'you', 'review', 'the', 'lecture', 'notes', 'for', 'next', 'week', 'assignment',
+         'deadline', 'thanks', 'regarding', 'my', 'submission', 'project', 'meeting', 'office', 'hours')
+
+# Named sizes for seed_data.py --size; any count can still be overridden
+SIZES = {
+    'tiny': dict(students=200, faculty=10, courses=30, enrollments_per_student=4, class_days=8,
+                 messages=1000, notifications=2000, broadcasts=20),
+    'small': dict(students=5000, faculty=150, courses=400, enrollments_per_student=5, class_days=12,
+                  messages=50000, notifications=100000, broadcasts=200),
+    'large': dict(students=50000, faculty=1000, courses=3000, enrollments_per_student=6, class_days=20,
+                  messages=2000000, notifications=2000000, broadcasts=2000),
+}
+
+
+class Weighted:
+    """Draws from fixed (value, weight) pairs in O(log n) per draw."""
+
+    def __init__(self, rng, pairs):
+        self.rng = rng
+        self.values = [value for value, _ in pairs]
+        self.cumulative = list(accumulate(weight for _, weight in pairs))
+
+    def __call__(self):
+        return self.values[bisect(self.cumulative, self.rng.random() * self.cumulative[-1])]
+
+
+def zipf(rng, items, exponent=1.1):
+    """A Weighted over ``items`` in random rank order with Zipf(``exponent``) weights."""
+    ranked = list(items)
+    rng.shuffle(ranked)
+    return Weighted(rng, [(item, 1.0 / (rank + 1) ** exponent) for rank, item in enumerate(ranked)])
+
+
+def _moment(rng, days_back, now):
+    # Recent activity is denser than old activity
+    return now - timedelta(days=days_back * rng.random() ** 2, seconds=rng.randrange(86400))
+
+
+def _sentence(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+
+def bulk_insert(db, sql, rows, batch_size=BATCH_SIZE):
+    """
+    Sends ``rows`` (any iterable) through executemany() in batches of
+    ``batch_size`` and commits after each batch. Returns the number of rows.
+    """
+    cursor = db.cursor()
+    cursor.fast_executemany = True
+    rows = iter(rows)
+    written = 0
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return written
+        cursor.executemany(sql, batch)
+        db.commit()
+        written += len(batch)
+
+
+class Generator:
+    """Builds one synthetic university of the given sizes into ``db``."""
+
+    def __init__(self, db, seed=1, batch_size=BATCH_SIZE, log=print, **sizes):
+        self.db = db
+        self.seed = seed
+        self.batch_size = batch_size
+        self.log = log
+        self.sizes = dict(SIZES['tiny'], **sizes)
+        self.rng = random.Random(seed)
+        self.now = datetime(2026, 1, 1) + timedelta(days=seed % 365)
+        self.departments = Weighted(self.rng, [(name, weight) for name, _, weight in DEPARTMENTS])
+
+    def _insert(self, table, sql, rows):
+        started = time.perf_counter()
+        written = bulk_insert(self.db, sql, rows, self.batch_size)
+        self.log(f"{table}: {written} rows in {time.perf_counter() - started:.1f}s")
+        return written
+
+    def _name(self):
+        return f"{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)}"
+
+    def _ids(self, sql):
+        cursor = self.db.cursor()
+        cursor.execute(sql, (f"%@{EMAIL_DOMAIN}",))
+        return cursor.fetchall()
+
+    # --- People ---
+    def people(self):
+        password = generate_password_hash(PASSWORD)
+        designations = Weighted(self.rng, DESIGNATIONS)
+        faculty = [(self._name(), f"faculty{n}@{EMAIL_DOMAIN}", self.departments(), designations())
+                   for n in range(self.sizes['faculty'])]
+        students = [(self._name(), f"student{n}@{EMAIL_DOMAIN}", self.departments())
+                    for n in range(self.sizes['students'])]
+
+        self._insert('Users', "INSERT INTO Users (name, email, password, role) VALUES (?, ?, ?, ?)",
+                     [(name, email, password, 'Faculty') for name, email, _, _ in faculty]
+                     + [(name, email, password, 'Student') for name, email, _ in students])
+        user_ids = dict(
+            (email, user_id) for user_id, email in
+            self._ids("SELECT user_id, email FROM Users WHERE email LIKE ?")
+        )
+        self._insert('Faculty', "INSERT INTO Faculty (user_id, Name, Email, Password, Department, Designation) "
+                                "VALUES (?, ?, ?, ?, ?, ?)",
+                     ((user_ids[email], name, email, PASSWORD, department, designation)
+                      for name, email, department, designation in faculty))
+        self._insert('Students', "INSERT INTO Students (user_id, Name, Email, Password, Department) "
+                                 "VALUES (?, ?, ?, ?, ?)",
+                     ((user_ids[email], name, email, PASSWORD, department)
+                      for name, email, department in students))
+
+        # (FacultyID, user_id, Department) and (StudentID, user_id, Department)
+        self.faculty = self._ids("SELECT FacultyID, user_id, Department FROM Faculty WHERE Email LIKE ? "
+                                 "ORDER BY FacultyID")
+        self.students = self._ids("SELECT StudentID, user_id, Department FROM Students WHERE Email LIKE ? "
+                                  "ORDER BY StudentID")
+
+    # --- Courses and enrollments ---
+    def courses(self):
+        codes = {name: code for name, code, _ in DEPARTMENTS}
+        by_department = {}
+        for row in self.faculty:
+            by_department.setdefault(row[2], []).append(row[0])
+        # A few faculty members teach many sections, most teach one or two
+        teachers = {department: zipf(self.rng, ids, 0.8) for department, ids in by_department.items()}
+        credits = Weighted(self.rng, CREDITS)
+
+        rows = []
+        for n in range(self.sizes['courses']):
+            department = self.departments()
+            teacher = teachers.get(department) or zipf(self.rng, [row[0] for row in self.faculty])
+            topic = self.rng.choice(TOPICS)
+            rows.append((f"{codes[department]}{n:05d}-{self.seed}", f"{topic} {n // len(TOPICS) + 1}",
+                         _sentence(self.rng, 12), teacher(), credits(), f"R-{self.rng.randrange(1, 400)}",
+                         'active' if self.rng.random() < 0.92 else 'inactive'))
+        self._insert('Courses', "INSERT INTO Courses (CourseCode, CourseName, Description, FacultyID, Credits, "
+                                "Room, Status) VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+
+        cursor = self.db.cursor()
+        cursor.execute("SELECT CourseID, CourseCode FROM Courses WHERE CourseCode LIKE ?", (f"%-{self.seed}",))
+        department_of = {code[:2]: name for name, code, _ in DEPARTMENTS}
+        self.courses_by_department = {}
+        for course_id, code in cursor.fetchall():
+            self.courses_by_department.setdefault(department_of[code[:2]], []).append(course_id)
+        self.course_ids = [course_id for ids in self.courses_by_department.values() for course_id in ids]
+
+    def enrollments(self):
+        # Popular courses fill up, long-tail electives barely run
+        popular = {department: zipf(self.rng, ids) for department, ids in self.courses_by_department.items()}
+        anywhere = zipf(self.rng, self.course_ids)
+        grades = Weighted(self.rng, GRADES)
+        mean = self.sizes['enrollments_per_student']
+
+        self.enrolled = []
+        for student_id, _, department in self.students:
+            wanted = max(1, min(len(self.course_ids), round(self.rng.gauss(mean, mean / 3))))
+            picked = set()
+            for _ in range(wanted * 3):
+                if len(picked) >= wanted:
+                    break
+                own = popular.get(department)
+                picked.add(own() if own and self.rng.random() < 0.75 else anywhere())
+            for course_id in picked:
+                self.enrolled.append((student_id, course_id))
+
+        def rows():
+            for student_id, course_id in self.enrolled:
+                yield student_id, course_id, grades(), _moment(self.rng, 365, self.now)
+        self._insert('Enrollments', "INSERT INTO Enrollments (StudentID, CourseID, Grade, EnrollmentDate) "
+                                    "VALUES (?, ?, ?, ?)", rows())
+
+    def attendance(self):
+        days = self.sizes['class_days']
+        start = self.now.date() - timedelta(days=days * 3)
+        # Each course meets on its own days; each student has a personal attendance rate
+        meetings = {course_id: sorted(self.rng.sample(range(days * 3), days)) for course_id in self.course_ids}
+        reliability = {student_id: self.rng.betavariate(8, 1.5) for student_id, _, _ in self.students}
+
+        def rows():
+            for student_id, course_id in self.enrolled:
+                rate = reliability[student_id]
+                for offset in meetings[course_id]:
+                    roll = self.rng.random()
+                    status = 'Absent' if roll > rate else ('Late' if roll > rate * 0.9 else 'Present')
+                    yield course_id, student_id, start + timedelta(days=offset), status
+        self._insert('Attendance', "INSERT INTO Attendance (CourseID, StudentID, AttendanceDate, Status) "
+                                   "VALUES (?, ?, ?, ?)", rows())
+
+    # --- Mail ---
+    def messages(self):
+        students = zipf(self.rng, self.students)
+        faculty = zipf(self.rng, self.faculty)
+
+        def rows():
+            for _ in range(self.sizes['messages']):
+                roll = self.rng.random()
+                if roll < 0.55:
+                    sender, receiver = students()[1], faculty()[0]
+                    receiver_type = 'Faculty'
+                elif roll < 0.95:
+                    sender, receiver = faculty()[1], students()[1]
+                    receiver_type = 'Student'
+                else:
+                    sender, receiver, receiver_type = faculty()[1], 1, 'Admin'
+                sent_at = _moment(self.rng, 365, self.now)
+                age = (self.now - sent_at).days
+                yield (sender, receiver, receiver_type, self.rng.choice(SUBJECTS),
+                       _sentence(self.rng, self.rng.randint(8, 80)), sent_at,
+                       self.rng.random() < min(0.97, 0.4 + age / 60),
+                       self.rng.random() < 0.08, self.rng.random() < 0.04)
+        self._insert('Messages', "INSERT INTO Messages (SenderID, ReceiverID, ReceiverType, Subject, Body, SentAt, "
+                                 "IsRead, IsArchived, IsDeleted) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows())
+
+    def notifications(self):
+        users = zipf(self.rng, [row[1] for row in self.students] + [row[1] for row in self.faculty])
+
+        def rows():
+            for _ in range(self.sizes['notifications']):
+                created_at = _moment(self.rng, 365, self.now)
+                age = (self.now - created_at).days
+                yield (users(), f"{self.rng.choice(SUBJECTS)}: {_sentence(self.rng, 10)}", created_at,
+                       self.rng.random() < min(0.98, 0.3 + age / 30))
+        self._insert('Notifications', "INSERT INTO Notifications (user_id, Message, CreatedAt, IsRead) "
+                                      "VALUES (?, ?, ?, ?)", rows())
+
+    def broadcasts(self):
+        def rows():
+            for _ in range(self.sizes['broadcasts']):
+                roll = self.rng.random()
+                role = course_id = department = None
+                if roll < 0.3:
+                    role = self.rng.choice(('Student', 'Faculty'))
+                elif roll < 0.7:
+                    course_id = self.rng.choice(self.course_ids)
+                elif roll < 0.85:
+                    department = self.departments()
+                yield (_sentence(self.rng, 15), role, course_id, department, _moment(self.rng, 365, self.now))
+        self._insert('Broadcasts', "INSERT INTO Broadcasts (Message, TargetRole, CourseID, Department, CreatedAt) "
+                                   "VALUES (?, ?, ?, ?, ?)", rows())
+
+    def run(self):
+        """Generates everything, then rebuilds the denormalized counters."""
+        self.people()
+        self.courses()
+        self.enrollments()
+        self.attendance()
+        self.messages()
+        self.notifications()
+        self.broadcasts()
+        started = time.perf_counter()
+        reconcile(self.db, fix=True)
+        # Popular sections were oversubscribed on purpose; size rooms to fit them
+        cursor = self.db.cursor()
+        cursor.execute("UPDATE Courses SET capacity = enrolled_count WHERE capacity < enrolled_count "
+                       "AND CourseCode LIKE ?", (f"%-{self.seed}",))
+        self.db.commit()
+        self.log(f"Counters rebuilt in {time.perf_counter() - started:.1f}s")
+
+
+def already_seeded(db):
+    """True if synthetic accounts already exist (emails are not reusable)."""
+    cursor = db.cursor()
+    cursor.execute("SELECT COUNT(*) FROM Users WHERE email LIKE ?", (f"%@{EMAIL_DOMAIN}",))
+    return cursor.fetchone()[0] > 0
@@ -0,0 +1,103 @@
+from flask import current_app
+
+from app import broadcasts
+from app.cache import TTLCache
+from app.database import get_db
+
+# Counts are cached per worker; the TTL bounds how stale another worker's
+# writes can make them look.
+CACHE_SIZE = 20000
+
+_counts = None
+
+
+def _cache():
+    global _counts
+    if _counts is None:
+        _counts = TTLCache(CACHE_SIZE, current_app.config.get('UNREAD_CACHE_TTL', 60))
+    return _counts
+
+
+def _id(value):
+    """Form values arrive as strings, session values as ints - key on one type."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def _cached_count(key, load):
+    count = _cache().get(key)
+    if count is None:
+        count = load(get_db().cursor())
+        _cache().set(key, count)
+    return count
+
+
+def _count_query(sql, params):
+    def load(cursor):
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+        return row[0] if row else 0
+    return load
+
+
+# --- Reads ---
+def unread_notifications(user_id, role, profile_id):
+    """
+    Returns the number of unread notifications (personal rows plus unread
+    broadcasts) for a user. Only touches the database when not cached.
+    """
+    return _cached_count(
+        ('notifications', _id(user_id)),
+        lambda cursor: broadcasts.unread_count(cursor, user_id, role, profile_id),
+    )
+
+
+def unread_messages(receiver_id, receiver_type):
+    """
+    Returns the number of unread messages addressed to ``receiver_id``
+    (the value stored in Messages.ReceiverID) as ``receiver_type``.
+    """
+    return _cached_count(
+        ('messages', _id(receiver_id), receiver_type),
+        _count_query(
+            "SELECT COUNT(*) FROM Messages WHERE ReceiverID = ? AND ReceiverType = ? AND IsRead = 0",
+            (receiver_id, receiver_type),
+        ),
+    )
+
+
+# --- Writes ---
+def set_unread_notifications(user_id, count):
+    _cache().set(('notifications', _id(user_id)), count)
+
+
+def set_unread_messages(receiver_id, receiver_type, count):
+    _cache().set(('messages', _id(receiver_id), receiver_type), count)
+
+
+def adjust_unread_notifications(user_id, delta):
+    """Shifts a cached notification count; uncached counts are left to the next read."""
+    _cache().update(('notifications', _id(user_id)), lambda count: max(0, count + delta))
+
+
+def adjust_unread_messages(receiver_id, receiver_type, delta):
+    """Shifts a cached message count; uncached counts are left to the next read."""
+    _cache().update(('messages', _id(receiver_id), receiver_type), lambda count: max(0, count + delta))
+
+
+def invalidate_notifications(user_id=None):
+    """Forgets one user's notification count, or everybody's."""
+    if user_id is None:
+        _cache().pop_matching(lambda key: key[0] == 'notifications')
+    else:
+        _cache().pop(('notifications', _id(user_id)))
+
+
+def invalidate_messages(receiver_id, receiver_type=None):
+    """Forgets the message count(s) of a receiver, for one or every receiver type."""
+    if receiver_type is None:
+        _cache().pop_matching(lambda key: key[0] == 'messages' and key[1] == _id(receiver_id))
+    else:
+        _cache().pop(('messages', _id(receiver_id), receiver_type))
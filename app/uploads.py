@@ -0,0 +1,230 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import zlib
+
+from flask import Request, abort, current_app, request, send_from_directory
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.security import safe_join
+from werkzeug.utils import send_file
+
+from app.cache import LRUCache
+
+# Content-addressed upload store. Every file lives once under its SHA-256 in
+# a sharded tree (<root>/ab/cd/abcd...), so identical uploads share one blob
+# and no directory grows past a few hundred entries. Uploaded parts are
+# hashed while the multipart parser writes them to disk, so storing a file is
+# a rename, not a second pass over it.
+
+CHUNK_SIZE = 64 * 1024
+
+_INCOMING = '.incoming'
+
+# CRC-32 of files uploaded before the store, keyed by (path, size, mtime)
+_legacy_crcs = LRUCache(10000)
+
+
+def store_root():
+    return current_app.config.get('UPLOAD_FOLDER') or os.path.join(current_app.instance_path, 'uploads')
+
+
+def blob_relpath(digest):
+    return os.path.join(digest[:2], digest[2:4], digest)
+
+
+def blob_path(digest):
+    """Absolute path of a stored blob, or None for something that is not a hash."""
+    if not digest or len(digest) != 64 or any(c not in '0123456789abcdef' for c in digest):
+        return None
+    return os.path.join(store_root(), blob_relpath(digest))
+
+
+class IncomingFile:
+    """
+    A temp file inside the store that hashes everything written to it and
+    refuses to grow past ``limit`` bytes. Deleted on close unless stored.
+    """
+
+    def __init__(self, directory, limit=None):
+        os.makedirs(directory, exist_ok=True)
+        fd, self.name = tempfile.mkstemp(dir=directory)
+        self._file = os.fdopen(fd, 'w+b')
+        self._hash = hashlib.sha256()
+        self.crc32 = 0
+        self.size = 0
+        self.limit = limit
+        self.stored = False
+
+    def write(self, data):
+        self.size += len(data)
+        if self.limit and self.size > self.limit:
+            # The parser drops the part without closing it, so clean up here
+            self.close()
+            raise RequestEntityTooLarge()
+        self._hash.update(data)
+        self.crc32 = zlib.crc32(data, self.crc32)
+        return self._file.write(data)
+
+    def hexdigest(self):
+        return self._hash.hexdigest()
+
+    def close(self):
+        self._file.close()
+        if not self.stored and os.path.exists(self.name):
+            os.remove(self.name)
+
+    def __getattr__(self, name):
+        # read/seek/tell/readable/... for whoever consumes the FileStorage
+        return getattr(self._file, name)
+
+    def __iter__(self):
+        return iter(self._file)
+
+
+class UploadRequest(Request):
+    """Streams multipart file parts straight into the upload store."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return IncomingFile(os.path.join(store_root(), _INCOMING),
+                            current_app.config.get('UPLOAD_MAX_FILE_SIZE'))
+
+
+def _commit(incoming):
+    """Moves a finished IncomingFile to its blob path; returns (digest, size)."""
+    incoming.flush()
+    digest = incoming.hexdigest()
+    target = blob_path(digest)
+    if os.path.exists(target):
+        # Same content already stored: the new copy is dropped on close
+        return digest, incoming.size
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    # Windows cannot rename an open file: close, move, reopen read-only
+    position = incoming.tell()
+    incoming._file.close()
+    os.replace(incoming.name, target)
+    incoming.stored = True
+    incoming.name = target
+    incoming._file = open(target, 'rb')
+    incoming._file.seek(position)
+    _write_crc32(target, incoming.crc32)
+    return digest, incoming.size
+
+
+# --- CRC-32 sidecars (ZIP entries need it up front) ---
+def _write_crc32(path, crc):
+    with open(path + '.crc32', 'w') as sidecar:
+        sidecar.write(f"{crc:08x}")
+
+
+def file_crc32(path):
+    crc = 0
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            crc = zlib.crc32(chunk, crc)
+    return crc
+
+
+def blob_crc32(digest):
+    """CRC-32 of a blob, from its sidecar file; computed and saved once if missing."""
+    path = blob_path(digest)
+    try:
+        with open(path + '.crc32') as sidecar:
+            return int(sidecar.read(), 16)
+    except (OSError, ValueError):
+        crc = file_crc32(path)
+        _write_crc32(path, crc)
+        return crc
+
+
+def _legacy_root():
+    return os.path.join(current_app.static_folder, 'uploads')
+
+
+def _legacy_relpath(relpath):
+    # Assignments stored 'uploads/<name>', Submissions just '<name>'
+    return relpath[len('uploads/'):] if relpath.startswith('uploads/') else relpath
+
+
+def legacy_path(relpath):
+    """Absolute path of a file uploaded before the store existed, or None if unsafe."""
+    return safe_join(_legacy_root(), _legacy_relpath(relpath))
+
+
+def legacy_crc32(path):
+    stat = os.stat(path)
+    key = (path, stat.st_size, stat.st_mtime)
+    crc = _legacy_crcs.get(key)
+    if crc is None:
+        crc = file_crc32(path)
+        _legacy_crcs.set(key, crc)
+    return crc
+
+
+def store(file_storage):
+    """
+    Stores an uploaded FileStorage and returns (sha256, size). Files parsed by
+    UploadRequest are already on disk and hashed; any other stream is copied
+    in chunks.
+    """
+    stream = file_storage.stream
+    if isinstance(stream, IncomingFile):
+        return _commit(stream)
+
+    incoming = IncomingFile(os.path.join(store_root(), _INCOMING),
+                            current_app.config.get('UPLOAD_MAX_FILE_SIZE'))
+    try:
+        shutil.copyfileobj(stream, incoming, CHUNK_SIZE)
+        return _commit(incoming)
+    finally:
+        incoming.close()
+
+
+# --- Serving ---
+def _private(response):
+    # Blobs never change, but who may read them does: browsers only
+    response.cache_control.public = None
+    response.cache_control.private = True
+    return response
+
+
+def send_blob(digest, download_name=None, as_attachment=False):
+    """
+    Serves a stored blob with its hash as strong ETag. Answered in Python,
+    Range/If-Range and conditional GETs are handled by send_file. With
+    UPLOAD_X_ACCEL_PREFIX (nginx) or USE_X_SENDFILE (Apache, lighttpd) set
+    the transfer, including ranges, is left to the front-end server and only
+    revalidation is answered here.
+    """
+    path = blob_path(digest)
+    if not path or not os.path.isfile(path):
+        abort(404)
+
+    accel_prefix = current_app.config.get('UPLOAD_X_ACCEL_PREFIX')
+    offload = bool(accel_prefix or current_app.config.get('USE_X_SENDFILE'))
+    if offload and request.if_none_match.contains(digest):
+        response = current_app.response_class(status=304)
+        response.set_etag(digest)
+        return _private(response)
+
+    response = send_file(
+        path, request.environ,
+        download_name=download_name or digest,
+        as_attachment=as_attachment,
+        conditional=not offload,
+        etag=digest,
+        max_age=current_app.config.get('UPLOAD_CACHE_MAX_AGE', 3600),
+        use_x_sendfile=offload,
+        response_class=current_app.response_class,
+    )
+    if accel_prefix:
+        del response.headers['X-Sendfile']
+        response.headers['X-Accel-Redirect'] = f"{accel_prefix.rstrip('/')}/{digest[:2]}/{digest[2:4]}/{digest}"
+    return _private(response)
+
+
+def send_legacy(relpath, download_name=None):
+    """Serves a file uploaded before the store existed, from static/uploads."""
+    response = send_from_directory(_legacy_root(), _legacy_relpath(relpath),
+                                   download_name=download_name, conditional=True)
+    return _private(response)
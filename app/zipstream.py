@@ -0,0 +1,120 @@
+import hashlib
+import struct
+
+# ZIP archives streamed straight from the upload store. Entries are STORED
+# (uploads are mostly PDFs, images and office files that do not compress), and
+# their CRC-32 and sizes are known before the first byte goes out, so the
+# layout of the whole archive is fixed up front: the response has an exact
+# Content-Length, and any byte range can be produced by seeking into the
+# member files instead of rebuilding everything before it.
+
+CHUNK_SIZE = 64 * 1024
+
+_UTF8_NAMES = 0x0800
+_ZIP64_LIMIT = 0xFFFFFFFF
+
+
+def _dos_datetime(moment):
+    if moment is None or moment.year < 1980:
+        return 0, (1 << 5) | 1
+    time = (moment.hour << 11) | (moment.minute << 5) | (moment.second // 2)
+    date = ((moment.year - 1980) << 9) | (moment.month << 5) | moment.day
+    return time, date
+
+
+class ZipEntry:
+    """One member: archive name, source path on disk, size, CRC-32 and timestamp."""
+
+    def __init__(self, name, path, size, crc32, modified=None):
+        self.name = name
+        self.path = path
+        self.size = size
+        self.crc32 = crc32
+        self.modified = modified
+
+
+class StreamingZip:
+    """
+    A STORED zip of ``entries`` laid out as a list of segments (bytes, or a
+    file to copy). Switches to ZIP64 records when the archive would pass 4 GiB.
+    """
+
+    def __init__(self, entries):
+        self.entries = list(entries)
+        self.zip64 = self._plain_size() >= _ZIP64_LIMIT or len(self.entries) >= 0xFFFF
+        self.segments = []
+        self._layout()
+        self.size = sum(length for length, _ in self.segments)
+
+    def _plain_size(self):
+        # Size without ZIP64 records: local headers, data, central directory
+        # and end record. Below 4 GiB every offset and length fits 32 bits.
+        names = sum(len(entry.name.encode('utf-8')) for entry in self.entries)
+        return sum(entry.size for entry in self.entries) + (30 + 46) * len(self.entries) + 2 * names + 22
+
+    def _extra(self, *values):
+        return struct.pack(f'<HH{len(values)}Q', 0x0001, 8 * len(values), *values)
+
+    def _layout(self):
+        version = 45 if self.zip64 else 20
+        central = []
+        offset = 0
+        for entry in self.entries:
+            name = entry.name.encode('utf-8')
+            time, date = _dos_datetime(entry.modified)
+            size32 = _ZIP64_LIMIT if self.zip64 else entry.size
+
+            extra = self._extra(entry.size, entry.size) if self.zip64 else b''
+            local = struct.pack('<IHHHHHIIIHH', 0x04034B50, version, _UTF8_NAMES, 0, time, date,
+                                entry.crc32, size32, size32, len(name), len(extra)) + name + extra
+            self.segments.append((len(local), local))
+            self.segments.append((entry.size, entry.path))
+
+            extra = self._extra(entry.size, entry.size, offset) if self.zip64 else b''
+            central.append(struct.pack('<IHHHHHHIIIHHHHHII', 0x02014B50, version, version, _UTF8_NAMES, 0,
+                                       time, date, entry.crc32, size32, size32, len(name), len(extra),
+                                       0, 0, 0, 0, _ZIP64_LIMIT if self.zip64 else offset) + name + extra)
+            offset += len(local) + entry.size
+
+        directory = b''.join(central)
+        count = len(self.entries)
+        tail = b''
+        if self.zip64:
+            tail += struct.pack('<IQHHIIQQQQ', 0x06064B50, 44, version, version, 0, 0,
+                                count, count, len(directory), offset)
+            tail += struct.pack('<IIQI', 0x07064B50, 0, offset + len(directory), 1)
+            tail += struct.pack('<IHHHHIIH', 0x06054B50, 0, 0, 0xFFFF, 0xFFFF,
+                                _ZIP64_LIMIT, _ZIP64_LIMIT, 0)
+        else:
+            tail += struct.pack('<IHHHHIIH', 0x06054B50, 0, 0, count, count, len(directory), offset, 0)
+        self.segments.append((len(directory) + len(tail), directory + tail))
+
+    def etag(self):
+        """Strong validator of the archive: changes whenever any byte would."""
+        digest = hashlib.sha256()
+        for length, part in self.segments:
+            digest.update(part if isinstance(part, bytes) else f"{part}:{length}".encode())
+        return digest.hexdigest()
+
+    def iter_range(self, start=0, stop=None):
+        """Yields the bytes [start, stop) of the archive in bounded chunks."""
+        stop = self.size if stop is None else stop
+        position = 0
+        for length, part in self.segments:
+            begin, end = max(start, position), min(stop, position + length)
+            if begin < end:
+                if isinstance(part, bytes):
+                    yield part[begin - position:end - position]
+                else:
+                    with open(part, 'rb') as source:
+                        source.seek(begin - position)
+                        remaining = end - begin
+                        while remaining:
+                            chunk = source.read(min(CHUNK_SIZE, remaining))
+                            if not chunk:
+                                raise IOError(f"{part} is shorter than recorded")
+                            remaining -= len(chunk)
+                            yield chunk
+            position += length
+            if position >= stop:
+                return
@@ -0,0 +1,30 @@
+import argparse
+
+from app import create_app
+from app.database import get_db
+from app.retention import archive_read_notifications, BATCH_SIZE
+
+app = create_app()
+
+
+def main():
+    """
+    Moves old read notifications out of Notifications into NotificationsArchive.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--days', type=int, help="archive read notifications older than this (default: NOTIFICATION_RETENTION_DAYS)")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="rows moved per transaction")
+    parser.add_argument('--dry-run', action='store_true', help="only count the rows that would be archived")
+    args = parser.parse_args()
+
+    with app.app_context():
+        count = archive_read_notifications(get_db(), args.days, args.batch_size, dry_run=args.dry_run)
+
+    if args.dry_run:
+        print(f"{count} notifications would be archived (dry run, nothing changed).")
+    else:
+        print(f"Archived {count} notifications.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,311 @@
+import argparse
+import gc
+import json
+import multiprocessing
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+from app import create_app, database, sqltrace
+from app.synthetic import EMAIL_DOMAIN, PASSWORD, SIZES, Generator, already_seeded
+from config import Config
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DEFAULT_DATABASE = os.path.join('instance', 'benchmark.sqlite3')
+DEFAULT_BASELINE = 'benchmark_baseline.json'
+# Below this many measured requests p95 is just the slowest one, too noisy to compare
+MIN_REQUESTS_FOR_P95 = 20
+
+# Queries of the last traced request on this thread
+_counter = threading.local()
+
+
+def _count(trace):
+    _counter.queries = trace.queries
+
+
+sqltrace.on_finished.append(_count)
+
+
+def make_app(path):
+    class BenchmarkConfig(Config):
+        SECRET_KEY = 'benchmark'
+        DB_BACKEND = 'sqlite'
+        SQLITE_PATH = path
+        SQL_TRACE_SAMPLE_RATE = 1.0
+
+    return create_app(BenchmarkConfig)
+
+
+def reset_peak_rss():
+    """Restarts the peak RSS count (Linux 4.0+); elsewhere the peak covers the whole run."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def peak_rss_mb():
+    """Peak resident memory since the last reset_peak_rss()."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+# --- Database ---
+def seed_database(path, size, seed):
+    """Seeds ``path`` unless it already holds synthetic data. Run in a child process."""
+    app = make_app(path)
+    with app.app_context():
+        db = database.get_db()
+        if not already_seeded(db):
+            print(f"Seeding {path} ({size}, seed {seed})...")
+            Generator(db, seed=seed, **SIZES[size]).run()
+
+
+def working_copy(path):
+    """A throwaway copy of ``path``, so routes that write leave the seeded database as it was."""
+    fd, copy = tempfile.mkstemp(prefix='benchmark-', suffix='.sqlite3', dir=os.path.dirname(path))
+    os.close(fd)
+    source, target = sqlite3.connect(path), sqlite3.connect(copy)
+    try:
+        source.backup(target)
+    finally:
+        source.close()
+        target.close()
+    return copy
+
+
+def remove_copy(copy):
+    for name in (copy, copy + '-wal', copy + '-shm'):
+        if os.path.exists(name):
+            os.remove(name)
+
+
+# --- Scenarios ---
+def pick_accounts(app):
+    """The busiest student and faculty member, and the faculty member's largest course."""
+    with app.app_context():
+        cursor = database.get_db().cursor()
+        cursor.execute("""
+            SELECT TOP 1 s.Email
+            FROM Students s JOIN Enrollments e ON e.StudentID = s.StudentID
+            WHERE s.Email LIKE ?
+            GROUP BY s.Email
+            ORDER BY COUNT(*) DESC, s.Email
+        """, (f"%@{EMAIL_DOMAIN}",))
+        student = cursor.fetchone()[0]
+        cursor.execute("""
+            SELECT TOP 1 f.Email, c.CourseID
+            FROM Courses c JOIN Faculty f ON f.FacultyID = c.FacultyID
+            WHERE f.Email LIKE ?
+            ORDER BY c.enrolled_count DESC, c.CourseID
+        """, (f"%@{EMAIL_DOMAIN}",))
+        faculty, course_id = cursor.fetchone()
+    return student, faculty, course_id
+
+
+def login(app, email, password):
+    client = app.test_client()
+    response = client.post('/auth/login', data={'email': email, 'password': password})
+    if response.status_code != 302:
+        raise RuntimeError(f"Could not sign in as {email} ({response.status_code})")
+    return client
+
+
+def scenarios(app):
+    """(endpoint, client factory, method, url, form data) for every benchmarked route."""
+    student, faculty, course_id = pick_accounts(app)
+    as_student = login(app, student, PASSWORD)
+    as_faculty = login(app, faculty, PASSWORD)
+    as_admin = login(app, 'admin@uni.com', 'admin123')
+    return [
+        ('auth.login', app.test_client, 'post', '/auth/login', {'email': student, 'password': PASSWORD}),
+        ('student.dashboard', lambda: as_student, 'get', '/student/dashboard', None),
+        ('student.messages', lambda: as_student, 'get', '/student/messages', None),
+        ('faculty.manage_course', lambda: as_faculty, 'get', f'/faculty/manage_course/{course_id}', None),
+        ('admin.list_students', lambda: as_admin, 'get', '/admin/students', None),
+        ('admin.manage_enrollments', lambda: as_admin, 'get', '/admin/manage_enrollments', None),
+        ('admin.send_broadcast', lambda: as_admin, 'post', '/admin/send_broadcast',
+         {'target': 'Student', 'message': 'Benchmark broadcast'}),
+    ]
+
+
+def _round(client_factory, method, url, data, requests, warmup):
+    timings = []
+    queries = []
+    gc.collect()
+    gc.disable()
+    try:
+        for n in range(warmup + requests):
+            client = client_factory()
+            _counter.queries = 0
+            started = time.perf_counter()
+            response = getattr(client, method)(url, data=data)
+            elapsed = time.perf_counter() - started
+            if response.status_code >= 400:
+                raise RuntimeError(f"{method.upper()} {url} returned {response.status_code}")
+            if n >= warmup:
+                timings.append(elapsed)
+                queries.append(_counter.queries)
+    finally:
+        gc.enable()
+    return timings, queries
+
+
+def measure(client_factory, method, url, data, requests, warmup, repeat):
+    """
+    Latency percentiles (ms), throughput (req/s), queries per request and
+    peak resident memory while the route ran. The route is timed ``repeat``
+    times and the round with the lowest median is kept, as timeit does; the
+    garbage collector is paused while timing so one collection does not land
+    on a single request's p95.
+    """
+    gc.collect()
+    reset_peak_rss()
+    rounds = [_round(client_factory, method, url, data, requests, warmup) for _ in range(repeat)]
+    peak = peak_rss_mb()
+    timings, queries = min(rounds, key=lambda round_: statistics.median(round_[0]))
+    gc.collect()
+
+    cuts = statistics.quantiles(timings, n=100, method='inclusive') if len(timings) > 1 else timings * 99
+    return {
+        'p50_ms': round(cuts[49] * 1000, 2),
+        'p95_ms': round(cuts[94] * 1000, 2),
+        'p99_ms': round(cuts[98] * 1000, 2),
+        'throughput_rps': round(len(timings) / sum(timings), 1),
+        'queries': max(queries),
+        'peak_rss_mb': peak,
+    }
+
+
+# --- Baselines ---
+def regressions(report, baseline, threshold, min_delta_ms):
+    """
+    Human readable list of every metric that got worse than the baseline
+    allows. Latencies must also grow by ``min_delta_ms``, so timer noise on
+    sub-millisecond routes does not count. Raises ValueError when the
+    baseline was taken with a different size, seed, request count or repeat.
+    """
+    differing = [f"{key} {baseline.get(key)!r} vs {report[key]!r}"
+                 for key in ('size', 'seed', 'requests', 'repeat') if baseline.get(key) != report[key]]
+    if differing:
+        raise ValueError(f"baseline was run with different settings ({', '.join(differing)})")
+
+    metrics = ('p50_ms', 'p95_ms') if report['requests'] >= MIN_REQUESTS_FOR_P95 else ('p50_ms',)
+    found = []
+    for endpoint, current in report['routes'].items():
+        before = baseline.get('routes', {}).get(endpoint)
+        if not before:
+            continue
+        for metric in metrics:
+            allowed = max(before[metric] * (1 + threshold), before[metric] + min_delta_ms)
+            if current[metric] > allowed:
+                found.append(f"{endpoint}: {metric} {before[metric]} -> {current[metric]}")
+        # Query counts are deterministic; any extra round trip is a regression
+        if current['queries'] > before['queries']:
+            found.append(f"{endpoint}: queries {before['queries']} -> {current['queries']}")
+        before_rss, current_rss = before.get('peak_rss_mb'), current['peak_rss_mb']
+        if before_rss and current_rss and current_rss > before_rss * (1 + threshold):
+            found.append(f"{endpoint}: peak_rss_mb {before_rss:.1f} -> {current_rss:.1f}")
+    return found
+
+
+def main():
+    """
+    Drives the hot routes of the real app through Flask's test client against
+    a copy of a seeded SQLite database and reports p50/p95/p99 latency,
+    throughput, queries per request and peak resident memory of each route.
+    Compares against a baseline saved with the same size, seed, request
+    count and repeat and exits with status 1 on a regression.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--database', default=DEFAULT_DATABASE,
+                        help=f"SQLite file, seeded on first use (default: {DEFAULT_DATABASE})")
+    parser.add_argument('--size', choices=sorted(SIZES), default='small', help="seed_data.py size for a new database")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--requests', type=int, default=50, help="measured requests per route (default: 50)")
+    parser.add_argument('--warmup', type=int, default=5, help="unmeasured requests per route first (default: 5)")
+    parser.add_argument('--repeat', type=int, default=3,
+                        help="timed rounds per route, the fastest is kept (default: 3)")
+    parser.add_argument('--route', action='append', help="only benchmark this endpoint (repeatable)")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help=f"baseline file (default: {DEFAULT_BASELINE})")
+    parser.add_argument('--save', action='store_true', help="write the results as the new baseline")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="allowed slowdown as a fraction of the baseline (default: 0.2)")
+    parser.add_argument('--min-delta-ms', type=float, default=1.0,
+                        help="latency growth always tolerated, in ms (default: 1.0)")
+    args = parser.parse_args()
+
+    path = os.path.abspath(args.database)
+    # Seeding in a child process keeps its memory out of the RSS figures
+    seeder = multiprocessing.Process(target=seed_database, args=(path, args.size, args.seed))
+    seeder.start()
+    seeder.join()
+    if seeder.exitcode:
+        sys.exit(f"Seeding {args.database} failed.")
+
+    # Routes such as admin.send_broadcast insert rows; run against a copy
+    copy = working_copy(path)
+    app = make_app(copy)
+    results = {}
+    try:
+        print(f"{'route':28} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>8} {'queries':>8} {'peak MB':>8}")
+        for endpoint, client_factory, method, url, data in scenarios(app):
+            if args.route and endpoint not in args.route:
+                continue
+            result = measure(client_factory, method, url, data, args.requests, args.warmup, args.repeat)
+            results[endpoint] = result
+            rss = f"{result['peak_rss_mb']:.1f}" if result['peak_rss_mb'] is not None else '-'
+            print(f"{endpoint:28} {result['p50_ms']:9.2f} {result['p95_ms']:9.2f} {result['p99_ms']:9.2f} "
+                  f"{result['throughput_rps']:8.1f} {result['queries']:8} {rss:>8}")
+    finally:
+        database.get_pool(app).close()
+        remove_copy(copy)
+
+    report = {'size': args.size, 'seed': args.seed, 'requests': args.requests,
+              'repeat': args.repeat, 'routes': results}
+    if args.save:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"Baseline saved to {args.baseline}.")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save to create one.")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    try:
+        found = regressions(report, baseline, args.threshold, args.min_delta_ms)
+    except ValueError as e:
+        print(f"Not comparing: the {e}. Rerun with matching options or --save a new baseline.")
+        sys.exit(2)
+    if found:
+        print(f"{len(found)} regressions beyond {args.threshold:.0%} of the baseline:")
+        for line in found:
+            print(f"  {line}")
+        sys.exit(1)
+    print("No regressions against the baseline.")
+
+
+if __name__ == '__main__':
+    main()
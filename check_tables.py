@@ -1,22 +1,49 @@
+import sys
+
 from app import create_app
 from app.database import get_db
+from app.migrations import pending, schema_drift, unlinked_profiles
 
 app = create_app()
 
-with app.app_context():
-    conn = get_db()
-    cursor = conn.cursor()
 
-    cursor.execute("""
-        SELECT TABLE_NAME
-        FROM INFORMATION_SCHEMA.TABLES
-        WHERE TABLE_TYPE = 'BASE TABLE'
-    """)
+def main():
+    """
+    Compares the live schema with what the code expects (app/migrations.py):
+    missing tables, columns and indexes, unapplied migrations, tables the code
+    does not know about and Students/Faculty rows the user_id backfill could
+    not link. Exits non-zero when anything required is missing.
+    """
+    if app.config.get('DB_BACKEND') == 'sqlite':
+        print("The SQLite backend creates its schema when the app starts; nothing to check.")
+        return
+
+    with app.app_context():
+        db = get_db()
+        report = schema_drift(db.cursor())
+        todo = pending(db)
+        missing = report['tables'] + report['columns']
+        unlinked = [] if missing else unlinked_profiles(db.cursor())
+
+    for table in report['tables']:
+        print(f"Missing table: {table}")
+    for table, column in report['columns']:
+        print(f"Missing column: {table}.{column}")
+    for table, index in report['indexes']:
+        print(f"Missing index: {index} on {table}")
+    for version, description in todo:
+        print(f"Unapplied migration {version:03d}: {description}")
+    for table in report['extra_tables']:
+        print(f"Unknown table: {table}")
+    for role, profile_id, name, email, by_email, by_name in unlinked:
+        print(f"Unlinked {role} {profile_id} ({name} <{email}>): {by_email} users match the email, {by_name} the name")
 
-    tables = cursor.fetchall()
+    drifted = len(missing) + len(report['indexes']) + len(todo) + len(unlinked)
+    if drifted:
+        print(f"{drifted} differences found - run migrate.py.")
+        sys.exit(1)
+    print("Schema matches the migrations.")
 
-    if not tables:
-        raise RuntimeError("No tables found in the database")
 
-    for table in tables:
-        pass  # Tables successfully retrieved
+if __name__ == '__main__':
+    main()
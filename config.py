@@ -7,6 +7,12 @@ load_dotenv()
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY')
 
+    # Database backend: 'mssql' (pyodbc, below) or 'sqlite', a local stand-in
+    # with the same schema for development, profiling and CI (default file:
+    # <instance>/cms.sqlite3)
+    DB_BACKEND = os.environ.get('DB_BACKEND', 'mssql')
+    SQLITE_PATH = os.environ.get('SQLITE_PATH')
+
     # Database configuration
     SQL_DRIVER = os.environ.get('DB_DRIVER')
     SQL_SERVER = os.environ.get('DB_SERVER')
@@ -30,3 +36,101 @@ class Config:
             f"DATABASE={SQL_DB};"
             f"Trusted_Connection=yes;"
         )
+
+    # Connection pool sizing (per worker process)
+    DB_POOL_MIN_SIZE = int(os.environ.get('DB_POOL_MIN_SIZE', 1))
+    DB_POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', 10))
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 30))
+    DB_POOL_RECYCLE_USES = int(os.environ.get('DB_POOL_RECYCLE_USES', 1000))
+    DB_POOL_MAX_AGE = int(os.environ.get('DB_POOL_MAX_AGE', 3600))
+    DB_POOL_PING_AFTER = float(os.environ.get('DB_POOL_PING_AFTER', 5))
+
+    # SQL tracing: fraction of requests whose statements are recorded and
+    # summarised (Server-Timing header, log line), a header admins can send to
+    # trace one request, and how often one statement may repeat in a request
+    # before it is reported as a possible N+1. Untraced requests use the plain
+    # connection. SQL_TRACE_RECORD_ALL records every request's statements
+    # without reporting them, for the SQL metrics and the slow-query log; it
+    # puts the tracing wrapper on every request.
+    SQL_TRACE_SAMPLE_RATE = float(os.environ.get('SQL_TRACE_SAMPLE_RATE', 0))
+    SQL_TRACE_HEADER = os.environ.get('SQL_TRACE_HEADER', 'X-SQL-Trace')
+    SQL_TRACE_REPEAT_THRESHOLD = int(os.environ.get('SQL_TRACE_REPEAT_THRESHOLD', 3))
+    SQL_TRACE_RECORD_ALL = os.environ.get('SQL_TRACE_RECORD_ALL', '').lower() in ('1', 'true', 'yes')
+
+    # Metrics at /metrics (Prometheus text format), off by default. Scrapers
+    # must send "Authorization: Bearer <METRICS_TOKEN>". Without a token the
+    # endpoint refuses everyone unless METRICS_ALLOW_LOCAL also serves
+    # loopback clients, which is only safe when no reverse proxy runs on the
+    # same host (proxied requests arrive from 127.0.0.1 too). Per-statement
+    # numbers and the slow-query log need SQL_TRACE_RECORD_ALL. Statements
+    # slower than SLOW_QUERY_SECONDS are logged, to SLOW_QUERY_LOG if set.
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '').lower() in ('1', 'true', 'yes')
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    METRICS_ALLOW_LOCAL = os.environ.get('METRICS_ALLOW_LOCAL', '').lower() in ('1', 'true', 'yes')
+    SLOW_QUERY_SECONDS = float(os.environ.get('SLOW_QUERY_SECONDS', 0.5))
+    SLOW_QUERY_LOG = os.environ.get('SLOW_QUERY_LOG')
+
+    # Stack profiling of live requests: the fraction sampled, a header admins
+    # can send to profile one request, the sampling interval, and where the
+    # collapsed-stack files go (default: <instance>/profiles) and how many
+    # are kept per endpoint
+    PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+    PROFILE_HEADER = os.environ.get('PROFILE_HEADER', 'X-Profile')
+    PROFILE_INTERVAL_MS = float(os.environ.get('PROFILE_INTERVAL_MS', 5))
+    PROFILE_FOLDER = os.environ.get('PROFILE_FOLDER')
+    PROFILE_KEEP = int(os.environ.get('PROFILE_KEEP', 50))
+
+    # Grade points used for GPA; any other non-empty grade earns GPA_DEFAULT_POINTS
+    GRADE_POINTS = {'A': 4.0, 'B': 3.0}
+    GPA_DEFAULT_POINTS = 2.0
+
+    # Message folders: rows per page and characters of body shown in lists
+    MESSAGES_PAGE_SIZE = int(os.environ.get('MESSAGES_PAGE_SIZE', 25))
+    MESSAGE_PREVIEW_CHARS = int(os.environ.get('MESSAGE_PREVIEW_CHARS', 160))
+
+    # Admin student directory: rows per page
+    STUDENTS_PAGE_SIZE = int(os.environ.get('STUDENTS_PAGE_SIZE', 50))
+
+    # Notifications: rows per page, and how long read ones stay in the hot table
+    NOTIFICATIONS_PAGE_SIZE = int(os.environ.get('NOTIFICATIONS_PAGE_SIZE', 20))
+    NOTIFICATION_RETENTION_DAYS = int(os.environ.get('NOTIFICATION_RETENTION_DAYS', 90))
+
+    # Seconds a cached unread notification/message count stays valid
+    UNREAD_CACHE_TTL = int(os.environ.get('UNREAD_CACHE_TTL', 60))
+
+    # Live unread-count streams (server-sent events at /student/events and
+    # /faculty/events). Off by default: every open tab holds one stream, and
+    # with it one worker thread, for up to SSE_MAX_SECONDS, which sync or
+    # threaded workers cannot afford beyond a handful of users. Enable it only
+    # when serving with an async worker, e.g. gunicorn -k gevent with
+    # --worker-connections sized to the expected open tabs; otherwise badges
+    # refresh on page load. Keep-alive interval and how long one stream holds
+    # its connection before the browser is made to reconnect:
+    LIVE_UNREAD_ENABLED = os.environ.get('LIVE_UNREAD_ENABLED', '').lower() in ('1', 'true', 'yes')
+    SSE_KEEPALIVE_SECONDS = int(os.environ.get('SSE_KEEPALIVE_SECONDS', 25))
+    SSE_MAX_SECONDS = int(os.environ.get('SSE_MAX_SECONDS', 300))
+
+    # Upload store (content-addressed; default: <instance>/uploads). Requests
+    # larger than MAX_CONTENT_LENGTH are refused before the body is read, a
+    # single file larger than UPLOAD_MAX_FILE_SIZE while it streams in.
+    UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER')
+    MAX_CONTENT_LENGTH = int(os.environ.get('MAX_CONTENT_LENGTH', 64 * 1024 * 1024))
+    UPLOAD_MAX_FILE_SIZE = int(os.environ.get('UPLOAD_MAX_FILE_SIZE', 50 * 1024 * 1024))
+
+    # Downloads: browser cache lifetime, and optional hand-off of the transfer
+    # to the front-end server - USE_X_SENDFILE for Apache/lighttpd, or the
+    # internal nginx location that maps onto UPLOAD_FOLDER for X-Accel-Redirect
+    UPLOAD_CACHE_MAX_AGE = int(os.environ.get('UPLOAD_CACHE_MAX_AGE', 3600))
+    USE_X_SENDFILE = os.environ.get('USE_X_SENDFILE', '').lower() in ('1', 'true', 'yes')
+    UPLOAD_X_ACCEL_PREFIX = os.environ.get('UPLOAD_X_ACCEL_PREFIX')
+
+    # Submission previews: worker threads, image width in px, characters of
+    # text kept, and the size cap of the preview cache (default: <instance>/previews)
+    PREVIEW_FOLDER = os.environ.get('PREVIEW_FOLDER')
+    PREVIEW_WORKERS = int(os.environ.get('PREVIEW_WORKERS', 2))
+    PREVIEW_WIDTH = int(os.environ.get('PREVIEW_WIDTH', 480))
+    PREVIEW_TEXT_CHARS = int(os.environ.get('PREVIEW_TEXT_CHARS', 200000))
+    PREVIEW_CACHE_MAX_BYTES = int(os.environ.get('PREVIEW_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+
+    # Submissions whose estimated text overlap (Jaccard) reaches this are flagged
+    SIMILARITY_THRESHOLD = float(os.environ.get('SIMILARITY_THRESHOLD', 0.5))
@@ -1,82 +1,53 @@
+import sys
+
 from app import create_app
 from app.database import get_db
+from app.migrations import EXPECTED_COLUMNS, SEED_SCRIPT, migrate
 
 app = create_app()
 
 # ---------------------------------------------------
-# SQL SCRIPT: DATABASE RESET & INITIALIZATION
+# SQL SCRIPT: DATABASE RESET (the schema itself lives in app/migrations.py)
 # ---------------------------------------------------
-SQL_SCRIPT = """
+DROP_SCRIPT = """
 DECLARE @sql NVARCHAR(MAX) = N'';
 SELECT @sql += N'ALTER TABLE ' + QUOTENAME(OBJECT_SCHEMA_NAME(parent_object_id))
     + '.' + QUOTENAME(OBJECT_NAME(parent_object_id))
     + ' DROP CONSTRAINT ' + QUOTENAME(name) + ';'
 FROM sys.foreign_keys;
 EXEC sp_executesql @sql;
-
-IF OBJECT_ID('dbo.Submissions', 'U') IS NOT NULL DROP TABLE dbo.Submissions;
-IF OBJECT_ID('dbo.Assignments', 'U') IS NOT NULL DROP TABLE dbo.Assignments;
-IF OBJECT_ID('dbo.Enrollments', 'U') IS NOT NULL DROP TABLE dbo.Enrollments;
-IF OBJECT_ID('dbo.Courses', 'U') IS NOT NULL DROP TABLE dbo.Courses;
-IF OBJECT_ID('dbo.Users', 'U') IS NOT NULL DROP TABLE dbo.Users;
-
-CREATE TABLE Users (
-    user_id INT IDENTITY(1,1) PRIMARY KEY,
-    name VARCHAR(100) NOT NULL,
-    email VARCHAR(100) UNIQUE NOT NULL,
-    password VARCHAR(255) NOT NULL,
-    role VARCHAR(20) CHECK (role IN ('Admin', 'Faculty', 'Student')) NOT NULL
-);
-
-CREATE TABLE Courses (
-    course_id INT IDENTITY(1,1) PRIMARY KEY,
-    course_code VARCHAR(20) UNIQUE NOT NULL,
-    course_name VARCHAR(100) NOT NULL,
-    credits INT NOT NULL,
-    room_number VARCHAR(20),
-    capacity INT DEFAULT 30,
-    enrolled_count INT DEFAULT 0,
-    teacher_id INT,
-    FOREIGN KEY (teacher_id) REFERENCES Users(user_id)
-);
-
-CREATE TABLE Enrollments (
-    enrollment_id INT IDENTITY(1,1) PRIMARY KEY,
-    student_id INT NOT NULL,
-    course_id INT NOT NULL,
-    grade VARCHAR(5),
-    attendance_percentage FLOAT DEFAULT 0.0,
-    FOREIGN KEY (student_id) REFERENCES Users(user_id),
-    FOREIGN KEY (course_id) REFERENCES Courses(course_id),
-    UNIQUE(student_id, course_id)
-);
-
-CREATE TABLE Assignments (
-    assignment_id INT IDENTITY(1,1) PRIMARY KEY,
-    course_id INT NOT NULL,
-    title VARCHAR(200) NOT NULL,
-    due_date DATE,
-    FOREIGN KEY (course_id) REFERENCES Courses(course_id)
-);
-
-INSERT INTO Users (name, email, password, role) VALUES
-('Super Admin', 'admin@uni.com', 'admin123', 'Admin'),
-('Sir Ali', 'ali@uni.com', 'teacher123', 'Faculty'),
-('Ahmed Khan', 'ahmed@uni.com', 'student123', 'Student');
-"""
+""" + "".join(
+    f"IF OBJECT_ID('dbo.{table}', 'U') IS NOT NULL DROP TABLE dbo.{table};\n"
+    for table in reversed(list(EXPECTED_COLUMNS))
+)
 
 
 def init_db():
     """
-    Drops existing tables and recreates the database schema with seed data.
+    Drops existing tables, recreates the schema from the migrations and adds seed data.
     """
     with app.app_context():
         db = get_db()
         cursor = db.cursor()
 
-        cursor.execute(SQL_SCRIPT)
+        cursor.execute(DROP_SCRIPT)
         db.commit()
+        migrate(db)
+        cursor.execute(SEED_SCRIPT)
+        db.commit()
+
+
+def init_indexes():
+    """
+    Applies pending migrations (new tables, columns and indexes) without touching data.
+    Kept for old deploy scripts; migrate.py does the same and reports what it ran.
+    """
+    with app.app_context():
+        migrate(get_db())
 
 
 if __name__ == '__main__':
-    init_db()
+    if '--indexes' in sys.argv:
+        init_indexes()
+    else:
+        init_db()
@@ -0,0 +1,47 @@
+import argparse
+
+from app import create_app
+from app.database import get_db
+from app.migrations import migrate, pending, unlinked_profiles
+
+app = create_app()
+
+
+def main():
+    """
+    Brings the database schema up to date by applying the pending migrations
+    from app/migrations.py in order. Safe to run on every deploy.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--list', action='store_true', help="only list pending migrations, do not apply them")
+    parser.add_argument('--target', type=int, help="stop after this version")
+    args = parser.parse_args()
+
+    if app.config.get('DB_BACKEND') == 'sqlite':
+        print("The SQLite backend creates its schema when the app starts; nothing to migrate.")
+        return
+
+    with app.app_context():
+        db = get_db()
+        if args.list:
+            todo = pending(db)
+            for version, description in todo:
+                print(f"Pending {version:03d}: {description}")
+            if not todo:
+                print("Schema is up to date.")
+            return
+
+        done = migrate(db, target=args.target)
+        unlinked = unlinked_profiles(db.cursor()) if args.target is None or args.target >= 7 else []
+
+    for version, description in done:
+        print(f"Applied {version:03d}: {description}")
+    if not done:
+        print("Schema is up to date.")
+    for role, profile_id, name, email, by_email, by_name in unlinked:
+        print(f"Unlinked {role} {profile_id} ({name} <{email}>): "
+              f"{by_email} users match the email, {by_name} the name - set user_id by hand.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+import argparse
+
+from app import create_app
+from app.database import get_db
+from app.rollups import reconcile
+
+app = create_app()
+
+
+def main():
+    """
+    Reports drift in Courses.enrolled_count and Enrollments.attendance_percentage
+    and rebuilds both counters from the base tables.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--dry-run', action='store_true', help="only report drift, do not fix it")
+    args = parser.parse_args()
+
+    with app.app_context():
+        report = reconcile(get_db(), fix=not args.dry_run)
+
+    for course_id, stored, actual in report['enrolled_count']:
+        print(f"Course {course_id}: enrolled_count {stored} -> {actual}")
+    for course_id, student_id, stored, actual in report['attendance_percentage']:
+        print(f"Course {course_id} / Student {student_id}: attendance {stored:.2f}% -> {actual:.2f}%")
+
+    drifted = len(report['enrolled_count']) + len(report['attendance_percentage'])
+    if not drifted:
+        print("Counters are consistent.")
+    elif args.dry_run:
+        print(f"{drifted} counters drifted (dry run, nothing changed).")
+    else:
+        print(f"{drifted} counters drifted and were rebuilt.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+import argparse
+import sys
+import time
+
+from app import create_app
+from app.database import get_db
+from app.synthetic import BATCH_SIZE, EMAIL_DOMAIN, PASSWORD, SIZES, Generator, already_seeded
+
+app = create_app()
+
+
+def main():
+    """
+    Fills the database with a synthetic university for scale testing. The same
+    sizes and --seed always generate the same data.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--size', choices=sorted(SIZES), default='tiny', help="preset sizes (default: tiny)")
+    parser.add_argument('--students', type=int)
+    parser.add_argument('--faculty', type=int)
+    parser.add_argument('--courses', type=int)
+    parser.add_argument('--enrollments-per-student', type=int, help="mean courses per student")
+    parser.add_argument('--class-days', type=int, help="attendance days recorded per course")
+    parser.add_argument('--messages', type=int)
+    parser.add_argument('--notifications', type=int)
+    parser.add_argument('--broadcasts', type=int)
+    parser.add_argument('--seed', type=int, default=1, help="random seed (default: 1)")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="rows per executemany batch")
+    args = parser.parse_args()
+
+    sizes = dict(SIZES[args.size])
+    for name in sizes:
+        if getattr(args, name) is not None:
+            sizes[name] = getattr(args, name)
+    if sizes['students'] < 1 or sizes['faculty'] < 1 or sizes['courses'] < 1:
+        parser.error("--students, --faculty and --courses must be at least 1")
+
+    with app.app_context():
+        db = get_db()
+        if already_seeded(db):
+            print(f"Synthetic accounts (@{EMAIL_DOMAIN}) already exist; recreate the database to reseed.")
+            sys.exit(1)
+        print(f"Seed {args.seed}: " + ', '.join(f"{name}={value}" for name, value in sizes.items()))
+        started = time.perf_counter()
+        Generator(db, seed=args.seed, batch_size=args.batch_size, **sizes).run()
+
+    print(f"Done in {time.perf_counter() - started:.1f}s. Every synthetic account's password is '{PASSWORD}'.")
+
+
+if __name__ == '__main__':
+    main()